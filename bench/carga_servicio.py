@@ -0,0 +1,109 @@
+"""
+Prueba de carga del servicio de pose (src/servicio_pose.py) con clientes simulados.
+
+    python bench/carga_servicio.py --clientes 4 --fps 20 --duracion 30
+    python bench/carga_servicio.py --puerto 8765 --clientes 8     # contra un servicio ya corriendo
+
+Cada cliente es un hilo con su conexión que manda el video sintético (JPEG) al ritmo
+pedido, como una estación. Sin --puerto levanta el servicio en este mismo proceso.
+Reporta por cliente los cuadros por segundo logrados, latencia p50/p95 y rechazos, y
+al final las métricas del servicio (lotes, cola, rendimiento total) en un JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(AQUI, "..", "src"))
+sys.path.insert(0, AQUI)
+
+from instrumentacion import Histograma  # noqa: E402
+from servicio_pose import ClientePose, ServicioPose  # noqa: E402
+import sintetico  # noqa: E402
+
+
+def cliente_simulado(host, puerto, nombre, cuadros, fps, duracion, resultados, jpeg_calidad):
+    c = ClientePose(host, puerto, nombre, jpeg_calidad=jpeg_calidad)
+    h = Histograma()
+    codigos = {}
+    periodo = 1.0 / fps if fps else 0.0
+    t_fin = time.perf_counter() + duracion
+    siguiente = time.perf_counter()
+    i = ok = 0
+    while time.perf_counter() < t_fin:
+        t0 = time.perf_counter()
+        try:
+            estado, _ = c.analizar(cuadros[i % len(cuadros)])
+        except OSError as e:
+            estado = type(e).__name__
+        h.registrar(time.perf_counter() - t0)
+        codigos[str(estado)] = codigos.get(str(estado), 0) + 1
+        ok += estado == 200
+        i += 1
+        if periodo:
+            siguiente += periodo
+            espera = siguiente - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            else:
+                siguiente = time.perf_counter()    # atrasado: no se acumula deuda
+    metricas = c.cerrar()
+    r = {"enviados": i, "fps": round(ok / duracion, 1), "codigos": codigos,
+         "repeticiones": metricas.get("repeticiones") if metricas else None}
+    r.update({k: round(v, 2) for k, v in h.resumen().items() if k.endswith("_ms")})
+    resultados[nombre] = r
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Prueba de carga del servicio de pose.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, help="servicio ya corriendo; sin esto se levanta uno local")
+    ap.add_argument("--procesos", type=int, default=None, help="procesos del servicio local")
+    ap.add_argument("--clientes", type=int, default=4)
+    ap.add_argument("--fps", type=float, default=20.0, help="cuadros por segundo por cliente (0 = sin límite)")
+    ap.add_argument("--duracion", type=float, default=20.0)
+    ap.add_argument("--tam", default="640x480")
+    ap.add_argument("--crudo", action="store_true", help="manda BGR crudo en vez de JPEG")
+    ap.add_argument("--salida", default="carga_servicio.json")
+    args = ap.parse_args(argv)
+
+    ancho, alto = (int(v) for v in args.tam.lower().split("x"))
+    cuadros, _, _ = sintetico.generar_cuadros(120, (ancho, alto))
+    servicio = None
+    puerto = args.puerto
+    if puerto is None:
+        servicio = ServicioPose(args.host, 0, args.procesos, max_clientes=max(args.clientes, 1),
+                                tam_maximo=(max(ancho, 640), max(alto, 480))).iniciar()
+        puerto = servicio.puerto
+    resultados = {}
+    try:
+        hilos = [threading.Thread(target=cliente_simulado,
+                                  args=(args.host, puerto, f"carga-{k}", cuadros, args.fps, args.duracion,
+                                        resultados, None if args.crudo else 80))
+                 for k in range(args.clientes)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        metricas = ClientePose(args.host, puerto).metricas()
+    finally:
+        if servicio is not None:
+            servicio.cerrar()
+
+    total = sum(r["fps"] for r in resultados.values())
+    res = {"clientes": args.clientes, "fps_por_cliente": args.fps, "duracion_s": args.duracion,
+           "fps_total": round(total, 1), "por_cliente": resultados, "servicio": metricas}
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(res, f, ensure_ascii=False, indent=1)
+    for nombre, r in sorted(resultados.items()):
+        print(f"{nombre}: {r['fps']:.1f} FPS, p50 {r['p50_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms, {r['codigos']}")
+    print(f"Total: {total:.1f} FPS; lote medio {metricas['lote_medio']}, cola máx {metricas['cola_max']}, "
+          f"rechazados {metricas['rechazados']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,429 @@
+"""
+Benchmarks reproducibles del análisis (sin interfaz).
+
+    python bench/run_bench.py --salida bench_resultados.json
+    python bench/run_bench.py --fixtures grabaciones/ --comparar bench_anterior.json
+
+Mide:
+  - micro: angle_from_vertical_deg, near_targets, media_movil, panel (HUD), render_overlay/generar_pdf
+  - bucle: FPS y latencia por cuadro del análisis completo (inferencia + ángulos + dibujo
+           + preparación para pantalla) sobre el video sintético y los fixtures
+  - precision: error contra la verdad sintética (exacto por landmarks y, si MediaPipe
+               detecta la figura, a través del video), desfase recuperado por la
+               alineación con la referencia y diferencia del lote por tramos contra el
+               análisis continuo
+El resultado es un JSON para comparar corridas.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(AQUI, "..", "src"))
+sys.path.insert(0, AQUI)
+
+from biomecanica import angle_from_vertical_deg, angulos_hombro, near_targets, media_movil  # noqa: E402
+from fuentes import FuenteArchivo, FuenteMemoria  # noqa: E402
+from alineacion import AlineadorDTW  # noqa: E402
+from analisis_lote import COLUMNAS, TOLERANCIA_TRAMO_DEG, analizar_tramo  # noqa: E402
+from base_datos import BaseDatos, EscritorMuestras, _acumular_resumen  # noqa: E402
+from hud import CompositorHUD  # noqa: E402
+from instrumentacion import Histograma  # noqa: E402
+from motor_angulos import MotorAngulos, angulos_hombro_lote  # noqa: E402
+import sintetico  # noqa: E402
+
+
+# ======================= Utilidades =======================
+def cronometrar(fn, repeticiones, rondas=5):
+    """Mejor de `rondas`: ns por llamada."""
+    mejor = float("inf")
+    for _ in range(rondas):
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            fn()
+        mejor = min(mejor, (time.perf_counter() - t0) / repeticiones)
+    return mejor * 1e9
+
+
+# ======================= Micro =======================
+def bench_micro(repeticiones=20000):
+    r = {}
+    r["angle_from_vertical_deg_ns"] = cronometrar(
+        lambda: angle_from_vertical_deg((0.4, 0.3), (0.55, 0.45)), repeticiones)
+    r["near_targets_ns"] = cronometrar(lambda: near_targets(87.3), repeticiones)
+    buf = []
+    r["media_movil_ns"] = cronometrar(lambda: media_movil(buf, 91.0), repeticiones)
+    lm = sintetico.como_landmarks(sintetico.esqueleto(75.0))
+    r["angulos_hombro_ns"] = cronometrar(lambda: angulos_hombro(lm), repeticiones)
+    motor = MotorAngulos()
+    arr = sintetico.esqueleto(75.0).astype(np.float32)
+    r["motor_angulos_cuadro_ns"] = cronometrar(lambda: motor.calcular(arr), repeticiones // 10)
+    lote = np.repeat(arr[None], 1000, axis=0)
+    r["motor_angulos_lote_ns_por_cuadro"] = cronometrar(lambda: motor.calcular(lote), 20) / len(lote)
+    hud = CompositorHUD("Paciente Prueba", "Shoulder flexion with stick", "Flexión", "90° / 180°")
+    cuadro = np.zeros((1080, 1920, 3), np.uint8)
+    item = {"s_flex": 92.4, "s_abd": None, "estado_flex_ok": True, "estado_abd": "-", "repeticiones": 3}
+    r["hud_1080p_ns"] = cronometrar(lambda: hud.componer(cuadro, item, "2025-01-01 10:00:00"), 200)
+    ref, _ = sintetico.trayectoria(80, ciclos=1.0)
+    al = AlineadorDTW(ref, t0=0.0)
+    reloj = iter(np.arange(1, 10 ** 7) * 0.05)
+    r["alineador_dtw_ns"] = cronometrar(lambda: al.agregar(next(reloj), 90.0), repeticiones // 10)
+    return r
+
+
+def bench_pdf(repeticiones=20):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    from graficas import serie_grafica
+    from reportes import render_overlay, generar_pdf
+
+    d = tempfile.mkdtemp(prefix="bench_pdf_")
+    plantilla = os.path.join(d, "Plantilla.pdf")
+    c = canvas.Canvas(plantilla, pagesize=letter)
+    c.drawString(72, 750, "Plantilla de prueba")
+    c.save()
+    datos = {"paciente": "Paciente Prueba", "edad": "45", "fecha": "2025-01-01 10:00:00",
+             "ejercicio": "Shoulder flexion with stick", "comparacion": {"Flexión": 92.4, "Abducción": 88.1},
+             "repeticiones": "10", "series": "3", "peso": "2 kg"}
+    salida = os.path.join(d, "out.pdf")
+    # sesión de 30 min a 30 FPS (54k muestras) con huecos de abducción, reducida con LTTB
+    t = np.arange(54000) / 30.0
+    abd = 90 + 80 * np.sin(2 * np.pi * t / 7)
+    abd[(t % 60) > 50] = np.nan
+    serie = (t, 95 + 85 * np.sin(2 * np.pi * t / 6), abd)
+    con_graficas = dict(datos, serie=serie_grafica(*serie))
+    salida_graficas = os.path.join(d, "graficas.pdf")
+    r = {
+        "render_overlay_ms": cronometrar(lambda: render_overlay(datos), repeticiones, 3) / 1e6,
+        "exportar_pdf_ms": cronometrar(lambda: generar_pdf(datos, plantilla, salida), repeticiones, 3) / 1e6,
+        "serie_lttb_54k_ms": cronometrar(lambda: serie_grafica(*serie), 5, 3) / 1e6,
+        "exportar_pdf_graficas_ms": cronometrar(
+            lambda: generar_pdf(con_graficas, plantilla, salida_graficas), 5, 3) / 1e6,
+    }
+    r["pdf_graficas_kb"] = round(os.path.getsize(salida_graficas) / 1024, 1)
+    return r
+
+
+def bench_progreso(pacientes=1000, sesiones=20):
+    """Resúmenes de progreso: costo de sumar una sesión y de las consultas del tablero."""
+    d = tempfile.mkdtemp(prefix="bench_progreso_")
+    db = BaseDatos(os.path.join(d, "pacientes.db"))
+    rng = np.random.default_rng(0)
+    diagnosticos = ("Manguito rotador", "Capsulitis adhesiva", "Fractura de húmero", "Posquirúrgico")
+    c = db.conn
+    t0 = time.perf_counter()
+    for i in range(pacientes):
+        pid = c.execute("INSERT INTO pacientes (nombre, edad, sexo, diagnostico, fecha) VALUES (?, ?, ?, ?, ?)",
+                        (f"P{i}", int(rng.integers(20, 80)), "FM"[i % 2], diagnosticos[i % 4],
+                         "2025-01-01")).lastrowid
+        for k in range(sesiones):
+            dia = f"2025-{1 + k // 14:02d}-{1 + (2 * k) % 28:02d}"
+            rom = 60.0 + 3 * k + float(rng.random()) * 10
+            sid = c.execute("""
+                INSERT INTO sesiones (paciente_id, paciente, ejercicio, modo, inicio, fin, reps_detectadas,
+                                      rom_max, rom_medio, angulo_max, t_activo_s, t_meta_90_s, t_meta_180_s)
+                VALUES (?, ?, 'Flexión', 'Flexión', ?, ?, 10, ?, ?, ?, 60, 5, 1)
+            """, (pid, f"P{i}", dia + " 10:00:00", dia + " 10:20:00", rom + 5, rom, rom + 20)).lastrowid
+            _acumular_resumen(c, sid)
+    c.commit()
+    acumular_ms = (time.perf_counter() - t0) * 1e3 / (pacientes * sesiones)
+    r = {
+        "acumular_sesion_ms": acumular_ms,
+        "progreso_paciente_ms": cronometrar(lambda: db.progreso_paciente("P7"), 200, 3) / 1e6,
+        "comparar_cohortes_ms": cronometrar(lambda: db.comparar_cohortes(("diagnostico", "sexo")), 10, 3) / 1e6,
+        "curva_cohorte_ms": cronometrar(lambda: db.curva_cohorte("diagnostico", "Flexión", "Flexión"), 50, 3) / 1e6,
+    }
+    db.cerrar()
+    return r
+
+
+# ======================= Precisión =======================
+def precision_landmarks(n=600):
+    """Biomecánica pura: landmarks exactos -> el error debe ser ~0 y el filtro de plano debe actuar."""
+    ang, en_plano = sintetico.trayectoria(n)
+    err_flex, err_abd, rechazados_fuera = [], [], 0
+    for a, p in zip(ang, en_plano):
+        flex, abd = angulos_hombro(sintetico.como_landmarks(sintetico.esqueleto(a, p)))
+        if p:
+            err_flex.append(abs(flex - a))
+            if abd is not None:
+                err_abd.append(abs(abd - a))
+        elif abd is None:
+            rechazados_fuera += 1
+    fuera = int((~en_plano).sum())
+    # el motor vectorizado debe coincidir con la ruta escalar
+    lote = np.stack([sintetico.esqueleto(a, p) for a, p in zip(ang, en_plano)])
+    flex_lote, abd_lote = angulos_hombro_lote(lote)
+    return {
+        "lote_flex_mae_deg": float(np.mean(np.abs(flex_lote - ang)[en_plano])),
+        "lote_abd_rechazo_fuera_de_plano": float(np.isnan(abd_lote[~en_plano]).mean()) if fuera else None,
+        "flex_mae_deg": float(np.mean(err_flex)),
+        "flex_max_deg": float(np.max(err_flex)),
+        "abd_mae_deg": float(np.mean(err_abd)) if err_abd else None,
+        "abd_rechazo_fuera_de_plano": rechazados_fuera / fuera if fuera else None,
+    }
+
+
+def precision_alineacion(desfases=(-1.0, 0.0, 0.6, 1.5), duracion=120.0, fps=20.0):
+    """Paciente = referencia (ciclo de 4 s) atrasada un desfase conocido, con ruido y FPS irregulares."""
+    ref, _ = sintetico.trayectoria(80, ciclos=1.0)      # 4 s a 20 Hz
+    rng = np.random.default_rng(0)
+    errores = []
+    for d in desfases:
+        al = AlineadorDTW(ref, t0=0.0)
+        t = 0.0
+        while t < duracion:
+            t += rng.uniform(0.6, 1.4) / fps
+            fase = ((t - d) % 4.0) / 4.0
+            e = al.agregar(t, 90.0 - 90.0 * np.cos(2 * np.pi * fase) + rng.normal(0, 2.0))
+            if t > 10.0:
+                errores.append(abs(e["desfase_s"] - d))
+    return {"desfase_mae_s": float(np.mean(errores)), "desfase_p95_s": float(np.percentile(errores, 95))}
+
+
+def precision_graficas():
+    """
+    Pose perdida 2 s (corta la curva) y 0.3 s (no corta), pasando por la base: la curva
+    de flexión debe quedar en 2 tramos y sin puntos dentro del hueco largo. Además,
+    con huecos frecuentes ninguna curva pasa de PUNTOS_CURVA puntos.
+    """
+    from graficas import PUNTOS_CURVA, serie_grafica
+
+    d = tempfile.mkdtemp(prefix="bench_graficas_")
+    db = BaseDatos(os.path.join(d, "pacientes.db"))
+    sid = db.crear_sesion("Prueba", "Flexión", "Flexión", "2025-01-01 10:00:00")
+    escritor = EscritorMuestras(sid, ruta=db.ruta)
+    for k in range(600):
+        t = k / 30.0
+        pose = not (5.0 <= t < 7.0 or 12.0 <= t < 12.3)
+        flex = 90 + 60 * np.sin(t) if pose else None
+        # sin pose completar() deja también la flexión suavizada en None
+        s_flex = flex if pose else None
+        escritor.agregar((t, flex, None, s_flex, None, 0, 0.9 if pose else 0.0, int(pose)))
+    escritor.cerrar("2025-01-01 10:00:20")
+    tramos = serie_grafica(*db.serie_sesion(sid))["Flexión"]
+    db.cerrar()
+    en_hueco = [t for tr in tramos for t, _ in tr if 5.0 <= t < 7.0]
+    # 30 min a 30 FPS con la abducción 2 s válida y 1.5 s fuera del plano: el total de
+    # puntos no debe pasar de PUNTOS_CURVA aunque haya cientos de huecos
+    t = np.arange(54_000) / 30.0
+    abd = np.where(t % 3.5 < 2.0, 90 + 60 * np.sin(t), np.nan)
+    serie = serie_grafica(t, 90 + 60 * np.sin(t), abd)
+    puntos_abd = sum(len(tr) for tr in serie["Abducción"])
+    puntos_flex = sum(len(tr) for tr in serie["Flexión"])
+    return {"tramos_flexion": len(tramos), "puntos_en_hueco": len(en_hueco),
+            "corte_ok": len(tramos) == 2 and not en_hueco,
+            "huecos_frecuentes_puntos_abd": puntos_abd, "huecos_frecuentes_puntos_flex": puntos_flex,
+            "puntos_ok": max(puntos_abd, puntos_flex) <= PUNTOS_CURVA}
+
+
+def precision_video(angulos_medidos, detectado, ang, en_plano):
+    m = detectado & en_plano
+    if not m.any():
+        return {"deteccion": float(detectado.mean()), "flex_mae_deg": None}
+    err = np.abs(np.asarray(angulos_medidos)[m] - ang[m])
+    return {"deteccion": float(detectado.mean()),
+            "flex_mae_deg": float(err.mean()),
+            "flex_p95_deg": float(np.percentile(err, 95))}
+
+
+# ======================= Bucle completo =======================
+def precision_tramos(n=300, tramo=60, complejidad=1):
+    """
+    Lote por tramos (con los cuadros previos de calentamiento) contra el mismo video
+    analizado de corrido: diferencia en los ángulos crudos y suavizados de cada cuadro.
+    """
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "sintetico.mp4")
+        sintetico.escribir_video(ruta, n)
+        continuo = analizar_tramo(ruta, 0, n, 30.0, complejidad)
+        por_tramos = []
+        for inicio in range(0, n, tramo):
+            por_tramos += analizar_tramo(ruta, inicio, min(inicio + tramo, n), 30.0, complejidad)
+
+    def dif(col):
+        a = np.array([f[col] if f[col] != "" else np.nan for f in continuo], dtype=np.float64)
+        b = np.array([f[col] if f[col] != "" else np.nan for f in por_tramos], dtype=np.float64)
+        d = np.abs(a - b)[~(np.isnan(a) | np.isnan(b))]
+        return d if len(d) else np.zeros(1)
+
+    crudo, suav = dif(COLUMNAS.index("flexion")), dif(COLUMNAS.index("flexion_suav"))
+    return {"cuadros": len(continuo), "tramo": tramo, "mismos_cuadros": len(continuo) == len(por_tramos),
+            "flex_max_deg": round(float(crudo.max()), 3),
+            "flex_suav_max_deg": round(float(suav.max()), 3),
+            "flex_suav_p95_deg": round(float(np.percentile(suav, 95)), 3),
+            "tolerancia_deg": TOLERANCIA_TRAMO_DEG}
+
+
+def bench_bucle(fuente, complejidad=1, usar_roi=True, max_cuadros=None, procesos=0):
+    """
+    Corre inferir + componer + preparación de pantalla por cuadro sobre cualquier fuente
+    (FuenteMemoria/FuenteArchivo; en modo rápido o en tiempo real).
+    procesos > 0: MediaPipe en un proceso aparte (memoria compartida), como en la app.
+    Devuelve métricas y los ángulos crudos de flexión (para la precisión).
+    """
+    from analisis import AnalizadorSesion
+    from inferencia_adaptativa import InferenciaAdaptativa, NIVELES
+    from inferencia_procesos import ServidorInferencia
+
+    nivel = next(i for i, (c, e) in enumerate(NIVELES) if c == complejidad and e == 1.0)
+    servidor = None
+    if procesos:
+        w, h = fuente.tamano()
+        servidor = ServidorInferencia(n_procesos=procesos, tam_maximo=(w, h),
+                                      nivel=nivel, usar_roi=usar_roi, adaptar=False)
+        inf = servidor.canales[0]
+    else:
+        inf = InferenciaAdaptativa(nivel=nivel, usar_roi=usar_roi, adaptar=False)
+    an = AnalizadorSesion(inf, "Bench", "Shoulder flexion with stick", "Flexión")
+    h = Histograma()
+    flex, detectado = [], []
+    n = 0
+    try:
+        ok, f = fuente.leer()
+        if not ok:
+            raise ValueError("la fuente no entregó cuadros")
+        # calentamiento: el primer cuadro inicializa el grafo de MediaPipe
+        an.inferir({"t": time.perf_counter(), "frame": f})
+        t_total = time.perf_counter()
+        while max_cuadros is None or n < max_cuadros:
+            ok, f = fuente.leer()
+            if not ok:
+                break
+            n += 1
+            t0 = time.perf_counter()
+            item = an.inferir({"t": t0, "frame": f})
+            frame_land = an.componer(item)
+            cam = an.pool.anillo("pantalla", (420, 560, 3), n=4)
+            cv2.resize(frame_land, (560, 420), dst=cam)
+            cv2.cvtColor(cam, cv2.COLOR_BGR2RGB, dst=cam)
+            h.registrar(time.perf_counter() - t0)
+            flex.append(np.nan if item["ang_flex"] is None else item["ang_flex"])
+            detectado.append(item["landmarks"] is not None)
+        t_total = time.perf_counter() - t_total
+    finally:
+        inf.cerrar()
+        if servidor is not None:
+            servidor.cerrar()
+        fuente.liberar()
+    r = {"cuadros": n, "fps": n / t_total if t_total > 0 else 0.0}
+    r.update(h.resumen())
+    r["etapas"] = {e: hh.resumen() for e, hh in an.instr.histogramas.items()}
+    # buffers de cuadro asignados por cuadro en régimen (debe ser 0)
+    r["asignaciones_por_cuadro"] = an.pool.estado()["asignaciones_por_cuadro"]
+    return r, np.array(flex), np.array(detectado)
+
+
+# ======================= Comparación =======================
+def aplanar(d, prefijo=""):
+    out = {}
+    for k, v in d.items():
+        clave = f"{prefijo}{k}"
+        if isinstance(v, dict):
+            out.update(aplanar(v, clave + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[clave] = v
+    return out
+
+
+def comparar(actual, anterior):
+    a, b = aplanar(actual), aplanar(anterior)
+    print(f"{'métrica':60s} {'antes':>12s} {'ahora':>12s} {'cambio':>8s}")
+    for k in sorted(set(a) & set(b)):
+        if b[k]:
+            print(f"{k:60s} {b[k]:12.3f} {a[k]:12.3f} {100 * (a[k] - b[k]) / abs(b[k]):+7.1f}%")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks del análisis biomecánico.")
+    ap.add_argument("--salida", default="bench_resultados.json")
+    ap.add_argument("--cuadros", type=int, default=300, help="cuadros del video sintético")
+    ap.add_argument("--fixtures", nargs="*", default=[], help="carpetas/globs con videos grabados")
+    ap.add_argument("--max-cuadros", type=int, default=600, help="máximo de cuadros por fixture")
+    ap.add_argument("--complejidad", type=int, default=1, choices=(0, 1, 2))
+    ap.add_argument("--tiempo-real", action="store_true",
+                    help="entrega los cuadros al ritmo de sus FPS (como una cámara) en vez de a máxima velocidad")
+    ap.add_argument("--procesos", type=int, default=0,
+                    help="MediaPipe en N procesos aparte (memoria compartida); 0 = en el mismo proceso")
+    ap.add_argument("--sin-bucle", action="store_true", help="omite el bucle con MediaPipe")
+    ap.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = ap.parse_args(argv)
+
+    res = {
+        "meta": {
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+        },
+        "micro": bench_micro(),
+        "precision": {"landmarks": precision_landmarks(), "alineacion": precision_alineacion(),
+                      "graficas": precision_graficas()},
+    }
+    try:
+        res["micro"].update(bench_pdf())
+    except ImportError as e:
+        res["micro"]["pdf_error"] = str(e)
+    res["micro"].update(bench_progreso())
+
+    if not args.sin_bucle:
+        # +1: el primer cuadro se usa para el calentamiento
+        cuadros, ang, en_plano = sintetico.generar_cuadros(args.cuadros + 1)
+        fuente = FuenteMemoria(cuadros, fps=30.0, tiempo_real=args.tiempo_real)
+        r, flex, det = bench_bucle(fuente, args.complejidad, procesos=args.procesos)
+        res["bucle"] = {"sintetico": r}
+        res["precision"]["video_sintetico"] = precision_video(flex, det, ang[1:], en_plano[1:])
+        res["precision"]["tramos"] = precision_tramos(args.cuadros, complejidad=args.complejidad)
+        for e in args.fixtures:
+            rutas = glob.glob(os.path.join(e, "*.mp4")) if os.path.isdir(e) else glob.glob(e)
+            for ruta in sorted(rutas):
+                fuente = FuenteArchivo(ruta, tiempo_real=args.tiempo_real)
+                res["bucle"][os.path.basename(ruta)] = bench_bucle(fuente, args.complejidad,
+                                                                   max_cuadros=args.max_cuadros,
+                                                                   procesos=args.procesos)[0]
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(res, f, ensure_ascii=False, indent=1)
+    print(json.dumps({k: res[k] for k in ("micro", "precision")}, ensure_ascii=False, indent=1))
+    for nombre, r in res.get("bucle", {}).items():
+        print(f"{nombre}: {r['fps']:.1f} FPS, p50 {r['p50_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms, "
+              f"asignaciones/cuadro {r['asignaciones_por_cuadro']}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(res, json.load(f))
+
+    # la biomecánica exacta no debe degradarse con cambios de rendimiento
+    p = res["precision"]["landmarks"]
+    if (p["flex_mae_deg"] > 0.5 or (p["abd_rechazo_fuera_de_plano"] or 0) < 1.0
+            or p["lote_flex_mae_deg"] > 0.5 or (p["lote_abd_rechazo_fuera_de_plano"] or 0) < 1.0):
+        print("ERROR: la precisión de los ángulos se degradó.", file=sys.stderr)
+        return 1
+    if res["precision"]["alineacion"]["desfase_p95_s"] > 0.25:
+        print("ERROR: la alineación con la referencia se degradó.", file=sys.stderr)
+        return 1
+    t = res["precision"].get("tramos")
+    if t and (not t["mismos_cuadros"] or t["flex_suav_max_deg"] > TOLERANCIA_TRAMO_DEG):
+        print("ERROR: el lote por tramos se aparta del análisis continuo.", file=sys.stderr)
+        return 1
+    if not res["precision"]["graficas"]["corte_ok"]:
+        print("ERROR: las gráficas del reporte unen huecos sin pose.", file=sys.stderr)
+        return 1
+    if not res["precision"]["graficas"]["puntos_ok"]:
+        print("ERROR: las gráficas del reporte pasan de PUNTOS_CURVA puntos por curva.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Videos y landmarks sintéticos con ángulos conocidos para los benchmarks.
+
+Una figura de palitos barre el brazo derecho 0° -> 180° -> 0° (respecto a la
+vertical hacia abajo). Un tramo central se mueve fuera del plano frontal (Δz grande)
+para verificar que el filtro de plano descarta la abducción.
+"""
+import math
+import os
+import sys
+import types
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from biomecanica import HOMBRO_DER, CODO_DER, N_LANDMARKS  # noqa: E402
+
+# Índices MediaPipe usados por el dibujo
+NARIZ, HOMBRO_IZQ, CODO_IZQ, MUNECA_IZQ, MUNECA_DER = 0, 11, 13, 15, 16
+CADERA_IZQ, CADERA_DER, RODILLA_IZQ, RODILLA_DER, TOBILLO_IZQ, TOBILLO_DER = 23, 24, 25, 26, 27, 28
+
+
+def trayectoria(n, ciclos=2.0, fuera_de_plano=(0.45, 0.55)):
+    """
+    Ángulo verdadero por cuadro (grados) y máscara de cuadros en el plano frontal.
+    Los cuadros en [fuera_de_plano) del total mueven el codo hacia la cámara.
+    """
+    t = np.arange(n) / max(1, n - 1)
+    ang = 90.0 - 90.0 * np.cos(2 * np.pi * ciclos * t)      # 0..180..0
+    en_plano = ~((t >= fuera_de_plano[0]) & (t < fuera_de_plano[1]))
+    return ang.astype(np.float64), en_plano
+
+
+def esqueleto(angulo, en_plano=True, largo_brazo=0.18):
+    """(33, 4) x, y, z, visibility normalizados; el brazo derecho forma `angulo` con la vertical."""
+    lm = np.zeros((N_LANDMARKS, 4), dtype=np.float64)
+    lm[:, 3] = 0.99
+    cx = 0.5
+    pts = {
+        NARIZ: (cx, 0.18), HOMBRO_IZQ: (cx + 0.09, 0.32), HOMBRO_DER: (cx - 0.09, 0.32),
+        CADERA_IZQ: (cx + 0.06, 0.60), CADERA_DER: (cx - 0.06, 0.60),
+        RODILLA_IZQ: (cx + 0.06, 0.76), RODILLA_DER: (cx - 0.06, 0.76),
+        TOBILLO_IZQ: (cx + 0.06, 0.92), TOBILLO_DER: (cx - 0.06, 0.92),
+        CODO_IZQ: (cx + 0.10, 0.32 + largo_brazo), MUNECA_IZQ: (cx + 0.10, 0.32 + 2 * largo_brazo),
+    }
+    for i, (x, y) in pts.items():
+        lm[i, 0:2] = (x, y)
+    # brazo derecho (lado izquierdo de la imagen): gira hacia afuera
+    a = math.radians(angulo)
+    sx, sy = lm[HOMBRO_DER, 0:2]
+    dx, dy = -math.sin(a), math.cos(a)
+    if not en_plano:
+        # casi todo el desplazamiento va en z (hacia la cámara): |Δx|/|Δz| << umbral
+        lm[CODO_DER, 0:3] = (sx + 0.1 * dx * largo_brazo, sy + dy * largo_brazo, -largo_brazo)
+    else:
+        lm[CODO_DER, 0:3] = (sx + dx * largo_brazo, sy + dy * largo_brazo, 0.0)
+    ex, ey = lm[CODO_DER, 0:2]
+    lm[MUNECA_DER, 0:2] = (ex + (ex - sx), ey + (ey - sy))
+    return lm
+
+
+def como_landmarks(arr):
+    """Arreglo (33, 4) -> lista de objetos con .x .y .z .visibility (como MediaPipe)."""
+    return [types.SimpleNamespace(x=float(p[0]), y=float(p[1]), z=float(p[2]), visibility=float(p[3]))
+            for p in arr]
+
+
+SEGMENTOS = [(HOMBRO_IZQ, HOMBRO_DER), (HOMBRO_IZQ, CADERA_IZQ), (HOMBRO_DER, CADERA_DER),
+             (CADERA_IZQ, CADERA_DER), (CADERA_IZQ, RODILLA_IZQ), (RODILLA_IZQ, TOBILLO_IZQ),
+             (CADERA_DER, RODILLA_DER), (RODILLA_DER, TOBILLO_DER),
+             (HOMBRO_IZQ, CODO_IZQ), (CODO_IZQ, MUNECA_IZQ),
+             (HOMBRO_DER, CODO_DER), (CODO_DER, MUNECA_DER)]
+
+
+def dibujar(lm, tam=(640, 480)):
+    """Figura humana esquemática (extremidades gruesas, cabeza) en BGR."""
+    w, h = tam
+    img = np.full((h, w, 3), 90, dtype=np.uint8)
+    grosor = max(4, int(0.035 * h))
+    color = (120, 160, 210)   # tono piel aproximado en BGR
+
+    def px(i):
+        return int(lm[i, 0] * w), int(lm[i, 1] * h)
+
+    cv2.fillConvexPoly(img, np.array([px(HOMBRO_IZQ), px(HOMBRO_DER), px(CADERA_DER), px(CADERA_IZQ)]),
+                       (60, 60, 160))
+    for a, b in SEGMENTOS:
+        cv2.line(img, px(a), px(b), color, grosor, cv2.LINE_AA)
+    cv2.circle(img, px(NARIZ), int(0.07 * h), color, -1, cv2.LINE_AA)
+    return img
+
+
+def generar_cuadros(n=300, tam=(640, 480), ciclos=2.0):
+    """Lista de cuadros BGR + ángulo verdadero + máscara en plano."""
+    ang, en_plano = trayectoria(n, ciclos)
+    cuadros = [dibujar(esqueleto(a, p), tam) for a, p in zip(ang, en_plano)]
+    return cuadros, ang, en_plano
+
+
+def escribir_video(ruta, n=300, fps=30.0, tam=(640, 480), ciclos=2.0):
+    """Escribe el video sintético y un .npz con la verdad (angulo, en_plano) al lado."""
+    cuadros, ang, en_plano = generar_cuadros(n, tam, ciclos)
+    vw = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*"mp4v"), fps, tam)
+    for c in cuadros:
+        vw.write(c)
+    vw.release()
+    np.savez(os.path.splitext(ruta)[0] + "_verdad.npz", angulo=ang, en_plano=en_plano, fps=fps)
+    return ang, en_plano
+
+
+if __name__ == "__main__":
+    destino = sys.argv[1] if len(sys.argv) > 1 else "sintetico.mp4"
+    escribir_video(destino)
+    print(f"Escrito {destino}")
@@ -0,0 +1,182 @@
+"""
+Alineación temporal en línea (DTW con banda) entre el ángulo del paciente y el del
+clip de referencia.
+
+La trayectoria de la referencia ya está calculada en la caché (angulos.npy); se
+remuestrea una vez a `hz` y se trata como cíclica, igual que el reproductor que la
+muestra en bucle. El ángulo del paciente entra a la misma frecuencia (retención entre
+cuadros) y cada paso actualiza una sola columna de la matriz de DTW restringida a una
+banda de 2*banda+1 muestras alrededor de la última coincidencia:
+
+    D[k] = |x - ref[k]| + min(D_ant[k], D_ant[k-1], ..., D_ant[k-AVANCE_MAX])
+
+Cada paso del paciente avanza 0..AVANCE_MAX muestras de la referencia (de quieto a
+AVANCE_MAX veces más rápido), así todos los caminos tienen el mismo número de pasos
+y sus costos se comparan sin normalizar. Costo por cuadro O(banda) y memoria O(banda),
+sin importar la duración de la sesión (el DTW completo es O(n·m)).
+
+Salidas por cuadro:
+  desfase_s      reloj de la referencia - posición alineada (s); > 0: el paciente va
+                 atrás del video. Se envuelve a ±media duración del clip.
+  desviacion_deg |paciente - referencia| en el punto alineado, suavizado (~1 s)
+  fase           posición alineada dentro del clip (0-1)
+"""
+import math
+
+import numpy as np
+
+from estadisticas import CuantilP2
+
+HZ = 20.0               # frecuencia común de las dos series
+BANDA_S = 1.5           # medio ancho de la banda (s de referencia)
+AVANCE_MAX = 3          # muestras de referencia por paso del paciente (pendiente máxima)
+PASOS_MAX = 5           # pasos por cuadro; un hueco mayor (pose perdida) re-ancla la banda
+TAU_DESVIACION = 1.0    # s, suavizado de la desviación mostrada
+TAU_DESFASE = 0.5       # s, suavizado del desfase mostrado
+
+
+def trayectoria_referencia(angulos, fps, modo="Flexión", hz=HZ):
+    """
+    angulos (N, 2) de la caché (flexión, abducción; NaN sin pose o fuera de plano) ->
+    serie del modo remuestreada a `hz`, con los huecos interpolados. None si no alcanza.
+    """
+    col = 0 if modo == "Flexión" else 1
+    y = np.asarray(angulos, dtype=np.float64)[:, col]
+    validos = np.flatnonzero(~np.isnan(y))
+    if len(validos) < 2:
+        return None
+    t = np.arange(len(y)) / float(fps)
+    duracion = len(y) / float(fps)
+    t_nuevo = np.arange(max(2, int(round(duracion * hz)))) / hz
+    return np.interp(t_nuevo, t[validos], y[validos])
+
+
+class AlineadorDTW:
+    """
+    agregar(t, x) por cuadro (t en segundos de perf_counter, x en grados).
+    t0: instante en que empezó a reproducirse la referencia (ReproductorReferencia.t0).
+    """
+
+    def __init__(self, referencia, t0, hz=HZ, banda_s=BANDA_S, avance_max=AVANCE_MAX):
+        self.ref = np.asarray(referencia, dtype=np.float64)
+        self.n_ref = len(self.ref)
+        self.t0 = t0
+        self.hz = float(hz)
+        self.duracion = self.n_ref / self.hz
+        self.banda = max(avance_max, int(round(banda_s * hz)))
+        self.largo = 2 * self.banda + 1
+        self.avance_max = avance_max
+        self.k0 = 0                  # índice (sin envolver) de la primera muestra de la banda
+        self.D = None                # columna de costos acumulados sobre la banda
+        self.mejor = 0               # posición de la coincidencia dentro de la banda
+        self.pasos = 0
+        self.reanclajes = 0
+        self._t_sig = None           # instante del próximo paso
+        self._x_ant = None
+        self._t_ant = None
+        self._t_filtro = None
+        self.desviacion = None       # suavizadas (lo que se muestra)
+        self._desfase = None
+        self._suma_desv = 0.0
+        self._suma_desfase = 0.0
+        self._p90_desv = CuantilP2(0.9)
+        self._p90_desfase = CuantilP2(0.9)
+
+    @classmethod
+    def desde_referencia(cls, datos_ref, modo, t0, **kw):
+        """datos_ref de CacheReferencias.obtener(); None si la referencia no tiene ángulos útiles."""
+        hz = kw.get("hz", HZ)
+        serie = trayectoria_referencia(datos_ref["angulos"], datos_ref["meta"]["fps"], modo, hz)
+        return None if serie is None else cls(serie, t0, **kw)
+
+    # ---------------- DTW ----------------
+    def _anclar(self, centro):
+        """Banda nueva alrededor de `centro` con inicio libre (cualquier punto puede empezar)."""
+        self.k0 = max(0, int(centro) - self.banda)
+        self.D = np.zeros(self.largo)
+        self.mejor = int(centro) - self.k0
+
+    def _paso(self, x):
+        s, largo = self.avance_max, self.largo
+        # la banda sigue a la coincidencia y nunca retrocede (alineación monótona)
+        k0 = max(self.k0, self.k0 + self.mejor - self.banda)
+        desp = k0 - self.k0
+        # D_ant sobre [k0 - s, k0 + largo): lo que quedó fuera de la banda anterior es inf
+        ant = np.full(largo + s, np.inf)
+        ini = s - desp
+        if ini >= 0:
+            n = min(largo, largo + s - ini)
+            ant[ini:ini + n] = self.D[:n]
+        else:
+            ant[:largo + ini] = self.D[-ini:]
+        m = ant[s:]
+        for a in range(1, s + 1):
+            m = np.minimum(m, ant[s - a:s - a + largo])
+        costo = np.abs(x - self.ref.take(np.arange(k0, k0 + largo), mode="wrap"))
+        D = costo + m
+        self.mejor = int(np.argmin(D))
+        D -= D[self.mejor]           # solo importa el orden: los valores no crecen con la sesión
+        self.D, self.k0 = D, k0
+        self.pasos += 1
+        return float(costo[self.mejor])
+
+    # ---------------- Por cuadro ----------------
+    def agregar(self, t, x):
+        x = float(x)
+        periodo = 1.0 / self.hz
+        if self.D is None or t - self._t_sig > PASOS_MAX * periodo:
+            # inicio o hueco largo: se supone que el paciente siguió al video
+            if self.D is None:
+                self._anclar((t - self.t0) * self.hz)
+            else:
+                self._anclar(self.k0 + self.mejor + (t - self._t_ant) * self.hz)
+                self.reanclajes += 1
+            self._t_sig, self._x_ant, self._t_ant = t, x, t
+        costo = None
+        while self._t_sig <= t:
+            # valor del paciente en el instante del paso (interpolado entre cuadros)
+            dt = t - self._t_ant
+            f = 1.0 if dt <= 0 else (self._t_sig - self._t_ant) / dt
+            costo = self._paso(self._x_ant + f * (x - self._x_ant))
+            self._t_sig += periodo
+        self._x_ant, self._t_ant = x, t
+        if costo is None:
+            return self.estado()
+
+        k = self.k0 + self.mejor
+        desfase = (t - self.t0) - k / self.hz        # sin envolver: continuo entre ciclos
+        dt = periodo if self.desviacion is None else max(t - self._t_filtro, 1e-3)
+        a_desv = 1.0 - math.exp(-dt / TAU_DESVIACION)
+        a_desf = 1.0 - math.exp(-dt / TAU_DESFASE)
+        self.desviacion = costo if self.desviacion is None else self.desviacion + a_desv * (costo - self.desviacion)
+        self._desfase = desfase if self._desfase is None else self._desfase + a_desf * (desfase - self._desfase)
+        self._t_filtro = t
+        envuelto = self._envolver(desfase)
+        self._suma_desv += costo
+        self._suma_desfase += envuelto
+        self._p90_desv.agregar(costo)
+        self._p90_desfase.agregar(abs(envuelto))
+        return self.estado()
+
+    def _envolver(self, desfase):
+        d = self.duracion
+        return (desfase + d / 2) % d - d / 2
+
+    def estado(self):
+        if self.desviacion is None:
+            return None
+        k = self.k0 + self.mejor
+        return {"desfase_s": round(self._envolver(self._desfase), 2),
+                "desviacion_deg": round(self.desviacion, 1),
+                "fase": round((k % self.n_ref) / self.n_ref, 3)}
+
+    def resumen(self):
+        """Para las métricas de la sesión."""
+        n = self._p90_desv.n
+        if n == 0:
+            return None
+        return {"desviacion_media_deg": round(self._suma_desv / n, 1),
+                "desviacion_p90_deg": round(self._p90_desv.valor(), 1),
+                "desfase_medio_s": round(self._suma_desfase / n, 2),
+                "desfase_abs_p90_s": round(self._p90_desfase.valor(), 2),
+                "pasos": self.pasos, "reanclajes": self.reanclajes}
@@ -0,0 +1,149 @@
+import datetime
+import time
+
+import cv2
+import numpy as np
+
+from biomecanica import CODO_DER, HOMBRO_DER, TARGETS, TOL, landmarks_a_array, near_targets
+from buffers import PoolBuffers
+from estadisticas import EstadisticasSesion, FiltroOneEuro
+from hud import CompositorHUD
+from instrumentacion import Instrumentacion
+from motor_angulos import MotorAngulos, plano_frontal
+
+META_TEXTO = "90° / 180°"
+
+
+class AnalizadorSesion:
+    """
+    Trabajo por cuadro de la comparación, sin Tk (lo usan la ventana, el benchmark, etc.):
+      inferir(item)  -> pose, ángulos crudos (None sin pose)/suavizados, estados (✓/✗),
+                        estadísticas en línea y alineación con la referencia (si hay `alineador`)
+      componer(item) -> cuadro BGR con esqueleto y panel de datos (buffer del pool: válido
+                        hasta el siguiente componer)
+    `item` es el dict que circula por el pipeline ({"t", "frame", ...}).
+    """
+
+    def __init__(self, inferencia, paciente="", ejercicio="", modo="Flexión",
+                 meta_texto=META_TEXTO, instr=None, alineador=None):
+        self.inferencia = inferencia      # InferenciaAdaptativa o CanalInferencia: .procesar(rgb) -> resultado
+        self.paciente = paciente
+        self.ejercicio = ejercicio
+        self.modo = modo
+        self.meta_texto = meta_texto
+        self.instr = instr if instr is not None else Instrumentacion()
+        self.filtro_flex = FiltroOneEuro()  # suavizado
+        self.filtro_abd = FiltroOneEuro()
+        # repeticiones, ROM, percentiles y tiempo en meta, actualizados cuadro a cuadro
+        self.estadisticas = EstadisticasSesion(modo)
+        self.motor = MotorAngulos()
+        # AlineadorDTW sobre la trayectoria del clip de referencia (None: sin comparación)
+        self.alineador = alineador
+        self.hud = CompositorHUD(paciente, ejercicio, modo, meta_texto)
+        # buffers de cuadro reutilizados (también los usa quien arma el pipeline: captura, pantalla)
+        self.pool = PoolBuffers()
+
+    # ---------------- Inferencia + ángulos ----------------
+    def inferir(self, item):
+        rgb = self.preparar(item)
+        with self.instr.medir("inferencia"):
+            res = self.inferencia.procesar(rgb)
+        return self.completar(item, res)
+
+    # inferir() = preparar() + inferencia + completar(); separadas para quien despacha
+    # la inferencia por su cuenta (lotes de varios clientes en servicio_pose)
+    def preparar(self, item):
+        """Cuadro BGR -> RGB listo para la inferencia (en su memoria compartida si la hay)."""
+        frame = item["frame"]
+        # inferencia en otro proceso: el RGB se escribe directo en su memoria compartida
+        entrada = getattr(self.inferencia, "entrada", None)
+        self.pool.cuadro()
+        with self.instr.medir("rgb"):
+            if entrada is not None:
+                destino = entrada(*frame.shape[:2])
+            else:
+                destino = self.pool.anillo("rgb", frame.shape, n=1)   # procesar() lo usa y lo suelta
+            return self.pool.usado(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=destino), destino)
+
+    def completar(self, item, res):
+        """Resultado de la pose -> ángulos, suavizado, estados, estadísticas y alineación."""
+        instr = self.instr
+        t0 = time.perf_counter()
+        ang_flex, ang_abd = None, None     # sin pose no hay ángulo (no es una lectura de 0°)
+        confianza = 0.0
+        angulos = None
+        # arreglo (33, 4): lo que se graba/analiza después, sin objetos por landmark
+        landmarks = getattr(res, "arreglo", None)
+        if landmarks is None and res.pose_landmarks:
+            landmarks = landmarks_a_array(res.pose_landmarks.landmark)
+        if landmarks is not None:
+            # todas las articulaciones de ambos lados en una pasada
+            angulos = self.motor.a_dict(self.motor.calcular(landmarks))
+            ang_flex = angulos["hombro_der"]
+            ang_abd = ang_flex if plano_frontal(landmarks) else None
+            confianza = 0.5 * float(landmarks[HOMBRO_DER, 3] + landmarks[CODO_DER, 3])
+
+        # Suavizado (sin pose no hay valor: el filtro no promedia ceros y sigue al volver la pose)
+        t = item["t"]
+        if landmarks is not None:
+            s_flex = self.filtro_flex.filtrar(ang_flex, t)
+            s_abd = self.filtro_abd.filtrar(ang_abd, t) if ang_abd is not None else None
+        else:
+            s_flex, s_abd = None, None
+
+        # Estados (verde si cerca de 90° O de 180°); sin pose, ✗: nadie está en la meta
+        estado_flex_ok = s_flex is not None and near_targets(s_flex, targets=TARGETS, tol=TOL)
+        if s_abd is None:
+            estado_abd = "-"
+        else:
+            estado_abd = "✓" if near_targets(s_abd, targets=TARGETS, tol=TOL) else "✗"
+        instr.registrar("angulos", time.perf_counter() - t0)
+
+        with instr.medir("estadisticas"):
+            if landmarks is not None:
+                self.estadisticas.actualizar(t, s_flex, s_abd)
+            repeticiones = self.estadisticas.repeticiones
+
+        alineacion = None
+        if self.alineador is not None:
+            with instr.medir("alineacion"):
+                x = s_flex if self.modo == "Flexión" else s_abd
+                if landmarks is not None and x is not None:
+                    alineacion = self.alineador.agregar(t, x)
+                else:
+                    alineacion = self.alineador.estado()
+
+        item.update({"res": res, "pose": landmarks is not None, "ang_flex": ang_flex, "ang_abd": ang_abd,
+                     "s_flex": s_flex, "s_abd": s_abd, "confianza": confianza,
+                     "landmarks": landmarks, "angulos": angulos, "repeticiones": repeticiones,
+                     "alineacion": alineacion, "estado_flex_ok": estado_flex_ok, "estado_abd": estado_abd})
+        return item
+
+    @staticmethod
+    def muestra(item, t_origen):
+        """
+        item de completar() -> fila de EscritorMuestras. Sin pose los ángulos crudos van
+        NULL y abd_valida = 0; pose distingue "sin pose" de "fuera del plano frontal".
+        """
+        return (item["t"] - t_origen, item["ang_flex"], item["ang_abd"], item["s_flex"], item["s_abd"],
+                int(item["ang_abd"] is not None), item["confianza"], int(item["pose"]))
+
+    # ---------------- Dibujo ----------------
+    def componer(self, item):
+        res = item["res"]
+        instr = self.instr
+        # Dibujar sobre una copia en un buffer del pool (el cuadro de la cámara no se toca)
+        with instr.medir("dibujo"):
+            frame = item["frame"]
+            frame_land = self.pool.anillo("compuesto", frame.shape, n=2)
+            np.copyto(frame_land, frame)
+            if res.pose_landmarks:
+                import mediapipe as mp   # ya cargado por la inferencia; no retrasa el arranque
+                mp.solutions.drawing_utils.draw_landmarks(
+                    frame_land, res.pose_landmarks, mp.solutions.pose.POSE_CONNECTIONS,
+                    mp.solutions.drawing_styles.get_default_pose_landmarks_style())
+
+        # Panel: fondo semitransparente solo en su rectángulo + capa estática en caché + texto dinámico
+        with instr.medir("hud"):
+            self.hud.componer(frame_land, item, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        return frame_land
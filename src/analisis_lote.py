@@ -0,0 +1,209 @@
+"""
+Análisis por lotes (sin interfaz) de grabaciones de sesiones.
+
+Uso:
+    python src/analisis_lote.py carpeta_o_glob [...] --salida resultados --procesos 8
+
+Cada video se divide en tramos de --tramo cuadros que se reparten en un pool
+de procesos; por cada video se escribe una tabla CSV con los ángulos por cuadro.
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from biomecanica import N_LANDMARKS, POSE_PARAMS, landmarks_a_array, near_targets
+from estadisticas import MediaMovil
+from motor_angulos import MotorAngulos, angulos_hombro_lote
+
+PATRON_DEFECTO = "grabacion_*.mp4"
+TRAMO_DEFECTO = 1800      # ~1 min a 30 FPS
+VENTANA_SUAVIZADO = 5     # media móvil: memoria finita, así cada tramo se analiza por separado
+TOLERANCIA_TRAMO_DEG = 2.0   # máx. |tramos - continuo| en los ángulos suavizados (bench: precision.tramos)
+
+MOTOR = MotorAngulos()
+
+# + un ángulo por articulación y lado (hombro_der, codo_izq, ..., tronco).
+# Como en las muestras en vivo: sin pose los ángulos quedan vacíos y pose = 0.
+COLUMNAS = ["cuadro", "t_s", "flexion", "abduccion", "abd_valida", "pose",
+            "flexion_suav", "abduccion_suav", "estado_flex", "estado_abd"] + MOTOR.nombres
+
+
+# ======================= Planificación =======================
+def expandir_entradas(entradas, patron=PATRON_DEFECTO):
+    """Carpetas -> archivos que cumplen `patron`; el resto se trata como glob."""
+    archivos = []
+    for e in entradas:
+        if os.path.isdir(e):
+            archivos.extend(glob.glob(os.path.join(e, patron)))
+        else:
+            archivos.extend(glob.glob(e))
+    return sorted(set(archivos))
+
+
+def planificar_tramos(archivos, tramo=TRAMO_DEFECTO):
+    """Lista de tareas (ruta, inicio, fin, fps) con tramos de a lo más `tramo` cuadros."""
+    tareas = []
+    for ruta in archivos:
+        cap = cv2.VideoCapture(ruta)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        if total <= 0:
+            # sin conteo fiable: un solo tramo hasta el final
+            tareas.append((ruta, 0, None, fps))
+            continue
+        for inicio in range(0, total, tramo):
+            tareas.append((ruta, inicio, min(inicio + tramo, total), fps))
+    return tareas
+
+
+# ======================= Trabajo por tramo =======================
+def analizar_tramo(ruta, inicio, fin, fps, model_complexity=1):
+    """
+    Corre MediaPipe Pose sobre los cuadros [inicio, fin) y devuelve filas de COLUMNAS.
+    Se procesan VENTANA_SUAVIZADO-1 cuadros previos (sin emitirlos) para llenar la
+    media móvil. El resultado en el borde del tramo es aproximadamente igual al del
+    análisis continuo, no idéntico: el seguimiento de MediaPipe arranca de cero (detecta
+    en vez de seguir), así que los landmarks de los primeros cuadros pueden diferir un
+    poco. La diferencia en los ángulos suavizados se mide en el bench (precision.tramos)
+    y debe quedar bajo TOLERANCIA_TRAMO_DEG.
+    Los ángulos de todo el tramo se calculan juntos con el motor vectorizado.
+    """
+    import mediapipe as mp
+
+    previo = max(0, inicio - (VENTANA_SUAVIZADO - 1))
+    cap = cv2.VideoCapture(ruta)
+    if previo:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, previo)
+
+    lms = []
+    sin_pose = np.full((N_LANDMARKS, 4), np.nan, dtype=np.float32)
+    with mp.solutions.pose.Pose(**dict(POSE_PARAMS, model_complexity=model_complexity)) as pose:
+        while fin is None or previo + len(lms) < fin:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            res = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            lms.append(landmarks_a_array(res.pose_landmarks.landmark) if res.pose_landmarks else sin_pose)
+    cap.release()
+    if not lms:
+        return []
+
+    lms = np.stack(lms)
+    con_pose = ~np.isnan(lms[:, 0, 0])
+    articulaciones = MOTOR.calcular(lms)
+    flex, abd = angulos_hombro_lote(lms)
+
+    filas = []
+    media_flex, media_abd = MediaMovil(VENTANA_SUAVIZADO), MediaMovil(VENTANA_SUAVIZADO)
+    for k in range(len(lms)):
+        idx = previo + k
+        # sin pose no hay ángulo (no es una lectura de 0°) y no entra al suavizado
+        ang_flex = float(flex[k]) if con_pose[k] else None
+        ang_abd = None if not con_pose[k] or np.isnan(abd[k]) else float(abd[k])
+        s_flex = media_flex.agregar(ang_flex) if ang_flex is not None else None
+        s_abd = media_abd.agregar(ang_abd) if ang_abd is not None else None
+
+        if idx >= inicio:
+            filas.append([
+                idx, round(idx / fps, 4),
+                "" if ang_flex is None else round(ang_flex, 2), "" if ang_abd is None else round(ang_abd, 2),
+                int(ang_abd is not None), int(con_pose[k]),
+                "" if s_flex is None else round(s_flex, 2), "" if s_abd is None else round(s_abd, 2),
+                int(s_flex is not None and near_targets(s_flex)),
+                "" if s_abd is None else int(near_targets(s_abd)),
+            ] + [round(float(v), 2) if con_pose[k] else "" for v in articulaciones[k]])
+    return filas
+
+
+def _tarea(args):
+    ruta, inicio, fin, fps, complejidad = args
+    return ruta, inicio, analizar_tramo(ruta, inicio, fin, fps, complejidad)
+
+
+def ruta_salida(ruta_video, carpeta_salida):
+    base = os.path.splitext(os.path.basename(ruta_video))[0]
+    return os.path.join(carpeta_salida, f"{base}_angulos.csv")
+
+
+def escribir_tabla(ruta_csv, tramos):
+    """tramos: {inicio: filas}; se escriben en orden de cuadro."""
+    with open(ruta_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNAS)
+        for inicio in sorted(tramos):
+            w.writerows(tramos[inicio])
+
+
+# ======================= Orquestación =======================
+def procesar_lote(archivos, carpeta_salida, procesos=None, tramo=TRAMO_DEFECTO,
+                  model_complexity=1, sobrescribir=False, log=print):
+    os.makedirs(carpeta_salida, exist_ok=True)
+    if not sobrescribir:
+        archivos = [a for a in archivos if not os.path.exists(ruta_salida(a, carpeta_salida))]
+    tareas = planificar_tramos(archivos, tramo)
+    pendientes = Counter(t[0] for t in tareas)  # tramos que faltan por archivo
+    resultados = {a: {} for a in archivos}
+
+    t0 = time.perf_counter()
+    total_cuadros = 0
+    fallidos = []
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = {pool.submit(_tarea, (*t, model_complexity)): t for t in tareas}
+        for fut in as_completed(futuros):
+            ruta = futuros[fut][0]
+            try:
+                _, inicio, filas = fut.result()
+            except Exception as e:
+                if pendientes[ruta] >= 0:       # un archivo cuenta una vez aunque fallen varios tramos
+                    fallidos.append((ruta, str(e)))
+                    log(f"[error] {os.path.basename(ruta)}: {e}")
+                pendientes[ruta] = -1
+                resultados.pop(ruta, None)
+                continue
+            if pendientes[ruta] < 0:
+                continue
+            resultados[ruta][inicio] = filas
+            total_cuadros += len(filas)
+            pendientes[ruta] -= 1
+            if pendientes[ruta] == 0:
+                escribir_tabla(ruta_salida(ruta, carpeta_salida), resultados.pop(ruta))
+                log(f"[ok] {os.path.basename(ruta)}")
+
+    dt = time.perf_counter() - t0
+    log(f"{len(archivos)} archivos, {len(tareas)} tramos, {total_cuadros} cuadros en {dt:.1f} s "
+        f"({total_cuadros / dt if dt > 0 else 0:.1f} cuadros/s)")
+    return {"archivos": len(archivos), "tramos": len(tareas), "cuadros": total_cuadros,
+            "segundos": dt, "fallidos": fallidos}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Análisis por lotes de grabaciones (flexión/abducción por cuadro).")
+    ap.add_argument("entradas", nargs="+", help="carpetas o patrones glob de videos")
+    ap.add_argument("--salida", default="resultados_lote", help="carpeta para las tablas CSV")
+    ap.add_argument("--patron", default=PATRON_DEFECTO, help="patrón de archivos dentro de carpetas")
+    ap.add_argument("--procesos", type=int, default=None, help="procesos del pool (defecto: núcleos)")
+    ap.add_argument("--tramo", type=int, default=TRAMO_DEFECTO, help="cuadros por tramo")
+    ap.add_argument("--complejidad", type=int, default=1, choices=(0, 1, 2), help="model_complexity de Pose")
+    ap.add_argument("--sobrescribir", action="store_true", help="reprocesar aunque exista la tabla")
+    args = ap.parse_args(argv)
+
+    archivos = expandir_entradas(args.entradas, args.patron)
+    if not archivos:
+        print("No se encontraron videos.", file=sys.stderr)
+        return 1
+    r = procesar_lote(archivos, args.salida, args.procesos, args.tramo,
+                      args.complejidad, args.sobrescribir)
+    return 1 if r["fallidos"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
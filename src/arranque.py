@@ -0,0 +1,66 @@
+"""
+Arranque en dos tiempos: el menú aparece primero y lo pesado se prepara detrás.
+
+Precarga importa en un hilo los módulos lentos (mediapipe, PyPDF2/reportlab), crea el
+backend de inferencia con el modelo ya cargado y lo guarda para toda la app: cada
+ventana de comparación lo toma con obtener() en vez de construir su propia Pose.
+Los tiempos de cada paso quedan en `tiempos` (s desde t0, el inicio del programa).
+"""
+import importlib
+import threading
+import time
+
+
+class Precarga:
+    """
+    crear() -> backend de inferencia (InferenciaAdaptativa o ServidorInferencia, ya caliente).
+    modulos: nombres a importar antes de crear el backend.
+    """
+
+    def __init__(self, crear, modulos=(), t0=None):
+        self.crear = crear
+        self.modulos = tuple(modulos)
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.tiempos = {}
+        self.backend = None
+        self.error = None
+        self._listo = threading.Event()
+        self._hilo = threading.Thread(target=self._run, name="precarga", daemon=True)
+
+    def marcar(self, paso):
+        """Registra el instante de `paso` (una sola vez)."""
+        self.tiempos.setdefault(paso, round(time.perf_counter() - self.t0, 3))
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def _run(self):
+        try:
+            for nombre in self.modulos:
+                t = time.perf_counter()
+                importlib.import_module(nombre)
+                self.tiempos[f"import_{nombre}_s"] = round(time.perf_counter() - t, 3)
+            self.marcar("importaciones")
+            self.backend = self.crear()
+            self.marcar("modelo_listo")
+        except Exception as e:
+            self.error = e
+        finally:
+            self._listo.set()
+
+    def listo(self):
+        return self._listo.is_set()
+
+    def obtener(self, timeout=None):
+        """Espera (si hace falta) y devuelve el backend; relanza el error de la precarga."""
+        if not self._listo.wait(timeout):
+            raise RuntimeError("El modelo de pose todavía se está cargando")
+        if self.error is not None:
+            raise RuntimeError(f"No se pudo preparar el modelo de pose: {self.error}")
+        return self.backend
+
+    def cerrar(self, timeout=5.0):
+        self._listo.wait(timeout)
+        if self.backend is not None:
+            self.backend.cerrar()
+            self.backend = None
@@ -0,0 +1,748 @@
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DB_PATH = "pacientes.db"
+
+
+# ======================= Esquema =======================
+def _crear_esquema(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS pasajeros (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        edad INTEGER,
+        sexo TEXT,
+        diagnostico TEXT,
+        fecha TEXT
+    )
+    """)
+    # tabla correcta (compatibilidad con tus datos previos)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS pacientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        edad INTEGER,
+        sexo TEXT,
+        diagnostico TEXT,
+        fecha TEXT
+    )
+    """)
+    # una fila por comparación en tiempo real
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sesiones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        paciente_id INTEGER REFERENCES pacientes(id),
+        paciente TEXT,
+        ejercicio TEXT,
+        modo TEXT,
+        inicio TEXT,
+        fin TEXT,
+        repeticiones TEXT,
+        series TEXT,
+        peso TEXT,
+        n_muestras INTEGER DEFAULT 0
+    )
+    """)
+    _migrar_sesiones(cursor)
+    # repeticiones detectadas en línea (estadisticas.DetectorRepeticiones), t en s desde el inicio
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS repeticiones_sesion (
+        sesion_id INTEGER NOT NULL REFERENCES sesiones(id),
+        n INTEGER NOT NULL,
+        serie INTEGER,
+        inicio REAL,
+        pico REAL,
+        fin REAL,
+        minimo REAL,
+        maximo REAL,
+        rom REAL,
+        t_meta REAL,
+        PRIMARY KEY (sesion_id, n)
+    )
+    """)
+    # serie de tiempo por cuadro (t = segundos desde el inicio de la sesión)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS muestras (
+        sesion_id INTEGER NOT NULL REFERENCES sesiones(id),
+        t REAL NOT NULL,
+        flex REAL,
+        abd REAL,
+        flex_suav REAL,
+        abd_suav REAL,
+        abd_valida INTEGER,
+        confianza REAL,
+        pose INTEGER                    -- 1 pose detectada; 0 sin pose (ángulos crudos NULL)
+    )
+    """)
+    _migrar_muestras(cursor)
+    _crear_resumenes(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_muestras_sesion ON muestras(sesion_id, t)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_paciente ON sesiones(paciente_id, inicio)")
+    # historial ordenado por fecha (paginación por clave) y búsqueda exacta por nombre
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_fecha ON pacientes(fecha, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pacientes_nombre ON pacientes(nombre, fecha)")
+
+
+# Métricas de la sesión (estadisticas.EstadisticasSesion.resumen), agregadas después
+# de la primera versión de la tabla: las bases existentes las reciben con ALTER TABLE.
+COLUMNAS_METRICAS = [
+    ("reps_detectadas", "INTEGER"),
+    ("series_detectadas", "INTEGER"),
+    ("rom_max", "REAL"),
+    ("rom_medio", "REAL"),
+    ("angulo_max", "REAL"),
+    ("angulo_p50", "REAL"),
+    ("angulo_p90", "REAL"),
+    ("angulo_p95", "REAL"),
+    ("t_meta_90_s", "REAL"),
+    ("t_meta_180_s", "REAL"),
+    ("t_activo_s", "REAL"),
+]
+
+
+def _migrar_sesiones(cursor):
+    existentes = {f[1] for f in cursor.execute("PRAGMA table_info(sesiones)")}
+    for nombre, tipo in COLUMNAS_METRICAS + [("resumida", "INTEGER DEFAULT 0")]:
+        if nombre not in existentes:
+            cursor.execute(f"ALTER TABLE sesiones ADD COLUMN {nombre} {tipo}")
+    # sesiones con métricas que todavía no se sumaron a los resúmenes (índice parcial: casi vacío)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_pendientes ON sesiones(id) WHERE resumida = 0")
+
+
+def _migrar_muestras(cursor):
+    """Bases anteriores a la columna pose: sus muestras quedan con pose NULL (desconocido)."""
+    if "pose" not in {f[1] for f in cursor.execute("PRAGMA table_info(muestras)")}:
+        cursor.execute("ALTER TABLE muestras ADD COLUMN pose INTEGER")
+
+
+def metricas_a_columnas(m):
+    """Resumen de EstadisticasSesion -> valores en el orden de COLUMNAS_METRICAS."""
+    p, meta = m.get("percentiles", {}), m.get("t_meta_s", {})
+    return (m.get("repeticiones"), m.get("series"), m.get("rom_max"), m.get("rom_medio"),
+            m.get("angulo_max"), p.get("50"), p.get("90"), p.get("95"),
+            meta.get("90"), meta.get("180"), m.get("t_activo_s"))
+
+
+def _metricas_de_fila(modo, valores, reps):
+    """Inverso de metricas_a_columnas (mismo formato que EstadisticasSesion.resumen)."""
+    (n_reps, series, rom_max, rom_medio, angulo_max, p50, p90, p95,
+     meta_90, meta_180, t_activo) = valores
+    return {"modo": modo, "repeticiones": n_reps, "series": series, "rom_max": rom_max,
+            "rom_medio": rom_medio, "angulo_max": angulo_max,
+            "percentiles": {"50": p50, "90": p90, "95": p95},
+            "t_meta_s": {"90": meta_90, "180": meta_180}, "t_activo_s": t_activo, "reps": reps}
+
+
+# ======================= Resúmenes de progreso =======================
+def _crear_resumenes(cursor):
+    """
+    Resúmenes por paciente/ejercicio/modo (por día, por semana de tratamiento y
+    acumulado) y por cohorte y semana, que se actualizan al cerrar cada sesión
+    (_acumular_resumen), para las curvas de progreso y las comparaciones entre cohortes
+    sin recorrer sesiones ni muestras. El paciente es el nombre (como en sesiones); paciente_id es su registro
+    más reciente, de donde salen diagnóstico, edad y sexo para las cohortes. La semana
+    se cuenta desde el primer día del paciente en ese ejercicio al momento de sumar
+    (las sesiones se cierran en orden; la puesta al día las recorre por inicio).
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resumen_diario (
+        paciente TEXT NOT NULL,
+        ejercicio TEXT NOT NULL,
+        modo TEXT NOT NULL,
+        dia TEXT NOT NULL,
+        semana INTEGER NOT NULL,        -- semanas desde el primer día del paciente en este ejercicio
+        sesiones INTEGER NOT NULL,
+        reps INTEGER NOT NULL,
+        suma_rom REAL NOT NULL,         -- suma del ROM de las repeticiones (rom_medio * reps)
+        rom_max REAL,
+        angulo_max REAL,
+        t_activo_s REAL NOT NULL,
+        t_meta_90_s REAL NOT NULL,
+        t_meta_180_s REAL NOT NULL,
+        PRIMARY KEY (paciente, ejercicio, modo, dia)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resumen_paciente (
+        paciente TEXT NOT NULL,
+        ejercicio TEXT NOT NULL,
+        modo TEXT NOT NULL,
+        paciente_id INTEGER,
+        sesiones INTEGER NOT NULL,
+        dias INTEGER NOT NULL,
+        primer_dia TEXT NOT NULL,
+        ultimo_dia TEXT NOT NULL,
+        reps INTEGER NOT NULL,
+        suma_rom REAL NOT NULL,
+        rom_max REAL,
+        rom_max_inicial REAL,           -- ROM máx del primer día
+        rom_max_reciente REAL,          -- ROM máx del último día
+        t_activo_s REAL NOT NULL,
+        PRIMARY KEY (paciente, ejercicio, modo)
+    ) WITHOUT ROWID
+    """)
+    # lo que leen las curvas de cohortes: una fila por paciente y semana de tratamiento
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resumen_semanal (
+        paciente TEXT NOT NULL,
+        ejercicio TEXT NOT NULL,
+        modo TEXT NOT NULL,
+        semana INTEGER NOT NULL,
+        sesiones INTEGER NOT NULL,
+        reps INTEGER NOT NULL,
+        suma_rom REAL NOT NULL,
+        rom_max REAL,
+        PRIMARY KEY (paciente, ejercicio, modo, semana)
+    ) WITHOUT ROWID
+    """)
+    # curvas de cohortes ya agregadas: grupo (registro del paciente al cerrar la sesión) x semana
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resumen_cohorte (
+        ejercicio TEXT NOT NULL,
+        modo TEXT NOT NULL,
+        diagnostico TEXT NOT NULL,
+        sexo TEXT NOT NULL,
+        edad INTEGER NOT NULL,          -- década (40 = 40-49; -1 sin edad)
+        semana INTEGER NOT NULL,
+        pacientes INTEGER NOT NULL,     -- pacientes activos esa semana
+        sesiones INTEGER NOT NULL,
+        reps INTEGER NOT NULL,
+        suma_rom REAL NOT NULL,
+        n_rom_max INTEGER NOT NULL,     -- pacientes con ROM máx esa semana
+        suma_rom_max REAL NOT NULL,     -- suma del ROM máx semanal de cada paciente
+        PRIMARY KEY (ejercicio, modo, diagnostico, sexo, edad, semana)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resumen_paciente_id ON resumen_paciente(paciente_id)")
+    # bases anteriores a los resúmenes (o una sesión que no llegó a sumarse): ponerse al día
+    pendientes = cursor.execute(
+        "SELECT id FROM sesiones WHERE resumida = 0 AND reps_detectadas IS NOT NULL AND fin IS NOT NULL "
+        "ORDER BY inicio, id").fetchall()
+    for (sesion_id,) in pendientes:
+        _acumular_resumen(cursor, sesion_id)
+
+
+def _acumular_resumen(cursor, sesion_id):
+    """
+    Suma una sesión cerrada (con métricas) a resumen_paciente, resumen_diario,
+    resumen_semanal y resumen_cohorte.
+    Cada sesión se suma una sola vez (sesiones.resumida); va en la misma transacción
+    que el cierre de la sesión. Devuelve False si no había nada que sumar.
+    """
+    if cursor.execute("UPDATE sesiones SET resumida = 1 WHERE id = ? AND resumida = 0 "
+                      "AND reps_detectadas IS NOT NULL", (sesion_id,)).rowcount == 0:
+        return False
+    fila = cursor.execute("""
+        SELECT COALESCE(paciente, ''), COALESCE(ejercicio, ''), COALESCE(modo, ''), substr(inicio, 1, 10),
+               paciente_id, reps_detectadas, COALESCE(rom_medio, 0) * reps_detectadas, rom_max,
+               angulo_max, COALESCE(t_activo_s, 0), COALESCE(t_meta_90_s, 0), COALESCE(t_meta_180_s, 0)
+        FROM sesiones WHERE id = ?
+    """, (sesion_id,)).fetchone()
+    v = dict(zip(("paciente", "ejercicio", "modo", "dia", "paciente_id", "reps", "suma_rom", "rom_max",
+                  "angulo_max", "t_activo_s", "t_meta_90_s", "t_meta_180_s"), fila))
+    clave = (v["paciente"], v["ejercicio"], v["modo"], v["dia"])
+    v["dia_nuevo"] = int(cursor.execute(
+        "SELECT 1 FROM resumen_diario WHERE paciente = ? AND ejercicio = ? AND modo = ? AND dia = ?",
+        clave).fetchone() is None)
+    # MAX(a, NULL) es NULL en SQLite: el COALESCE deja el valor que haya
+    cursor.execute("""
+        INSERT INTO resumen_paciente (paciente, ejercicio, modo, paciente_id, sesiones, dias, primer_dia,
+                                      ultimo_dia, reps, suma_rom, rom_max, rom_max_inicial,
+                                      rom_max_reciente, t_activo_s)
+        VALUES (:paciente, :ejercicio, :modo, :paciente_id, 1, 1, :dia, :dia, :reps, :suma_rom,
+                :rom_max, :rom_max, :rom_max, :t_activo_s)
+        ON CONFLICT (paciente, ejercicio, modo) DO UPDATE SET
+            paciente_id = COALESCE(excluded.paciente_id, paciente_id),
+            sesiones = sesiones + 1,
+            dias = dias + :dia_nuevo,
+            primer_dia = MIN(primer_dia, excluded.primer_dia),
+            ultimo_dia = MAX(ultimo_dia, excluded.ultimo_dia),
+            reps = reps + excluded.reps,
+            suma_rom = suma_rom + excluded.suma_rom,
+            rom_max = MAX(COALESCE(rom_max, excluded.rom_max), COALESCE(excluded.rom_max, rom_max)),
+            rom_max_inicial = CASE
+                WHEN excluded.primer_dia < primer_dia THEN excluded.rom_max
+                WHEN excluded.primer_dia = primer_dia
+                    THEN MAX(COALESCE(rom_max_inicial, excluded.rom_max), COALESCE(excluded.rom_max, rom_max_inicial))
+                ELSE rom_max_inicial END,
+            rom_max_reciente = CASE
+                WHEN excluded.ultimo_dia > ultimo_dia THEN excluded.rom_max
+                WHEN excluded.ultimo_dia = ultimo_dia
+                    THEN MAX(COALESCE(rom_max_reciente, excluded.rom_max), COALESCE(excluded.rom_max, rom_max_reciente))
+                ELSE rom_max_reciente END,
+            t_activo_s = t_activo_s + excluded.t_activo_s
+    """, v)
+    v["semana"] = cursor.execute("""
+        SELECT CAST((julianday(:dia) - julianday(primer_dia)) / 7 AS INTEGER) FROM resumen_paciente
+        WHERE paciente = :paciente AND ejercicio = :ejercicio AND modo = :modo
+    """, v).fetchone()[0]
+    cursor.execute("""
+        INSERT INTO resumen_diario (paciente, ejercicio, modo, dia, semana, sesiones, reps, suma_rom, rom_max,
+                                    angulo_max, t_activo_s, t_meta_90_s, t_meta_180_s)
+        VALUES (:paciente, :ejercicio, :modo, :dia, :semana, 1, :reps, :suma_rom, :rom_max, :angulo_max, :t_activo_s, :t_meta_90_s, :t_meta_180_s)
+        ON CONFLICT (paciente, ejercicio, modo, dia) DO UPDATE SET
+            sesiones = sesiones + 1,
+            reps = reps + excluded.reps,
+            suma_rom = suma_rom + excluded.suma_rom,
+            rom_max = MAX(COALESCE(rom_max, excluded.rom_max), COALESCE(excluded.rom_max, rom_max)),
+            angulo_max = MAX(COALESCE(angulo_max, excluded.angulo_max), COALESCE(excluded.angulo_max, angulo_max)),
+            t_activo_s = t_activo_s + excluded.t_activo_s,
+            t_meta_90_s = t_meta_90_s + excluded.t_meta_90_s,
+            t_meta_180_s = t_meta_180_s + excluded.t_meta_180_s
+    """, v)
+    previo = cursor.execute("""
+        SELECT rom_max FROM resumen_semanal
+        WHERE paciente = :paciente AND ejercicio = :ejercicio AND modo = :modo AND semana = :semana
+    """, v).fetchone()
+    cursor.execute("""
+        INSERT INTO resumen_semanal (paciente, ejercicio, modo, semana, sesiones, reps, suma_rom, rom_max)
+        VALUES (:paciente, :ejercicio, :modo, :semana, 1, :reps, :suma_rom, :rom_max)
+        ON CONFLICT (paciente, ejercicio, modo, semana) DO UPDATE SET
+            sesiones = sesiones + 1,
+            reps = reps + excluded.reps,
+            suma_rom = suma_rom + excluded.suma_rom,
+            rom_max = MAX(COALESCE(rom_max, excluded.rom_max), COALESCE(excluded.rom_max, rom_max))
+    """, v)
+    demografia = None if v["paciente_id"] is None else cursor.execute(
+        "SELECT COALESCE(diagnostico, ''), COALESCE(sexo, ''), COALESCE((edad / 10) * 10, -1) "
+        "FROM pacientes WHERE id = ?", (v["paciente_id"],)).fetchone()
+    if demografia is not None:
+        # cada paciente aporta a la semana una vez y su ROM máx semanal; si la semana mejora
+        # se suma solo la diferencia (el promedio sigue siendo por paciente, no por sesión)
+        anterior = None if previo is None else previo[0]
+        maximo = max([m for m in (anterior, v["rom_max"]) if m is not None], default=None)
+        v.update(zip(("diagnostico", "sexo", "edad"), demografia))
+        v["paciente_nuevo"] = int(previo is None)
+        v["n_rom_max"] = int(anterior is None and maximo is not None)
+        v["delta_rom_max"] = 0.0 if maximo is None else maximo - (anterior or 0.0)
+        cursor.execute("""
+            INSERT INTO resumen_cohorte (ejercicio, modo, diagnostico, sexo, edad, semana, pacientes, sesiones,
+                                         reps, suma_rom, n_rom_max, suma_rom_max)
+            VALUES (:ejercicio, :modo, :diagnostico, :sexo, :edad, :semana, :paciente_nuevo, 1, :reps,
+                    :suma_rom, :n_rom_max, :delta_rom_max)
+            ON CONFLICT (ejercicio, modo, diagnostico, sexo, edad, semana) DO UPDATE SET
+                pacientes = pacientes + excluded.pacientes,
+                sesiones = sesiones + 1,
+                reps = reps + excluded.reps,
+                suma_rom = suma_rom + excluded.suma_rom,
+                n_rom_max = n_rom_max + excluded.n_rom_max,
+                suma_rom_max = suma_rom_max + excluded.suma_rom_max
+        """, v)
+    return True
+
+
+# Agrupaciones de las cohortes (sobre el registro del paciente); edad en décadas (40 = 40-49),
+# igual que las columnas de resumen_cohorte
+AGRUPACIONES = {
+    "diagnostico": "COALESCE(p.diagnostico, '')",
+    "sexo": "COALESCE(p.sexo, '')",
+    "edad": "COALESCE((p.edad / 10) * 10, -1)",
+}
+
+
+def _crear_fts(cursor):
+    """
+    Índice FTS5 (contenido externo = pacientes) sincronizado por triggers.
+    Devuelve False si este SQLite no trae FTS5 (la búsqueda cae a LIKE).
+    """
+    try:
+        existia = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'pacientes_fts'").fetchone() is not None
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS pacientes_fts USING fts5(
+            nombre, diagnostico, content='pacientes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """)
+    except sqlite3.OperationalError:
+        return False
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS pacientes_ai AFTER INSERT ON pacientes BEGIN
+        INSERT INTO pacientes_fts(rowid, nombre, diagnostico) VALUES (new.id, new.nombre, new.diagnostico);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS pacientes_ad AFTER DELETE ON pacientes BEGIN
+        INSERT INTO pacientes_fts(pacientes_fts, rowid, nombre, diagnostico)
+        VALUES ('delete', old.id, old.nombre, old.diagnostico);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS pacientes_au AFTER UPDATE ON pacientes BEGIN
+        INSERT INTO pacientes_fts(pacientes_fts, rowid, nombre, diagnostico)
+        VALUES ('delete', old.id, old.nombre, old.diagnostico);
+        INSERT INTO pacientes_fts(rowid, nombre, diagnostico) VALUES (new.id, new.nombre, new.diagnostico);
+    END
+    """)
+    if not existia:
+        # bases anteriores a la búsqueda: indexar lo que ya había
+        cursor.execute("INSERT INTO pacientes_fts(pacientes_fts) VALUES ('rebuild')")
+    return True
+
+
+def consulta_fts(texto):
+    """'ana  lóp' -> '"ana"* "lóp"*' (prefijos, todas las palabras; sin sintaxis FTS del usuario)."""
+    palabras = [p.replace('"', '""') for p in texto.split()]
+    return " ".join(f'"{p}"*' for p in palabras)
+
+
+# ======================= Acceso a datos =======================
+class BaseDatos:
+    """
+    Conexión única y compartida de la app (WAL). Las llamadas se serializan con un
+    lock, así que se puede usar desde el hilo de Tk y desde hilos de trabajo.
+    El escritor de muestras usa su propia conexión (WAL permite leer mientras escribe).
+    """
+
+    COLUMNAS_PACIENTE = "p.id, p.nombre, p.edad, p.sexo, p.diagnostico, p.fecha"
+
+    def __init__(self, ruta=DB_PATH):
+        self.ruta = ruta
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            cursor = self.conn.cursor()
+            # WAL: los lectores (historial, reportes) no bloquean al escritor de muestras
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            _crear_esquema(cursor)
+            self.fts = _crear_fts(cursor)
+            self.conn.commit()
+
+    def cerrar(self):
+        with self._lock:
+            self.conn.close()
+
+    # ---------------- Pacientes ----------------
+    def guardar_paciente(self, nombre, edad, sexo, diagnostico, fecha):
+        with self._lock:
+            cur = self.conn.execute("""
+                INSERT INTO pacientes (nombre, edad, sexo, diagnostico, fecha)
+                VALUES (?, ?, ?, ?, ?)
+            """, (nombre, edad, sexo, diagnostico, fecha))
+            self.conn.commit()
+            return cur.lastrowid
+
+    def buscar_paciente_id(self, nombre):
+        """Id del registro más reciente con ese nombre (o None si no está registrado)."""
+        with self._lock:
+            fila = self.conn.execute(
+                "SELECT id FROM pacientes WHERE nombre = ? ORDER BY fecha DESC LIMIT 1",
+                (nombre,)).fetchone()
+        return fila[0] if fila else None
+
+    def _filtro(self, texto):
+        """(JOIN, WHERE, parámetros) para el texto de búsqueda."""
+        texto = (texto or "").strip()
+        if not texto:
+            return "", "1", []
+        if self.fts:
+            return ("JOIN pacientes_fts f ON f.rowid = p.id", "pacientes_fts MATCH ?",
+                    [consulta_fts(texto)])
+        like = f"%{texto}%"
+        return "", "(p.nombre LIKE ? OR p.diagnostico LIKE ?)", [like, like]
+
+    def contar_pacientes(self, texto=""):
+        join, where, params = self._filtro(texto)
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT COUNT(*) FROM pacientes p {join} WHERE {where}", params).fetchone()[0]
+
+    def pagina_pacientes(self, texto="", despues_de=None, limite=200):
+        """
+        Pacientes del más reciente al más antiguo, de a `limite`.
+        Paginación por clave: `despues_de` = (fecha, id) de la última fila ya mostrada,
+        así cada página cuesta lo mismo sin importar cuán abajo esté (sin OFFSET).
+        Filas: (id, nombre, edad, sexo, diagnostico, fecha).
+        """
+        join, where, params = self._filtro(texto)
+        if despues_de is not None:
+            where += " AND (p.fecha, p.id) < (?, ?)"
+            params = params + list(despues_de)
+        sql = (f"SELECT {self.COLUMNAS_PACIENTE} FROM pacientes p {join} WHERE {where} "
+               f"ORDER BY p.fecha DESC, p.id DESC LIMIT ?")
+        with self._lock:
+            return self.conn.execute(sql, params + [limite]).fetchall()
+
+    # ---------------- Sesiones ----------------
+    def crear_sesion(self, paciente, ejercicio, modo, inicio, repeticiones="", series="", peso=""):
+        paciente_id = self.buscar_paciente_id(paciente)
+        with self._lock:
+            cur = self.conn.execute("""
+                INSERT INTO sesiones (paciente_id, paciente, ejercicio, modo, inicio, repeticiones, series, peso)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (paciente_id, paciente, ejercicio, modo, inicio, repeticiones, series, peso))
+            self.conn.commit()
+            return cur.lastrowid
+
+    def sesiones_para_reporte(self, desde=None, hasta=None, paciente=None):
+        """
+        Sesiones con inicio en [desde, hasta) como dicts listos para reportes.render_overlay.
+        Los ángulos son los últimos suavizados de la serie (lo mismo que exporta la ventana);
+        `metricas` son las guardadas al cerrar la sesión (None en sesiones anteriores a ellas).
+        """
+        where, params = ["1"], []
+        if desde:
+            where.append("s.inicio >= ?")
+            params.append(desde)
+        if hasta:
+            where.append("s.inicio < ?")
+            params.append(hasta)
+        if paciente:
+            where.append("s.paciente = ?")
+            params.append(paciente)
+        sql = f"""
+            SELECT s.id, s.paciente, p.edad, COALESCE(s.fin, s.inicio), s.ejercicio,
+                   s.repeticiones, s.series, s.peso,
+                   (SELECT m.flex_suav FROM muestras m WHERE m.sesion_id = s.id ORDER BY m.t DESC LIMIT 1),
+                   (SELECT m.abd_suav FROM muestras m WHERE m.sesion_id = s.id ORDER BY m.t DESC LIMIT 1),
+                   s.modo, {", ".join("s." + c for c, _ in COLUMNAS_METRICAS)}
+            FROM sesiones s LEFT JOIN pacientes p ON p.id = s.paciente_id
+            WHERE {" AND ".join(where)}
+            ORDER BY s.inicio, s.id
+        """
+        with self._lock:
+            filas = self.conn.execute(sql, params).fetchall()
+            reps = self._repeticiones([f[0] for f in filas if f[11] is not None])
+        return [{
+            "sesion_id": f[0], "paciente": f[1], "edad": "" if f[2] is None else f[2], "fecha": f[3],
+            "ejercicio": f[4], "repeticiones": f[5] or "", "series": f[6] or "", "peso": f[7] or "",
+            "comparacion": {"Flexión": 0.0 if f[8] is None else round(f[8], 1),
+                            "Abducción": 0.0 if f[9] is None else round(f[9], 1)},
+            "metricas": None if f[11] is None else _metricas_de_fila(f[10], f[11:], reps.get(f[0], [])),
+        } for f in filas]
+
+    def serie_sesion(self, sesion_id):
+        """
+        (t, flexión, abducción) suavizadas de la sesión como arreglos; NaN donde no hubo valor.
+        Sin pose la flexión suavizada guardada es la última mantenida: también va NaN, así
+        la gráfica corta la línea en vez de dibujar un tramo plano.
+        """
+        with self._lock:
+            filas = self.conn.execute("""
+                SELECT t, CASE WHEN pose = 0 THEN NULL ELSE flex_suav END,
+                       CASE WHEN pose = 0 THEN NULL ELSE abd_suav END
+                FROM muestras WHERE sesion_id = ? ORDER BY t
+            """, (sesion_id,)).fetchall()
+        a = np.array(filas, dtype=np.float64).reshape(-1, 3)
+        return a[:, 0], a[:, 1], a[:, 2]
+
+    def _repeticiones(self, sesion_ids):
+        """{sesion_id: [rep, ...]} de repeticiones_sesion (con el lock tomado)."""
+        por_sesion = {}
+        for i in range(0, len(sesion_ids), 500):
+            lote = sesion_ids[i:i + 500]
+            filas = self.conn.execute(f"""
+                SELECT sesion_id, n, serie, inicio, pico, fin, minimo, maximo, rom, t_meta
+                FROM repeticiones_sesion WHERE sesion_id IN ({",".join("?" * len(lote))})
+                ORDER BY sesion_id, n
+            """, lote).fetchall()
+            for r in filas:
+                por_sesion.setdefault(r[0], []).append(dict(zip(
+                    ("n", "serie", "inicio", "pico", "fin", "minimo", "maximo", "rom", "t_meta"), r[1:])))
+        return por_sesion
+
+    # ---------------- Progreso y cohortes ----------------
+    COLUMNAS_DIA = ("dia", "semana", "ejercicio", "modo", "sesiones", "reps", "rom_max", "rom_medio",
+                    "angulo_max", "t_activo_s", "t_meta_90_s", "t_meta_180_s")
+
+    def progreso_paciente(self, paciente, ejercicio=None, modo=None):
+        """Curva de progreso de un paciente: una fila por día (y ejercicio/modo) de resumen_diario."""
+        where, params = ["paciente = ?"], [paciente]
+        if ejercicio is not None:
+            where.append("ejercicio = ?")
+            params.append(ejercicio)
+        if modo is not None:
+            where.append("modo = ?")
+            params.append(modo)
+        sql = f"""
+            SELECT dia, semana, ejercicio, modo, sesiones, reps, rom_max,
+                   CASE WHEN reps > 0 THEN round(suma_rom / reps, 1) END,
+                   angulo_max, t_activo_s, t_meta_90_s, t_meta_180_s
+            FROM resumen_diario WHERE {" AND ".join(where)}
+            ORDER BY ejercicio, modo, dia
+        """
+        with self._lock:
+            filas = self.conn.execute(sql, params).fetchall()
+        return [dict(zip(self.COLUMNAS_DIA, f)) for f in filas]
+
+    @staticmethod
+    def _cohorte(por, filtros):
+        """(agrupaciones validadas, WHERE, parámetros); filtros: [(condición, valor)], sin los None."""
+        por = (por,) if isinstance(por, str) else tuple(por or ())
+        desconocidas = [g for g in por if g not in AGRUPACIONES]
+        if desconocidas:
+            raise ValueError(f"Agrupación desconocida: {', '.join(desconocidas)} "
+                             f"(válidas: {', '.join(AGRUPACIONES)})")
+        filtros = [(c, v) for c, v in filtros if v is not None]
+        return por, " AND ".join(["1"] + [c for c, _ in filtros]), [v for _, v in filtros]
+
+    def comparar_cohortes(self, por="diagnostico", ejercicio=None, modo=None, diagnostico=None,
+                          sexo=None, edad_min=None, edad_max=None):
+        """
+        Una fila por grupo (`por`: "diagnostico", "sexo", "edad" o una tupla de ellas) sobre
+        resumen_paciente y el registro actual de cada paciente: pacientes, sesiones, reps,
+        ROM medio por repetición, ROM máx medio por paciente y mejora media (ROM máx del
+        último día - el del primero, pacientes con más de un día). Solo pacientes registrados.
+        """
+        por, where, params = self._cohorte(por, [
+            ("r.ejercicio = ?", ejercicio), ("r.modo = ?", modo),
+            ("p.diagnostico = ? COLLATE NOCASE", diagnostico), ("p.sexo = ? COLLATE NOCASE", sexo),
+            ("p.edad >= ?", edad_min), ("p.edad <= ?", edad_max)])
+        grupos = [AGRUPACIONES[g] for g in por]
+        cols = "".join(f"{g}, " for g in grupos)
+        sql = f"""
+            SELECT {cols}COUNT(DISTINCT r.paciente), SUM(r.sesiones), SUM(r.reps),
+                   round(SUM(r.suma_rom) / NULLIF(SUM(r.reps), 0), 1), round(AVG(r.rom_max), 1),
+                   round(AVG(CASE WHEN r.dias > 1 THEN r.rom_max_reciente - r.rom_max_inicial END), 1),
+                   round(AVG(r.dias), 1)
+            FROM resumen_paciente r JOIN pacientes p ON p.id = r.paciente_id
+            WHERE {where}
+            {"GROUP BY " + ", ".join(grupos) + " ORDER BY " + ", ".join(grupos) if grupos else ""}
+        """
+        with self._lock:
+            filas = self.conn.execute(sql, params).fetchall()
+        claves = por + ("pacientes", "sesiones", "reps", "rom_medio", "rom_max_medio", "mejora_rom_max", "dias_medio")
+        return [dict(zip(claves, f)) for f in filas]
+
+    def curva_cohorte(self, por=(), ejercicio=None, modo=None, diagnostico=None, sexo=None,
+                      edad_min=None, edad_max=None):
+        """
+        Progreso de una cohorte por semana de tratamiento (semana 0 = primera del paciente en
+        ese ejercicio), desde resumen_cohorte: pacientes activos, ROM máx semanal medio por
+        paciente y ROM medio por repetición. Con `por`, una curva por grupo. La edad se
+        filtra por décadas (entra toda década que toque [edad_min, edad_max]).
+        """
+        por, where, params = self._cohorte(por, [
+            ("ejercicio = ?", ejercicio), ("modo = ?", modo),
+            ("diagnostico = ? COLLATE NOCASE", diagnostico), ("sexo = ? COLLATE NOCASE", sexo),
+            ("edad + 9 >= ?", edad_min), ("edad <= ?", edad_max)])
+        cols = "".join(f"{g}, " for g in por)
+        sql = f"""
+            SELECT {cols}semana, SUM(pacientes), round(SUM(suma_rom_max) / NULLIF(SUM(n_rom_max), 0), 1),
+                   round(SUM(suma_rom) / NULLIF(SUM(reps), 0), 1), SUM(sesiones)
+            FROM resumen_cohorte WHERE {where}
+            GROUP BY {cols}semana ORDER BY {cols}semana
+        """
+        with self._lock:
+            filas = self.conn.execute(sql, params).fetchall()
+        claves = por + ("semana", "pacientes", "rom_max_medio", "rom_medio", "sesiones")
+        return [dict(zip(claves, f)) for f in filas]
+
+
+# ======================= Escritor en segundo plano =======================
+class EscritorMuestras:
+    """
+    Hilo que inserta muestras por lotes (executemany, WAL, synchronous=NORMAL).
+    agregar() nunca bloquea el loop de captura: si el disco se atrasa y la cola
+    se llena, la muestra se descarta y se cuenta. Si SQLite falla a mitad de la
+    sesión, el error queda en `error`, lo pendiente se descarta y no se aceptan
+    más muestras.
+    Muestra = (t, flex, abd, flex_suav, abd_suav, abd_valida, confianza, pose)
+    (AnalizadorSesion.muestra).
+    """
+
+    SQL = """INSERT INTO muestras (sesion_id, t, flex, abd, flex_suav, abd_suav, abd_valida, confianza, pose)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+    def __init__(self, sesion_id, ruta=DB_PATH, lote=500, intervalo=0.5, max_pendientes=200_000):
+        self.sesion_id = sesion_id
+        self.ruta = ruta
+        self.lote = lote
+        self.intervalo = intervalo
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._fin = threading.Event()
+        self.escritas = 0
+        self.descartadas = 0
+        self.error = None
+        self._hilo = threading.Thread(target=self._loop, name="escritor-muestras", daemon=True)
+        self._hilo.start()
+
+    def agregar(self, muestra):
+        if self.error is not None:
+            self.descartadas += 1
+            return
+        try:
+            self._cola.put_nowait((self.sesion_id,) + tuple(muestra))
+        except queue.Full:
+            self.descartadas += 1
+
+    def _loop(self):
+        conn = sqlite3.connect(self.ruta)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        filas = []
+        try:
+            while not (self._fin.is_set() and self._cola.empty()):
+                filas = self._tomar_lote()
+                if filas:
+                    conn.executemany(self.SQL, filas)
+                    conn.commit()
+                    self.escritas += len(filas)
+        except sqlite3.Error as e:
+            self.error = e
+            self.descartadas += len(filas)     # el lote que falló
+            while True:
+                try:
+                    self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                self.descartadas += 1
+        finally:
+            conn.close()
+
+    def _tomar_lote(self):
+        """Espera la primera muestra y junta hasta `lote` o hasta que pase `intervalo`."""
+        try:
+            filas = [self._cola.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(filas) < self.lote:
+            restante = limite - time.monotonic()
+            try:
+                filas.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return filas
+
+    def cerrar(self, fin, metricas=None, timeout=10.0):
+        """
+        Vacía la cola, termina el hilo y cierra la sesión (fin, n_muestras y, si se dan,
+        las métricas de EstadisticasSesion con sus repeticiones, sumadas también a los
+        resúmenes de progreso) en una sola transacción.
+        Devuelve None, o el sqlite3.Error que dejó la serie incompleta: en ese caso solo
+        se anota `fin` (sin n_muestras, métricas ni resúmenes).
+        """
+        self._fin.set()
+        self._hilo.join(timeout)
+        conn = sqlite3.connect(self.ruta)
+        try:
+            if self.error is not None:
+                conn.execute("UPDATE sesiones SET fin = ? WHERE id = ?", (fin, self.sesion_id))
+                conn.commit()
+                return self.error
+            conn.execute("UPDATE sesiones SET fin = ?, n_muestras = ? WHERE id = ?",
+                         (fin, self.escritas, self.sesion_id))
+            if metricas is not None:
+                columnas = ", ".join(f"{c} = ?" for c, _ in COLUMNAS_METRICAS)
+                conn.execute(f"UPDATE sesiones SET {columnas} WHERE id = ?",
+                             metricas_a_columnas(metricas) + (self.sesion_id,))
+                conn.executemany("""
+                    INSERT OR REPLACE INTO repeticiones_sesion
+                        (sesion_id, n, serie, inicio, pico, fin, minimo, maximo, rom, t_meta)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(self.sesion_id, r["n"], r["serie"], r["inicio"], r["pico"], r["fin"],
+                       r["minimo"], r["maximo"], r["rom"], r["t_meta"]) for r in metricas.get("reps", [])])
+                _acumular_resumen(conn.cursor(), self.sesion_id)
+            conn.commit()
+        except sqlite3.Error as e:
+            if self.error is None:
+                self.error = e
+        finally:
+            conn.close()
+        return self.error
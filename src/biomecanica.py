@@ -0,0 +1,87 @@
+import numpy as np
+
+
+# Umbral para considerar movimiento lateral "válido" (reduce falsos en abducción)
+PLANE_RATIO_THRESH = 1.2  # |Δx| / (|Δz|+eps)
+
+# metas fijas: 90° y 180°
+TARGETS = (90.0, 180.0)
+TOL = 10.0
+
+# Parámetros de MediaPipe Pose usados en vivo y en análisis fuera de línea
+POSE_PARAMS = {
+    "static_image_mode": False,
+    "model_complexity": 1,
+    "enable_segmentation": False,
+    "min_detection_confidence": 0.5,
+    "min_tracking_confidence": 0.5,
+}
+
+N_LANDMARKS = 33
+
+# Lado derecho (12 hombro, 14 codo)
+HOMBRO_DER = 12
+CODO_DER = 14
+
+
+# ======================= Utilidades =======================
+def angle_from_vertical_deg(p_shoulder_xy, p_elbow_xy) -> float:
+    """
+    Ángulo del brazo respecto a la vertical hacia abajo (eje +Y de imagen):
+    - Brazo colgando: 0°
+    - Horizontal: ~90°
+    - Arriba: ~180°
+    """
+    sx, sy = p_shoulder_xy
+    ex, ey = p_elbow_xy
+    v = np.array([ex - sx, ey - sy], dtype=float)
+    n = np.linalg.norm(v)
+    if n < 1e-9:
+        return 0.0
+    v /= n
+    down = np.array([0.0, 1.0], dtype=float)  # +Y apunta hacia abajo en imagen
+    cosang = float(np.clip(np.dot(v, down), -1.0, 1.0))
+    ang = float(np.degrees(np.arccos(cosang)))
+    return float(np.clip(ang, 0.0, 180.0))
+
+
+def near_targets(angle: float, targets=TARGETS, tol=TOL) -> bool:
+    """True si angle está dentro de ±tol de CUALQUIERA de los objetivos."""
+    for t in targets:
+        if (t - tol) <= angle <= (t + tol):
+            return True
+    return False
+
+
+def angulos_hombro(lm):
+    """
+    Flexión y abducción del hombro derecho a partir de los landmarks de MediaPipe.
+    Devuelve (ang_flex, ang_abd); ang_abd es None si el movimiento no está en el
+    plano frontal (filtro |Δx|/|Δz|).
+    """
+    shoulder = (lm[HOMBRO_DER].x, lm[HOMBRO_DER].y, lm[HOMBRO_DER].z)
+    elbow    = (lm[CODO_DER].x, lm[CODO_DER].y, lm[CODO_DER].z)
+
+    ang_flex = angle_from_vertical_deg((shoulder[0], shoulder[1]),
+                                       (elbow[0], elbow[1]))
+
+    # filtro de plano para Abducción
+    dx = elbow[0] - shoulder[0]
+    dz = elbow[2] - shoulder[2]
+    ratio = abs(dx) / (abs(dz) + 1e-6)
+    if ratio >= PLANE_RATIO_THRESH:
+        return ang_flex, ang_flex
+    return ang_flex, None
+
+
+def media_movil(buffer: list, valor: float, n=5) -> float:
+    """Agrega valor al buffer (máx. n elementos) y devuelve su media."""
+    buffer.append(valor)
+    if len(buffer) > n:
+        buffer.pop(0)
+    return float(np.mean(buffer))
+
+
+def landmarks_a_array(lm) -> np.ndarray:
+    """Landmarks de MediaPipe -> arreglo (33, 4) float32 con x, y, z, visibility."""
+    return np.array([(p.x, p.y, p.z, p.visibility) for p in lm], dtype=np.float32)
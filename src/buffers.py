@@ -0,0 +1,122 @@
+"""
+Buffers de cuadro reutilizables para el camino caliente (captura -> análisis -> pantalla).
+
+En vez de un arreglo nuevo por cuadro en cada paso (captura, BGR->RGB, copia para
+dibujar, resize para la pantalla, ...), cada paso pide su buffer al pool y se lo pasa
+a OpenCV como dst=. Cada buffer es un bloque plano con capacidad: se entrega con la
+forma pedida (contiguo) y se reutiliza mientras alcance, así una ROI que cambia de
+tamaño no obliga a reasignar.
+
+Dos formas de uso, según cuánto vive el cuadro:
+  anillo(nombre, forma, n)   turno fijo de n buffers; el arreglo sigue válido hasta
+                             n - 1 pedidos más del mismo nombre (lo que se usa y se
+                             suelta en la misma etapa, o lo que va a la pantalla)
+  tomar / devolver           lista libre, para cuadros que cruzan colas e hilos
+                             (la captura): se devuelven al terminar el render o al
+                             descartarse en una cola
+
+Cuenta pedidos y asignaciones; estado() da las asignaciones por cuadro en régimen
+(después del calentamiento), que deben quedar en 0: si suben, algo volvió a asignar
+por cuadro.
+"""
+import threading
+
+import numpy as np
+
+CUADROS_CALENTAMIENTO = 30   # los primeros cuadros asignan (tamaños aún desconocidos)
+
+
+class PoolBuffers:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._anillos = {}          # nombre -> [bloques, turno]
+        self._libres = {}           # nombre -> bloques libres
+        self._propios = {}          # id(bloque) -> nombre (solo se aceptan de vuelta bloques del pool)
+        self.cuadros = 0
+        self.pedidos = 0
+        self.asignaciones = 0
+        self.externas = 0           # OpenCV no usó el dst (p. ej. otro tamaño) y asignó por su cuenta
+        self.en_regimen = 0         # asignaciones (propias + externas) después del calentamiento
+        self.bytes = 0
+        self.por_nombre = {}
+
+    # ---------------- Interno ----------------
+    def _asignar(self, nombre, tam):
+        b = np.empty(tam, np.uint8)
+        self._propios[id(b)] = nombre
+        self.asignaciones += 1
+        self.bytes += tam
+        self.por_nombre[nombre] = self.por_nombre.get(nombre, 0) + 1
+        if self.cuadros > CUADROS_CALENTAMIENTO:
+            self.en_regimen += 1
+        return b
+
+    @staticmethod
+    def _vista(bloque, forma, dtype, tam):
+        return bloque[:tam].view(dtype).reshape(forma)
+
+    # ---------------- Anillo ----------------
+    def anillo(self, nombre, forma, dtype=np.uint8, n=2):
+        dtype = np.dtype(dtype)
+        tam = int(np.prod(forma)) * dtype.itemsize
+        with self._lock:
+            self.pedidos += 1
+            a = self._anillos.get(nombre)
+            if a is None:
+                a = self._anillos[nombre] = [[None] * n, 0]
+            bloques, i = a
+            a[1] = (i + 1) % len(bloques)
+            b = bloques[i]
+            if b is None or b.nbytes < tam:
+                if b is not None:
+                    self._propios.pop(id(b), None)
+                b = bloques[i] = self._asignar(nombre, tam)
+        return self._vista(b, forma, dtype, tam)
+
+    # ---------------- Lista libre ----------------
+    def tomar(self, nombre, forma, dtype=np.uint8):
+        dtype = np.dtype(dtype)
+        tam = int(np.prod(forma)) * dtype.itemsize
+        with self._lock:
+            self.pedidos += 1
+            libres = self._libres.setdefault(nombre, [])
+            while libres:
+                b = libres.pop()
+                if b.nbytes >= tam:
+                    break
+                self._propios.pop(id(b), None)   # quedó chico (cambió el tamaño): se suelta
+            else:
+                b = self._asignar(nombre, tam)
+        return self._vista(b, forma, dtype, tam)
+
+    def devolver(self, arr):
+        """Devuelve un arreglo de tomar(); cualquier otro (cuadros en memoria, memmaps) se ignora."""
+        if not isinstance(arr, np.ndarray):
+            return
+        while isinstance(arr.base, np.ndarray):
+            arr = arr.base
+        with self._lock:
+            nombre = self._propios.get(id(arr))
+            if nombre is not None and nombre in self._libres:
+                self._libres[nombre].append(arr)
+
+    # ---------------- Conteo ----------------
+    def usado(self, resultado, destino):
+        """Tras una llamada con dst=: cuenta si OpenCV asignó otro arreglo. Devuelve `resultado`."""
+        if destino is not None and resultado is not None and resultado is not destino:
+            with self._lock:
+                self.externas += 1
+                if self.cuadros > CUADROS_CALENTAMIENTO:
+                    self.en_regimen += 1
+        return resultado
+
+    def cuadro(self):
+        """Una vez por cuadro analizado (base del conteo por cuadro)."""
+        self.cuadros += 1
+
+    def estado(self):
+        regimen = self.cuadros - CUADROS_CALENTAMIENTO
+        return {"cuadros": self.cuadros, "pedidos": self.pedidos, "asignaciones": self.asignaciones,
+                "externas": self.externas, "mb": round(self.bytes / 2 ** 20, 1),
+                "asignaciones_por_cuadro": round(self.en_regimen / regimen, 4) if regimen > 0 else None,
+                "por_nombre": dict(self.por_nombre)}
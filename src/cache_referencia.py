@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from biomecanica import POSE_PARAMS, N_LANDMARKS, landmarks_a_array
+from motor_angulos import angulos_hombro_lote
+from referencia import EXT_VIDEO, TAM_DISPLAY, EscritorJPEG, jpeg_a_memmap
+
+CACHE_DIR = "cache_referencias"
+# 1 min a 30 FPS son ~60-70 MB en JPEG (crudo a 560x420 RGB serían ~1.27 GB):
+# ~30 clips de 1 min, de sobra para los que se usan en el día
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+VERSION = 2                       # subir si cambia el formato o el cálculo (2: cuadros en JPEG)
+DECODIFICADOS = "_decodificados"  # subcarpeta con los clips ya decodificados de esta ejecución
+MAX_DECODIFICADOS = 2             # clips crudos que se mantienen (~1.27 GB por minuto cada uno)
+MAX_FIRMAS = 512                  # hashes memorizados por (ruta, tamaño, mtime)
+
+
+def hash_archivo(ruta, bloque=1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as f:
+        for chunk in iter(lambda: f.read(bloque), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CacheReferencias:
+    """
+    Caché en disco de clips de referencia ya procesados:
+      frames.jpg    cuadros 560x420 en JPEG seguidos (+ offsets.npy); al cargar se
+                    decodifican UNA vez a un memmap crudo en _decodificados/, así la
+                    reproducción es indexación pura (los MAX_DECODIFICADOS más
+                    recientes quedan listos; se borran al cerrar)
+      landmarks.npy (N, 33, 4) float32 (NaN si no hubo pose)
+      angulos.npy   (N, 2) float32 -> flexión, abducción (NaN si fuera de plano)
+      meta.json     fps, n (cuadros válidos), archivo de origen
+    La clave combina el hash del contenido con los parámetros de Pose.
+    Se desalojan las entradas menos usadas (LRU) cuando se supera max_bytes.
+    """
+
+    def __init__(self, carpeta=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, pose_params=None):
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self.pose_params = dict(pose_params or POSE_PARAMS)
+        self._lock = threading.Lock()
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._ruta_indice = os.path.join(self.carpeta, "indice.json")
+        self._indice = self._leer_indice()
+        self._dir_decodificados = os.path.join(self.carpeta, DECODIFICADOS)
+        shutil.rmtree(self._dir_decodificados, ignore_errors=True)   # restos de una ejecución anterior
+        self._decodificados = {}     # clave -> memmap crudo (orden = uso, el último es el más reciente)
+
+    # ---------------- Índice ----------------
+    def _leer_indice(self):
+        try:
+            with open(self._ruta_indice, encoding="utf-8") as f:
+                idx = json.load(f)
+            if idx.get("version") == VERSION:
+                # entradas cuya carpeta se borró a mano: fallarían en cada carga
+                idx["entradas"] = {c: e for c, e in idx.get("entradas", {}).items()
+                                   if os.path.isdir(self._dir(c))}
+                idx.setdefault("firmas", {})
+                return idx
+            # formato anterior: sus entradas ya no se leen, se borran para liberar el disco
+            for clave in idx.get("entradas", {}):
+                shutil.rmtree(self._dir(clave), ignore_errors=True)
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {"version": VERSION, "entradas": {}, "firmas": {}}
+
+    def _guardar_indice(self):
+        tmp = self._ruta_indice + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f)
+        os.replace(tmp, self._ruta_indice)
+
+    # ---------------- Claves ----------------
+    def clave(self, ruta) -> str:
+        """Hash del contenido + parámetros de Pose. El hash se memoriza por (ruta, tamaño, mtime)."""
+        st = os.stat(ruta)
+        firma = f"{os.path.abspath(ruta)}|{st.st_size}|{st.st_mtime_ns}"
+        with self._lock:
+            h = self._indice["firmas"].pop(firma, None)
+            if h is not None:
+                self._indice["firmas"][firma] = h    # al final: las más viejas se sueltan primero
+        if h is None:
+            h = hash_archivo(ruta)
+            with self._lock:
+                firmas = self._indice["firmas"]
+                firmas[firma] = h
+                while len(firmas) > MAX_FIRMAS:
+                    del firmas[next(iter(firmas))]
+        params = json.dumps(self.pose_params, sort_keys=True)
+        extra = f"{VERSION}|{TAM_DISPLAY}|{params}".encode()
+        return f"{h}_{hashlib.blake2b(extra, digest_size=6).hexdigest()}"
+
+    def _dir(self, clave):
+        return os.path.join(self.carpeta, clave)
+
+    # ---------------- API ----------------
+    def obtener(self, ruta, calcular=True):
+        """
+        Devuelve dict con frames, landmarks y angulos (memmap de solo lectura) y meta,
+        calculándolo y guardándolo si no está en caché (o None si calcular=False).
+        Puede tardar (decodifica el clip): llamar fuera del hilo de Tk.
+        """
+        clave = self.clave(ruta)
+        with self._lock:
+            hit = clave in self._indice["entradas"]
+        if hit:
+            try:
+                return self._cargar(clave)
+            except (OSError, ValueError, KeyError):
+                # entrada incompleta o borrada a mano: se descarta y se recalcula
+                with self._lock:
+                    self._indice["entradas"].pop(clave, None)
+                    self._guardar_indice()
+                shutil.rmtree(self._dir(clave), ignore_errors=True)
+        if not calcular:
+            return None
+        self._calcular(ruta, clave)
+        return self._cargar(clave)
+
+    def _cargar(self, clave):
+        d = self._dir(clave)
+        with open(os.path.join(d, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        datos = {
+            "clave": clave,
+            "meta": meta,
+            "frames": self._decodificar(clave, meta["n"]),
+            "landmarks": np.load(os.path.join(d, "landmarks.npy"), mmap_mode="r"),
+            "angulos": np.load(os.path.join(d, "angulos.npy"), mmap_mode="r"),
+        }
+        with self._lock:
+            self._indice["entradas"][clave]["ultimo_uso"] = time.time()
+            self._guardar_indice()
+        return datos
+
+    def _decodificar(self, clave, n):
+        """frames.jpg -> memmap crudo en _decodificados/ (reutilizado si ya se decodificó)."""
+        with self._lock:
+            frames = self._decodificados.pop(clave, None)
+        if frames is None:
+            d = self._dir(clave)
+            destino = os.path.join(self._dir_decodificados, clave)
+            os.makedirs(destino, exist_ok=True)
+            frames = jpeg_a_memmap(os.path.join(d, "frames.jpg"), os.path.join(d, "offsets.npy"),
+                                   os.path.join(destino, "frames.npy"), n)
+        with self._lock:
+            self._decodificados[clave] = frames
+            viejos = list(self._decodificados)[:-MAX_DECODIFICADOS]
+            for c in viejos:
+                del self._decodificados[c]
+        for c in viejos:
+            # si un reproductor aún lo tiene abierto (Windows) queda hasta cerrar()
+            shutil.rmtree(os.path.join(self._dir_decodificados, c), ignore_errors=True)
+        return frames
+
+    def cerrar(self):
+        """Borra los clips decodificados (llamar cuando ya no hay reproductores abiertos)."""
+        with self._lock:
+            self._decodificados.clear()
+        shutil.rmtree(self._dir_decodificados, ignore_errors=True)
+
+    def _calcular(self, ruta, clave):
+        import mediapipe as mp
+
+        es_video = ruta.lower().endswith(EXT_VIDEO)
+        if es_video:
+            cap = cv2.VideoCapture(ruta)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            leer = cap.read
+        else:
+            img = cv2.imread(ruta)
+            if img is None:
+                raise ValueError(f"No se pudo abrir la imagen: {ruta}")
+            pendiente = [img]
+            cap, fps = None, 30.0
+
+            def leer():
+                return (True, pendiente.pop()) if pendiente else (False, None)
+
+        # los cuadros se comprimen y escriben directo a disco para no acumular el clip en RAM
+        d = self._dir(clave)
+        tmp = d + f".tmp{os.getpid()}_{threading.get_ident()}"
+        os.makedirs(tmp, exist_ok=True)
+        frames = EscritorJPEG(os.path.join(tmp, "frames.jpg"))
+        chico = np.empty(TAM_DISPLAY[::-1] + (3,), np.uint8)
+        lms = []
+        params = dict(self.pose_params, static_image_mode=not es_video)
+        with mp.solutions.pose.Pose(**params) as pose:
+            while True:
+                ok, frame = leer()
+                if not ok:
+                    break
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                res = pose.process(rgb)
+                if res.pose_landmarks:
+                    lms.append(landmarks_a_array(res.pose_landmarks.landmark))
+                else:
+                    lms.append(np.full((N_LANDMARKS, 4), np.nan, dtype=np.float32))
+                frames.agregar(cv2.resize(frame, TAM_DISPLAY, dst=chico))
+        if cap is not None:
+            cap.release()
+        frames.cerrar(os.path.join(tmp, "offsets.npy"))
+        n = len(lms)
+        if n == 0:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise ValueError(f"No se pudo decodificar: {ruta}")
+
+        # se publica con un rename atómico
+        lms = np.stack(lms)
+        np.save(os.path.join(tmp, "landmarks.npy"), lms)
+        # ángulos de todo el clip en una sola pasada (NaN sin pose / abducción fuera de plano)
+        np.save(os.path.join(tmp, "angulos.npy"), np.stack(angulos_hombro_lote(lms), axis=1).astype(np.float32))
+        meta = {"fps": float(fps), "n": n, "origen": os.path.basename(ruta),
+                "pose_params": self.pose_params}
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        shutil.rmtree(d, ignore_errors=True)
+        os.replace(tmp, d)
+
+        tam = sum(os.path.getsize(os.path.join(d, f)) for f in os.listdir(d))
+        with self._lock:
+            self._indice["entradas"][clave] = {"bytes": tam, "ultimo_uso": time.time()}
+            self._desalojar(proteger=clave)
+            self._guardar_indice()
+
+    def _desalojar(self, proteger=None):
+        """LRU: borra las entradas menos usadas hasta quedar bajo max_bytes (llamar con el lock)."""
+        entradas = self._indice["entradas"]
+        total = sum(e["bytes"] for e in entradas.values())
+        for clave in sorted(entradas, key=lambda k: entradas[k]["ultimo_uso"]):
+            if total <= self.max_bytes:
+                break
+            if clave == proteger:
+                continue
+            total -= entradas.pop(clave)["bytes"]
+            shutil.rmtree(self._dir(clave), ignore_errors=True)
+
+    def tamano_total(self):
+        with self._lock:
+            return sum(e["bytes"] for e in self._indice["entradas"].values())
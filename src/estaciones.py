@@ -0,0 +1,295 @@
+"""
+Modo multi-estación: varias cámaras/pacientes analizados a la vez en un mismo equipo.
+
+Cada Estacion es una sesión completa e independiente: su fuente, su canal de
+inferencia (con su propio seguimiento de MediaPipe), su suavizado, su grabación
+y su sesión en la base de datos. Todas comparten un ServidorInferencia con un
+proceso por núcleo disponible (hasta uno por estación).
+
+Reparto justo: cada estación tiene como mucho un cuadro en vuelo (procesar() espera
+su respuesta) y cada proceso atiende su cola en orden de llegada, así que las
+estaciones que comparten proceso se turnan; ninguna puede acaparar la CPU mandando
+más cuadros. fps_max limita además la captura de una estación (p. ej. para dejar
+margen a las demás).
+
+Cada estación mide sus cuadros analizados por segundo y la latencia cámara->análisis;
+GestorEstaciones.estado() junta todo y dice si el equipo da abasto.
+"""
+import datetime
+import os
+import sqlite3
+import time
+
+import cv2
+
+from analisis import AnalizadorSesion
+from base_datos import EscritorMuestras
+from biomecanica import POSE_PARAMS
+from fuentes import desde_texto
+from grabacion import GrabadorLandmarks, dibujar_esqueleto
+from inferencia_procesos import TAM_MAXIMO, ServidorInferencia
+from instrumentacion import Instrumentacion
+from pipeline import Pipeline
+
+MAX_ESTACIONES = 4
+TAM_MINIATURA = (400, 300)
+FPS_OBJETIVO = 20
+MARGEN_AL_DIA = 0.9       # una estación "da abasto" si analiza >= 90 % de lo que pide
+
+
+def _ahora():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ======================= Estación =======================
+class Estacion:
+    """
+    Una cámara + un paciente. `publicar(miniatura_rgb, info)` (opcional) recibe desde el
+    hilo de la estación una miniatura con el esqueleto y los ángulos, para un tablero.
+    """
+
+    def __init__(self, nombre, fuente, paciente="", ejercicio="", modo="Flexión",
+                 fps_max=None, fps_objetivo=FPS_OBJETIVO, grabar=False, publicar=None):
+        self.nombre = nombre
+        self.fuente_spec = fuente
+        self.paciente = paciente
+        self.ejercicio = ejercicio
+        self.modo = modo
+        self.fps_max = fps_max
+        self.fps_objetivo = fps_objetivo
+        self.grabar = grabar
+        self.publicar = publicar
+        self.instr = Instrumentacion()
+        self.fuente = None
+        self.canal = None
+        self.analizador = None
+        self.pipeline = None
+        self.grabador = None
+        self.escritor = None
+        self.error = None
+        self.avisos = []            # fallas que no detienen la estación (BD, exportación); la UI las muestra
+        self.ultimo_reporte = {"paciente": paciente, "ejercicio": ejercicio, "fecha": "",
+                               "comparacion": {"Flexión": 0.0, "Abducción": 0.0}}
+        self._cola_cam = None
+        self._t0 = None
+        self.cuadros = 0
+
+    def abrir_fuente(self):
+        """Abre la fuente (número de cámara o ruta de video, como REHAB_FUENTE)."""
+        self.fuente = desde_texto(self.fuente_spec, tiempo_real=True)
+        if not self.fuente.abierta():
+            raise OSError(f"{self.nombre}: no se pudo abrir la fuente {self.fuente_spec!r}")
+        return self.fuente.tamano()
+
+    def iniciar(self, canal, db=None):
+        """Arranca la estación con su canal de inferencia (y su sesión en `db` si se da)."""
+        self.canal = canal
+        self.analizador = AnalizadorSesion(canal, self.paciente, self.ejercicio, self.modo,
+                                           instr=self.instr)
+        if db is not None:
+            try:
+                sesion_id = db.crear_sesion(self.paciente, self.ejercicio, self.modo, _ahora(), "", "", "")
+                self.escritor = EscritorMuestras(sesion_id, ruta=db.ruta)
+            except sqlite3.Error as e:
+                self.avisos.append(f"{self.nombre}: no se guardará la serie de tiempo: {e}")
+        if self.grabar:
+            now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.grabador = GrabadorLandmarks(f"grabacion_{self.nombre}_{now}.pose", self.fuente.tamano(),
+                                              self.fuente.fps(),
+                                              meta={"paciente": self.paciente, "ejercicio": self.ejercicio,
+                                                    "modo": self.modo, "estacion": self.nombre},
+                                              instr=self.instr)
+
+        self._t0 = time.perf_counter()
+        w, h = self.fuente.tamano()
+        self._forma = (h, w, 3) if w and h else None
+        self.pipeline = Pipeline(f"estacion-{self.nombre}")
+        self._cola_cam = self.pipeline.cola(1, self._devolver)
+        cola_res = self.pipeline.cola(1, self._devolver)
+        periodo = 1.0 / self.fps_max if self.fps_max else 0.0
+        self.pipeline.agregar_fuente("captura", self._producir, self._cola_cam, periodo)
+        self.pipeline.agregar_etapa("inferencia", self._inferir, self._cola_cam, cola_res)
+        self.pipeline.agregar_etapa("salida", self._salida, cola_res)
+        self.pipeline.iniciar()
+
+    # ---- Pipeline: captura -> inferencia -> salida ----
+    def _producir(self):
+        pool = self.analizador.pool
+        destino = pool.tomar("captura", self._forma) if self._forma else None
+        with self.instr.medir("captura"):
+            ok, frame = self.fuente.leer(destino)
+        if not ok:
+            pool.devolver(destino)
+            return None
+        return {"t": time.perf_counter(), "frame": pool.usado(frame, destino)}
+
+    def _devolver(self, item):
+        self.analizador.pool.devolver(item["frame"])
+
+    def _inferir(self, item):
+        try:
+            return self.analizador.inferir(item)
+        except Exception as e:
+            # una estación caída no detiene a las demás
+            self.error = str(e)
+            self.pipeline.detener.set()
+            return None
+
+    def _salida(self, item):
+        s_flex, s_abd = item["s_flex"], item["s_abd"]
+        self.ultimo_reporte.update({
+            "fecha": _ahora(),
+            "comparacion": {"Flexión": 0.0 if s_flex is None else round(s_flex, 1),
+                            "Abducción": 0.0 if s_abd is None else round(s_abd, 1)},
+        })
+        if self.escritor is not None:
+            self.escritor.agregar(self.analizador.muestra(item, self._t0))
+        if self.grabador is not None:
+            self.grabador.agregar(item, None)
+        self.cuadros += 1
+        # FPS de la estación = cuadros analizados; latencia = captura -> ángulos listos
+        self.instr.cuadro_mostrado(item["t"])
+
+        if self.publicar is not None:
+            with self.instr.medir("miniatura"):
+                # anillo de 4: el tablero la pinta después, en el hilo de Tk
+                mini = self.analizador.pool.anillo("miniatura", TAM_MINIATURA[::-1] + (3,), n=4)
+                cv2.resize(item["frame"], TAM_MINIATURA, dst=mini, interpolation=cv2.INTER_AREA)
+                cv2.cvtColor(mini, cv2.COLOR_BGR2RGB, dst=mini)
+                if item["landmarks"] is not None:
+                    import mediapipe as mp
+                    dibujar_esqueleto(mini, item["landmarks"], mp.solutions.pose.POSE_CONNECTIONS,
+                                      grosor=1, radio=2)
+            self.publicar(mini, self.estado())
+        self._devolver(item)
+
+    # ---- Estado ----
+    def fps_pedido(self):
+        """Lo que la estación debería analizar por segundo: lo menor entre fps_max, los FPS
+        de la fuente y el objetivo de la inferencia."""
+        fps_fuente = self.fuente.fps() if self.fuente is not None else 0.0
+        return min(f for f in (self.fps_max, fps_fuente, self.fps_objetivo) if f)
+
+    def estado(self):
+        fps = self.instr.fps()
+        pedido = self.fps_pedido()
+        comp = self.ultimo_reporte["comparacion"]
+        return {
+            "nombre": self.nombre,
+            "paciente": self.paciente,
+            "ejercicio": self.ejercicio,
+            "activa": self.pipeline is not None and self.pipeline.activo(),
+            "fps": round(fps, 1),
+            "fps_pedido": round(pedido, 1),
+            "al_dia": fps >= MARGEN_AL_DIA * pedido,
+            "latencia_p50_ms": round(self.instr.latencia(50), 1),
+            "latencia_p95_ms": round(self.instr.latencia(95), 1),
+            "cuadros": self.cuadros,
+            "descartados_captura": self._cola_cam.descartados if self._cola_cam is not None else 0,
+            "repeticiones": self.analizador.estadisticas.repeticiones if self.analizador else 0,
+            "asignaciones_por_cuadro": (self.analizador.pool.estado()["asignaciones_por_cuadro"]
+                                        if self.analizador else None),
+            "flexion": comp["Flexión"],
+            "abduccion": comp["Abducción"],
+            "error": self.error or (f"{self.pipeline.error[0]}: {self.pipeline.error[1]}"
+                                    if self.pipeline is not None and self.pipeline.error else None),
+            "avisos": list(self.avisos),
+        }
+
+    def detener(self, exportar=True):
+        """Detiene todo y devuelve el resumen de la estación (y exporta sus tiempos)."""
+        resumen = self.estado()
+        if self.pipeline is not None:
+            self.pipeline.parar()
+        if self.canal is not None:
+            resumen["inferencia"] = self.canal.estado()
+            self.canal.cerrar()
+        if self.grabador is not None:
+            resumen["grabacion"] = self.grabador.cerrar()
+            self.grabador = None
+        metricas = None
+        if self.analizador is not None:
+            metricas = self.analizador.estadisticas.finalizar(self._t0)
+            self.ultimo_reporte["metricas"] = metricas
+            resumen["metricas"] = {k: v for k, v in metricas.items() if k != "reps"}
+        if self.escritor is not None:
+            error = self.escritor.cerrar(_ahora(), metricas)
+            resumen["muestras"] = {"escritas": self.escritor.escritas, "descartadas": self.escritor.descartadas}
+            if error is not None:
+                self.avisos.append(f"{self.nombre}: la serie de tiempo quedó incompleta "
+                                   f"({self.escritor.escritas} muestras guardadas): {error}")
+        if self.fuente is not None:
+            self.fuente.liberar()
+        if exportar and self.instr.histogramas:
+            try:
+                self.instr.exportar(prefijo=f"tiempos_{self.nombre}", extra={"estacion": resumen})
+            except OSError as e:
+                self.avisos.append(f"{self.nombre}: no se pudo exportar el reporte de tiempos: {e}")
+        resumen["avisos"] = list(self.avisos)
+        return resumen
+
+
+# ======================= Gestor =======================
+class GestorEstaciones:
+    """
+    Arranca y detiene N estaciones sobre un ServidorInferencia compartido.
+    n_procesos por defecto: un proceso por estación, sin pasar de los núcleos - 1
+    (uno queda para captura, Tk y grabación).
+    """
+
+    def __init__(self, db=None, n_procesos=None, fps_objetivo=FPS_OBJETIVO):
+        self.db = db
+        self.n_procesos = n_procesos
+        self.fps_objetivo = fps_objetivo
+        self.estaciones = []
+        self.servidor = None
+        self._t_inicio = None
+
+    def agregar(self, nombre, fuente, **kw):
+        """Antes de iniciar(): los canales de inferencia se crean todos juntos."""
+        if self.servidor is not None:
+            raise RuntimeError("Las estaciones se agregan antes de iniciar()")
+        if len(self.estaciones) >= MAX_ESTACIONES:
+            raise ValueError(f"Máximo {MAX_ESTACIONES} estaciones")
+        kw.setdefault("fps_objetivo", self.fps_objetivo)
+        e = Estacion(nombre, fuente, **kw)
+        self.estaciones.append(e)
+        return e
+
+    def iniciar(self):
+        if not self.estaciones:
+            raise ValueError("No hay estaciones")
+        tams = [e.abrir_fuente() for e in self.estaciones]
+        n = self.n_procesos or max(1, min(len(self.estaciones), (os.cpu_count() or 2) - 1))
+        self.servidor = ServidorInferencia(
+            canales=len(self.estaciones), n_procesos=n,
+            tam_maximo=(max([w for w, _ in tams] + [TAM_MAXIMO[0]]),
+                        max([h for _, h in tams] + [TAM_MAXIMO[1]])),
+            fps_objetivo=self.fps_objetivo, pose_params=POSE_PARAMS)
+        for e, canal in zip(self.estaciones, self.servidor.canales):
+            e.iniciar(canal, self.db)
+        self._t_inicio = time.perf_counter()
+
+    def estado(self):
+        """Estado por estación + totales del equipo (lo que muestra el tablero)."""
+        por_estacion = [e.estado() for e in self.estaciones]
+        activas = [s for s in por_estacion if s["activa"]]
+        return {
+            "estaciones": por_estacion,
+            "procesos": self.servidor.n_procesos if self.servidor is not None else 0,
+            "fps_total": round(sum(s["fps"] for s in activas), 1),
+            "fps_pedido_total": round(sum(s["fps_pedido"] for s in activas), 1),
+            "al_dia": all(s["al_dia"] for s in activas),
+            "duracion_s": round(time.perf_counter() - self._t_inicio, 1) if self._t_inicio else 0.0,
+        }
+
+    def avisos(self):
+        """Fallas no fatales de todas las estaciones (Estacion.avisos), para mostrarlas en la UI."""
+        return [a for e in self.estaciones for a in e.avisos]
+
+    def detener(self):
+        """Detiene todas las estaciones y el servidor; devuelve el resumen por estación."""
+        resumenes = [e.detener() for e in self.estaciones]
+        if self.servidor is not None:
+            self.servidor.cerrar()
+        return resumenes
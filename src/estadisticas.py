@@ -0,0 +1,304 @@
+"""
+Estadísticas de la sesión calculadas en línea: O(1) en tiempo y memoria por cuadro,
+sin volver a recorrer la serie al terminar.
+
+  FiltroOneEuro         suavizado adaptativo: casi sin retardo en movimiento y
+                        sin temblor en reposo (Casiez et al., 2012)
+  MediaMovil            media de los últimos n en un anillo con suma acumulada
+  CuantilP2             percentil aproximado sin guardar muestras (P², Jain y Chlamtac 1985)
+  DetectorRepeticiones  repetición = valle -> pico -> valle, con histéresis
+  EstadisticasSesion    todo lo anterior sobre el ángulo del modo evaluado
+"""
+import math
+
+from biomecanica import TARGETS, TOL
+
+HISTERESIS = 15.0       # grados que debe bajar/subir la señal para confirmar un pico/valle
+ROM_MIN_REP = 30.0      # recorrido mínimo (valle -> pico) para contar una repetición
+PAUSA_SERIE = 10.0      # s en reposo (en el valle) que separan una serie de la siguiente
+DT_MAX = 0.5            # s; huecos mayores (pose perdida) no suman tiempo
+PERCENTILES = (50, 90, 95)
+
+
+# ======================= Suavizado =======================
+class FiltroOneEuro:
+    """
+    Pasa-bajos cuyo corte sube con la velocidad: corte = min_corte + beta * |dx/dt|.
+    Con ángulos en grados, beta = 0.05 da ~6 Hz de corte a 100 °/s.
+    """
+
+    def __init__(self, min_corte=1.5, beta=0.05, corte_derivada=1.0):
+        self.min_corte = min_corte
+        self.beta = beta
+        self.corte_derivada = corte_derivada
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.x = None
+        self.dx = 0.0
+        self.t = None
+
+    @staticmethod
+    def _alfa(corte, dt):
+        tau = 1.0 / (2.0 * math.pi * corte)
+        return 1.0 / (1.0 + tau / dt)
+
+    def filtrar(self, x, t):
+        x = float(x)
+        if self.x is None:
+            self.x, self.t = x, t
+            return self.x
+        dt = max(t - self.t, 1e-3)
+        dx = (x - self.x) / dt
+        self.dx += self._alfa(self.corte_derivada, dt) * (dx - self.dx)
+        corte = self.min_corte + self.beta * abs(self.dx)
+        self.x += self._alfa(corte, dt) * (x - self.x)
+        self.t = t
+        return self.x
+
+
+class MediaMovil:
+    """Media de los últimos n valores (misma salida que biomecanica.media_movil, en O(1))."""
+
+    def __init__(self, n=5):
+        self.n = n
+        self._anillo = [0.0] * n
+        self._i = 0
+        self._cuenta = 0
+        self._suma = 0.0
+
+    def agregar(self, valor):
+        if self._cuenta == self.n:
+            self._suma -= self._anillo[self._i]
+        else:
+            self._cuenta += 1
+        self._anillo[self._i] = valor
+        self._suma += valor
+        self._i = (self._i + 1) % self.n
+        return self._suma / self._cuenta
+
+
+# ======================= Percentiles =======================
+class CuantilP2:
+    """Estimador P² de un cuantil p (0-1): cinco marcadores, sin guardar las muestras."""
+
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self._q = []                                   # alturas de los marcadores
+        self._pos = [1, 2, 3, 4, 5]                     # posiciones reales
+        self._deseada = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._inc = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def agregar(self, x):
+        self.n += 1
+        q = self._q
+        if self.n <= 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        pos, deseada = self._pos, self._deseada
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            deseada[i] += self._inc[i]
+        # ajustar los tres marcadores centrales (parábola, o lineal si se sale de orden)
+        for i in (1, 2, 3):
+            d = deseada[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                s = 1 if d > 0 else -1
+                qn = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i]) +
+                    (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1]))
+                if not q[i - 1] < qn < q[i + 1]:
+                    qn = q[i] + s * (q[i + s] - q[i]) / (pos[i + s] - pos[i])
+                q[i] = qn
+                pos[i] += s
+
+    def valor(self):
+        if self.n == 0:
+            return None
+        if self.n <= 5:
+            # pocas muestras: cuantil exacto (interpolado) de las que hay
+            r = self.p * (self.n - 1)
+            i = int(r)
+            j = min(i + 1, self.n - 1)
+            return self._q[i] + (r - i) * (self._q[j] - self._q[i])
+        return self._q[2]
+
+
+# ======================= Repeticiones =======================
+class DetectorRepeticiones:
+    """
+    Máquina de estados sobre el ángulo suavizado. Un valle se confirma cuando la señal
+    sube `histeresis` grados sobre el mínimo, y un pico cuando baja `histeresis` desde
+    el máximo; la repetición (valle -> pico -> valle) se registra al confirmar el valle
+    final si el recorrido supera rom_min. Una pausa de más de pausa_serie segundos en
+    el valle abre una nueva serie. Una bajada de menos de rom_min desde el pico no
+    cierra la repetición (titubeos al sostener arriba).
+    """
+
+    def __init__(self, histeresis=HISTERESIS, rom_min=ROM_MIN_REP, pausa_serie=PAUSA_SERIE):
+        self.histeresis = histeresis
+        self.rom_min = rom_min
+        self.pausa_serie = pausa_serie
+        self.reps = []
+        self.serie = 1
+        self._fase = "inicio"        # inicio | subiendo | bajando
+        self._valle = None           # (ángulo, t) del valle que abre la repetición en curso
+        self._pico = None            # (ángulo, t)
+        self._nuevo_valle = None     # (ángulo, t) mínimo tras el pico
+        self._t_bajada = None        # cuándo se confirmó la bajada (inicio del reposo)
+        self._t_meta = 0.0           # tiempo cerca de las metas en la repetición en curso
+
+    @property
+    def pendiente(self):
+        """Bajada ya confirmada cuyo valle aún no se cierra (el brazo viene bajando)."""
+        return (self._fase == "bajando" and self._pico[0] - self._valle[0] >= self.rom_min
+                and self._pico[0] - self._nuevo_valle[0] >= self.rom_min)
+
+    def contar(self):
+        return len(self.reps) + (1 if self.pendiente else 0)
+
+    def actualizar(self, t, x, dt_meta=0.0):
+        """Devuelve la repetición registrada en este cuadro (dict) o None."""
+        self._t_meta += dt_meta
+        h = self.histeresis
+        if self._fase == "inicio":
+            if self._valle is None or x < self._valle[0]:
+                self._valle = (x, t)
+            elif x - self._valle[0] >= h:
+                self._fase, self._pico, self._t_meta = "subiendo", (x, t), 0.0
+        elif self._fase == "subiendo":
+            if x > self._pico[0]:
+                self._pico = (x, t)
+            elif self._pico[0] - x >= h:
+                self._fase, self._nuevo_valle, self._t_bajada = "bajando", (x, t), t
+        else:  # bajando
+            if x < self._nuevo_valle[0]:
+                self._nuevo_valle = (x, t)
+            elif x - self._nuevo_valle[0] >= h:
+                if self._pico[0] - self._nuevo_valle[0] < self.rom_min:
+                    # bajada corta (titubeo arriba o abajo): sigue la misma repetición
+                    if self._nuevo_valle[0] < self._valle[0]:
+                        self._valle = self._nuevo_valle
+                    self._fase = "subiendo"
+                    if x > self._pico[0]:
+                        self._pico = (x, t)
+                    return None
+                rep = self._cerrar_rep()
+                if t - self._t_bajada > self.pausa_serie and self.reps:
+                    self.serie += 1
+                self._valle = self._nuevo_valle
+                self._fase, self._pico = "subiendo", (x, t)
+                return rep
+        return None
+
+    def _cerrar_rep(self):
+        valle, pico, fin = self._valle, self._pico, self._nuevo_valle
+        t_meta, self._t_meta = self._t_meta, 0.0
+        rom = pico[0] - valle[0]
+        if rom < self.rom_min:
+            return None
+        rep = {"n": len(self.reps) + 1, "serie": self.serie, "inicio": valle[1], "pico": pico[1],
+               "fin": fin[1], "minimo": valle[0], "maximo": pico[0], "rom": rom, "t_meta": t_meta}
+        self.reps.append(rep)
+        return rep
+
+    def finalizar(self):
+        """Fin de la sesión: registra la repetición pendiente (si el brazo ya venía bajando)."""
+        if self.pendiente:
+            self._cerrar_rep()
+            self._fase = "inicio"
+            self._valle = self._nuevo_valle
+
+    def series(self):
+        if self.pendiente:
+            return self.serie
+        return self.reps[-1]["serie"] if self.reps else 0
+
+
+# ======================= Sesión =======================
+class EstadisticasSesion:
+    """
+    actualizar(t, s_flex, s_abd) por cuadro: usa el ángulo del modo evaluado (Flexión o
+    Abducción; los cuadros sin abducción válida no cuentan). resumen() da las métricas
+    que van al PDF y a la base de datos.
+    """
+
+    def __init__(self, modo="Flexión", targets=TARGETS, tol=TOL, percentiles=PERCENTILES, **kw_detector):
+        self.modo = modo
+        self.targets = tuple(targets)
+        self.tol = tol
+        self.detector = DetectorRepeticiones(**kw_detector)
+        self.cuantiles = {p: CuantilP2(p / 100.0) for p in percentiles}
+        self.t_meta = {m: 0.0 for m in self.targets}
+        self.t_activo = 0.0
+        self.maximo = None
+        self.n = 0
+        self._t_ant = None
+
+    def actualizar(self, t, s_flex, s_abd):
+        x = s_flex if self.modo == "Flexión" else s_abd
+        if x is None:
+            return None
+        x = float(x)
+        dt = 0.0 if self._t_ant is None else float(min(max(t - self._t_ant, 0.0), DT_MAX))
+        self._t_ant = t
+        self.n += 1
+        self.t_activo += dt
+        dt_meta = 0.0
+        for m in self.targets:
+            if abs(x - m) <= self.tol:
+                self.t_meta[m] += dt
+                dt_meta = dt
+        if self.maximo is None or x > self.maximo:
+            self.maximo = x
+        for c in self.cuantiles.values():
+            c.agregar(x)
+        return self.detector.actualizar(t, x, dt_meta)
+
+    @property
+    def repeticiones(self):
+        return self.detector.contar()
+
+    def series(self):
+        return self.detector.series()
+
+    def finalizar(self, t_origen=0.0):
+        self.detector.finalizar()
+        return self.resumen(t_origen)
+
+    def resumen(self, t_origen=0.0):
+        """Métricas de la sesión; los tiempos de cada repetición quedan relativos a t_origen."""
+        reps = self.detector.reps
+        roms = [r["rom"] for r in reps]
+
+        def r1(v):
+            return None if v is None else round(v, 1)
+        return {
+            "modo": self.modo,
+            "repeticiones": self.repeticiones,
+            "series": self.series(),
+            "rom_max": r1(max(roms)) if roms else None,
+            "rom_medio": r1(sum(roms) / len(roms)) if roms else None,
+            "angulo_max": r1(self.maximo),
+            "percentiles": {str(p): r1(c.valor()) for p, c in self.cuantiles.items()},
+            "t_meta_s": {f"{m:g}": round(v, 1) for m, v in self.t_meta.items()},
+            "t_activo_s": round(self.t_activo, 1),
+            "muestras": self.n,
+            "reps": [dict(r, inicio=round(r["inicio"] - t_origen, 3), pico=round(r["pico"] - t_origen, 3),
+                          fin=round(r["fin"] - t_origen, 3), minimo=round(r["minimo"], 1),
+                          maximo=round(r["maximo"], 1), rom=round(r["rom"], 1),
+                          t_meta=round(r["t_meta"], 2)) for r in reps],
+        }
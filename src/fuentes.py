@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+
+import cv2
+
+
+# ======================= Fuentes de cuadros =======================
+# Todas exponen la misma interfaz que usa el pipeline:
+#   leer() -> (ok, frame_bgr) | tamano() -> (ancho, alto) | fps() | liberar()
+
+def backend_por_defecto():
+    """DirectShow en Windows, V4L2 en Linux, AVFoundation en macOS."""
+    if sys.platform.startswith("win"):
+        return cv2.CAP_DSHOW
+    if sys.platform.startswith("linux"):
+        return cv2.CAP_V4L2
+    if sys.platform == "darwin":
+        return cv2.CAP_AVFOUNDATION
+    return cv2.CAP_ANY
+
+
+class FuenteCamara:
+    """Cámara en vivo con backend, resolución, FPS y formato MJPG seleccionables."""
+
+    def __init__(self, indice=0, backend=None, ancho=None, alto=None, fps=None, mjpg=False):
+        self.cap = cv2.VideoCapture(indice, backend_por_defecto() if backend is None else backend)
+        if mjpg:
+            # MJPG antes de la resolución: muchas webcams solo dan 720p/1080p a 30 FPS en MJPG
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        if ancho:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, ancho)
+        if alto:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, alto)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+    def abierta(self):
+        return self.cap.isOpened()
+
+    def leer(self, destino=None):
+        """destino: buffer (alto, ancho, 3) a reutilizar; OpenCV asigna otro si no coincide."""
+        return self.cap.read(destino)
+
+    def tamano(self):
+        return (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def liberar(self):
+        self.cap.release()
+
+
+class _Ritmo:
+    """Espera hasta el instante del siguiente cuadro (reproducción en tiempo real)."""
+
+    def __init__(self, fps):
+        self.periodo = 1.0 / (fps or 30.0)
+        self.siguiente = None
+
+    def esperar(self):
+        ahora = time.perf_counter()
+        if self.siguiente is None:
+            self.siguiente = ahora
+        elif self.siguiente > ahora:
+            time.sleep(self.siguiente - ahora)
+        else:
+            self.siguiente = ahora   # atrasados: no se intenta "recuperar" en ráfaga
+        self.siguiente += self.periodo
+
+
+class FuenteArchivo:
+    """
+    Video grabado. tiempo_real=True lo entrega al ritmo de sus FPS (como una cámara);
+    tiempo_real=False lo entrega tan rápido como se consuma (reanálisis / pruebas de carga).
+    """
+
+    def __init__(self, ruta, tiempo_real=True, bucle=False):
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(ruta)
+        self.ruta = ruta
+        self.cap = cv2.VideoCapture(ruta)
+        self.bucle = bucle
+        self._ritmo = _Ritmo(self.fps()) if tiempo_real else None
+
+    def abierta(self):
+        return self.cap.isOpened()
+
+    def leer(self, destino=None):
+        ok, frame = self.cap.read(destino)
+        if not ok and self.bucle:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read(destino)
+        if ok and self._ritmo is not None:
+            self._ritmo.esperar()
+        return ok, frame
+
+    def tamano(self):
+        return (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def liberar(self):
+        self.cap.release()
+
+
+class FuenteMemoria:
+    """Arreglo de cuadros en memoria (lista o ndarray (N, alto, ancho, 3))."""
+
+    def __init__(self, cuadros, fps=30.0, tiempo_real=False, bucle=False):
+        self.cuadros = cuadros
+        self._fps = fps
+        self.bucle = bucle
+        self.i = 0
+        self._ritmo = _Ritmo(fps) if tiempo_real else None
+
+    def abierta(self):
+        return len(self.cuadros) > 0
+
+    def leer(self, destino=None):
+        # los cuadros ya están en memoria: no se copian al destino
+        if self.i >= len(self.cuadros):
+            if not self.bucle or not len(self.cuadros):
+                return False, None
+            self.i = 0
+        frame = self.cuadros[self.i]
+        self.i += 1
+        if self._ritmo is not None:
+            self._ritmo.esperar()
+        return True, frame
+
+    def tamano(self):
+        if not len(self.cuadros):
+            return (0, 0)
+        alto, ancho = self.cuadros[0].shape[:2]
+        return ancho, alto
+
+    def fps(self):
+        return self._fps
+
+    def liberar(self):
+        self.i = len(self.cuadros)
+
+
+def desde_texto(spec, tiempo_real=True, **kw):
+    """
+    "camara:1" o "1" -> FuenteCamara; cualquier otra cosa se toma como ruta de video.
+    Útil para elegir la fuente desde una variable de entorno o la línea de comandos.
+    """
+    spec = str(spec).strip()
+    if spec.startswith("camara:"):
+        spec = spec.split(":", 1)[1]
+    if spec.isdigit():
+        return FuenteCamara(int(spec), **kw)
+    return FuenteArchivo(spec, tiempo_real=tiempo_real, bucle=kw.get("bucle", False))
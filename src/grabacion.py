@@ -0,0 +1,214 @@
+"""
+Grabación de la comparación fuera del loop de análisis.
+
+El hilo de render solo encola (nunca codifica); un hilo propio escribe a disco.
+Si el disco o el códec se atrasan, la cola acotada descarta lo más antiguo y
+lo cuenta. Dos modos:
+  - GrabadorVideo:      cuadros con overlay -> mp4 (mp4v, o XVID/avi si no hay mp4v), a FPS
+                        constantes según el tiempo de captura (el análisis entrega a ritmo variable)
+  - GrabadorLandmarks:  solo la pose (33 x 4 float32 por cuadro) -> .pose
+                        (secuencia_pose); `renderizar` genera el video del esqueleto después.
+
+Re-render de una grabación de landmarks:
+    python src/grabacion.py grabacion_20251003_101500.pose --salida esqueleto.mp4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from pipeline import ColaDescartable
+from secuencia_pose import EscritorPose, SecuenciaPose
+
+COLA_GRABACION = 64       # cuadros pendientes antes de empezar a descartar (~3 s a 20 FPS)
+COLA_LANDMARKS = 4096     # ~2 MB: una pose ocupa ~530 bytes
+VISIBILIDAD_MIN = 0.5     # landmarks menos visibles no se dibujan al re-renderizar
+
+
+# ======================= Base =======================
+class _Grabador:
+    """
+    agregar(item, frame_bgr) desde el pipeline; cerrar() vacía la cola y devuelve
+    estadísticas. Las subclases definen _empaquetar, _escribir y _finalizar.
+    """
+
+    def __init__(self, ruta, max_cola=COLA_GRABACION, instr=None, al_descartar=None):
+        self.ruta = ruta
+        self.instr = instr
+        self.cola = ColaDescartable(max_cola, al_descartar)
+        self.escritos = 0
+        self.error = None
+        self._hilo = threading.Thread(target=self._loop, name=f"grabador-{os.path.basename(ruta)}",
+                                      daemon=True)
+        self._hilo.start()
+
+    def agregar(self, item, frame):
+        self.cola.put(self._empaquetar(item, frame))
+
+    def _loop(self):
+        try:
+            while True:
+                x = self.cola.get(timeout=0.5)
+                if x is None:
+                    if self.cola.agotada():
+                        break
+                    continue
+                t0 = time.perf_counter()
+                self._escribir(x)
+                if self.instr is not None:
+                    self.instr.registrar("codificar", time.perf_counter() - t0)
+                self.escritos += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finalizar()
+
+    def cerrar(self, timeout=30.0):
+        self.cola.close()
+        self._hilo.join(timeout)
+        return self.estadisticas()
+
+    def estadisticas(self):
+        return {"ruta": self.ruta, "escritos": self.escritos, "descartados": self.cola.descartados,
+                "pendientes": len(self.cola), "error": None if self.error is None else str(self.error)}
+
+
+# ======================= Video =======================
+class GrabadorVideo(_Grabador):
+    def __init__(self, ruta_base, fps, tam, max_cola=COLA_GRABACION, instr=None, pool=None):
+        """
+        ruta_base sin extensión; `ruta` queda con .mp4 o .avi según el códec disponible.
+        Los cuadros llegan al ritmo (variable) del análisis: cada uno se escribe las veces
+        que le tocan en la grilla de `fps` según su tiempo de captura (item["t"]), así el
+        video dura lo mismo que la sesión. Con `pool` (PoolBuffers) las copias de los cuadros salen de su lista libre y
+        vuelven a ella una vez escritas (o descartadas por la cola).
+        """
+        ruta = ruta_base + ".mp4"
+        vw = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*"mp4v"), fps, tam)
+        if not vw.isOpened():
+            ruta = ruta_base + ".avi"
+            vw = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*"XVID"), fps, tam)
+            if not vw.isOpened():
+                raise OSError("No se pudo iniciar grabación.")
+        self.writer = vw
+        self.fps = fps
+        self.pool = pool
+        self._t0 = None
+        self.cuadros_salida = 0     # cuadros en el archivo (con repeticiones)
+        super().__init__(ruta, max_cola, instr,
+                         al_descartar=(lambda x: pool.devolver(x[1])) if pool is not None else None)
+
+    def _empaquetar(self, item, frame):
+        # el cuadro compuesto es un buffer del pool que se reutiliza en el próximo cuadro: se copia
+        if self.pool is None:
+            return item["t"], frame.copy()
+        copia = self.pool.tomar("grabacion", frame.shape, frame.dtype)
+        np.copyto(copia, frame)
+        return item["t"], copia
+
+    def _escribir(self, x):
+        t, frame = x
+        if self._t0 is None:
+            self._t0 = t
+        # hasta dónde debería llegar el video en t: 0 veces si el análisis va más rápido
+        # que `fps`, varias si se atrasó
+        objetivo = int((t - self._t0) * self.fps) + 1
+        for _ in range(objetivo - self.cuadros_salida):
+            self.writer.write(frame)
+        self.cuadros_salida = max(self.cuadros_salida, objetivo)
+        if self.pool is not None:
+            self.pool.devolver(frame)
+
+    def estadisticas(self):
+        return dict(super().estadisticas(), fps=self.fps, cuadros_salida=self.cuadros_salida)
+
+    def _finalizar(self):
+        self.writer.release()
+
+
+# ======================= Solo landmarks =======================
+class GrabadorLandmarks(_Grabador):
+    """
+    Escribe la pose cuadro a cuadro en un archivo .pose (t en s desde el primer
+    cuadro, landmarks normalizados al cuadro completo, NaN sin pose). ~540 bytes por cuadro.
+    """
+
+    def __init__(self, ruta, tam, fps=0.0, meta=None, max_cola=COLA_LANDMARKS, instr=None):
+        self.salida = EscritorPose(ruta, fps, dict(meta or {}, ancho=tam[0], alto=tam[1]))
+        self._t0 = None
+        self._ultimo_flush = 0.0
+        super().__init__(ruta, max_cola, instr)
+
+    def _empaquetar(self, item, frame):
+        return item["t"], item.get("landmarks")
+
+    def _escribir(self, x):
+        t, lm = x
+        if self._t0 is None:
+            self._t0 = t
+        self.salida.agregar(t - self._t0, lm)
+        # visible para lectores (y a salvo de un cierre abrupto) al menos cada segundo
+        if t - self._ultimo_flush >= 1.0:
+            self.salida.flush()
+            self._ultimo_flush = t
+
+    def _finalizar(self):
+        self.salida.cerrar()
+
+
+def dibujar_esqueleto(lienzo, p, conexiones, grosor=2, radio=4):
+    """Dibuja una pose (33, 4) normalizada sobre `lienzo` (in situ); NaN = sin pose."""
+    if np.isnan(p[0, 0]):
+        return
+    alto, ancho = lienzo.shape[:2]
+    px = np.column_stack([p[:, 0] * ancho, p[:, 1] * alto]).astype(np.int32)
+    vis = p[:, 3] >= VISIBILIDAD_MIN
+    for a, b in conexiones:
+        if vis[a] and vis[b]:
+            cv2.line(lienzo, tuple(px[a]), tuple(px[b]), (255, 255, 255), grosor, cv2.LINE_AA)
+    for j in np.flatnonzero(vis):
+        cv2.circle(lienzo, tuple(px[j]), radio, (0, 0, 255), -1, cv2.LINE_AA)
+
+
+def renderizar(ruta_pose, salida, fps=30.0, fondo=(0, 0, 0)):
+    """Video del esqueleto a partir de una grabación de landmarks (respeta sus tiempos)."""
+    import mediapipe as mp
+
+    sec = SecuenciaPose(ruta_pose)
+    t, lm = sec.t, sec.landmarks
+    ancho, alto = int(sec.meta["ancho"]), int(sec.meta["alto"])
+    vw = cv2.VideoWriter(salida, cv2.VideoWriter_fourcc(*"mp4v"), fps, (ancho, alto))
+    if not vw.isOpened():
+        raise OSError(f"No se pudo crear {salida}")
+    lienzo = np.empty((alto, ancho, 3), dtype=np.uint8)
+    n_salida = int(t[-1] * fps) + 1 if len(t) else 0
+    # cuadro de salida k muestra la última pose registrada hasta k / fps
+    indices = np.searchsorted(t, np.arange(n_salida) / fps, side="right") - 1
+    conexiones = mp.solutions.pose.POSE_CONNECTIONS
+    for i in indices:
+        lienzo[:] = fondo
+        dibujar_esqueleto(lienzo, lm[max(i, 0)], conexiones)
+        vw.write(lienzo)
+    vw.release()
+    sec.cerrar()
+    return n_salida
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Re-renderiza una grabación de solo landmarks.")
+    ap.add_argument("entrada", help="archivo .pose")
+    ap.add_argument("--salida", help="video de salida (defecto: junto a la entrada, .mp4)")
+    ap.add_argument("--fps", type=float, default=30.0)
+    args = ap.parse_args(argv)
+    salida = args.salida or os.path.splitext(args.entrada)[0] + ".mp4"
+    n = renderizar(args.entrada, salida, args.fps)
+    print(f"{n} cuadros -> {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
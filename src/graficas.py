@@ -0,0 +1,186 @@
+"""
+Gráficas del ángulo en el tiempo para el reporte PDF (vectoriales, con reportlab).
+
+Una sesión de 30 min a 30 FPS son ~54k muestras por curva: dibujarlas todas da un
+PDF pesado y lento de abrir sin que se vea más detalle (la gráfica mide ~500 pt de
+ancho). Antes de dibujar cada curva se reduce con Largest-Triangle-Three-Buckets
+(LTTB), que conserva picos y valles (las repeticiones) con un número acotado de
+puntos. La reducción se hace al armar los datos del reporte (serie_grafica), así lo
+que viaja a los procesos de reportes_lote es chico.
+
+Los huecos de más de HUECO_S (abducción fuera del plano, pose perdida: serie_sesion
+los deja en NaN) cortan la línea en vez de unirse con una recta engañosa. Un hueco
+más angosto que dos puntos de la curva (duración * 2 / PUNTOS_CURVA) no se
+distingue al dibujar y no corta: así hay a lo más PUNTOS_CURVA / 2 tramos y el total
+de puntos queda acotado por PUNTOS_CURVA aunque la pose se pierda a cada rato.
+"""
+from io import BytesIO
+
+import numpy as np
+from reportlab.lib.colors import Color, black, grey
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from biomecanica import TARGETS, TOL
+
+PUNTOS_CURVA = 800       # puntos por curva después de LTTB (~1.5 por punto de ancho)
+HUECO_S = 1.0            # sin muestras válidas por más de esto: la línea se corta
+CURVAS = ("Flexión", "Abducción")
+
+COLOR_BANDA = Color(0.82, 0.94, 0.82)
+COLOR_CURVA = Color(0.10, 0.30, 0.70)
+COLOR_PICO = Color(0.85, 0.20, 0.20)
+PASOS_T = (5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600)   # s entre marcas del eje x
+
+
+# ======================= Reducción (LTTB) =======================
+def lttb(x, y, n):
+    """
+    Índices de los `n` puntos de (x, y) que conserva Largest-Triangle-Three-Buckets.
+    El primero y el último siempre quedan; de cada cubeta intermedia se toma el punto
+    que forma el triángulo más grande con el elegido antes y el promedio de la siguiente.
+    """
+    m = len(x)
+    if n >= m:
+        return np.arange(m)
+    if n < 3:
+        return np.array([0, m - 1], np.intp)
+    bordes = np.linspace(1, m - 1, n - 1).astype(np.intp)     # n - 2 cubetas en [1, m - 1)
+    # promedios de cada cubeta (la "siguiente" de la última es el punto final)
+    cx = np.append(np.add.reduceat(x[1:m - 1], bordes[:-1] - 1) / np.diff(bordes), x[m - 1])
+    cy = np.append(np.add.reduceat(y[1:m - 1], bordes[:-1] - 1) / np.diff(bordes), y[m - 1])
+    sel = np.empty(n, np.intp)
+    sel[0], sel[-1] = 0, m - 1
+    a = 0
+    for i in range(n - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        xa, ya = x[a], y[a]
+        area = np.abs((xa - cx[i + 1]) * (y[ini:fin] - ya) - (xa - x[ini:fin]) * (cy[i + 1] - ya))
+        a = ini + int(np.argmax(area))
+        sel[i + 1] = a
+    return sel
+
+
+def tramos_reducidos(t, y, puntos=PUNTOS_CURVA, hueco_s=HUECO_S):
+    """
+    Curva (con NaN donde no hubo valor) -> lista de tramos [(t, y), ...] sin huecos
+    largos, reducidos con LTTB a lo más `puntos` en total: los extremos de cada tramo
+    y el resto repartido según su largo.
+    """
+    validos = ~np.isnan(y)
+    t, y = t[validos], y[validos]
+    if len(t) == 0:
+        return []
+    hueco = max(hueco_s, 2.0 * (t[-1] - t[0]) / puntos)   # menos que dos puntos no se ve
+    cortes = np.flatnonzero(np.diff(t) > hueco) + 1
+    limites = np.concatenate(([0], cortes, [len(t)]))
+    resto = max(0, puntos - 2 * (len(limites) - 1))
+    tramos = []
+    for ini, fin in zip(limites[:-1], limites[1:]):
+        n = 2 + resto * (fin - ini) // len(t)
+        tt, yy = t[ini:fin], y[ini:fin]
+        idx = lttb(tt, yy, n)
+        tramos.append([(round(float(a), 2), round(float(b), 1)) for a, b in zip(tt[idx], yy[idx])])
+    return tramos
+
+
+def serie_grafica(t, flex, abd, puntos=PUNTOS_CURVA):
+    """Serie de la sesión (BaseDatos.serie_sesion) -> datos["serie"] para el reporte."""
+    t = np.asarray(t, dtype=np.float64)
+    if len(t) == 0:
+        return None
+    return {"duracion": float(t[-1]),
+            "Flexión": tramos_reducidos(t, np.asarray(flex, dtype=np.float64), puntos),
+            "Abducción": tramos_reducidos(t, np.asarray(abd, dtype=np.float64), puntos)}
+
+
+# ======================= Dibujo =======================
+def _paso_tiempo(duracion, marcas=8):
+    for p in PASOS_T:
+        if duracion / p <= marcas:
+            return p
+    return PASOS_T[-1]
+
+
+def _mmss(s):
+    return f"{int(s) // 60}:{int(s) % 60:02d}"
+
+
+def dibujar_grafica(c, caja, titulo, tramos, duracion, picos=(), targets=TARGETS, tol=TOL):
+    """Una curva en `caja` (x, y, ancho, alto en pt) con las bandas de meta (±tol) detrás."""
+    x0, y0, ancho, alto = caja
+    y_max = max([180.0 + 2 * tol] + [v for tr in tramos for _, v in tr])
+    y_max = 30.0 * np.ceil(y_max / 30.0)
+    duracion = max(duracion, 1.0)
+
+    def px(t):
+        return x0 + ancho * t / duracion
+
+    def py(v):
+        return y0 + alto * min(max(v, 0.0), y_max) / y_max
+
+    c.saveState()
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(x0, y0 + alto + 8, titulo)
+    # bandas de meta
+    c.setFillColor(COLOR_BANDA)
+    for m in targets:
+        c.rect(x0, py(m - tol), ancho, py(m + tol) - py(m - tol), fill=1, stroke=0)
+    # rejilla y ejes
+    c.setFont("Helvetica", 7)
+    c.setLineWidth(0.3)
+    c.setStrokeColor(grey)
+    c.setFillColor(black)
+    for v in np.arange(0.0, y_max + 1, 30.0):
+        c.line(x0, py(v), x0 + ancho, py(v))
+        c.drawRightString(x0 - 4, py(v) - 2.5, f"{v:.0f}°")
+    paso = _paso_tiempo(duracion)
+    for s in np.arange(0.0, duracion + 1e-6, paso):
+        c.line(px(s), y0, px(s), y0 - 3)
+        c.drawCentredString(px(s), y0 - 11, _mmss(s))
+    c.setStrokeColor(black)
+    c.setLineWidth(0.6)
+    c.rect(x0, y0, ancho, alto, fill=0, stroke=1)
+    # curva: un solo path por gráfica
+    if tramos:
+        p = c.beginPath()
+        for tr in tramos:
+            p.moveTo(px(tr[0][0]), py(tr[0][1]))
+            for t, v in tr[1:]:
+                p.lineTo(px(t), py(v))
+        c.setStrokeColor(COLOR_CURVA)
+        c.setLineWidth(0.8)
+        c.setLineJoin(1)
+        c.drawPath(p, stroke=1, fill=0)
+    else:
+        c.drawCentredString(x0 + ancho / 2, y0 + alto / 2, "Sin datos válidos")
+    # picos de las repeticiones detectadas
+    c.setFillColor(COLOR_PICO)
+    for t, v in picos:
+        c.circle(px(t), py(v), 1.8, fill=1, stroke=0)
+    c.restoreState()
+
+
+def render_graficas(datos) -> bytes:
+    """Página (PDF en bytes) con las curvas de flexión y abducción de datos["serie"]."""
+    serie = datos["serie"]
+    metricas = datos.get("metricas") or {}
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    w, h = letter
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(60, h - 60, "Ángulo del hombro durante la sesión")
+    c.setFont("Helvetica", 10)
+    c.drawString(60, h - 76, f"{datos.get('paciente', '')}   {datos.get('fecha', '')}   "
+                             f"{datos.get('ejercicio', '')}")
+    c.drawString(60, h - 90, f"Bandas: metas {' / '.join(f'{m:g}°' for m in TARGETS)} (±{TOL:g}°)   "
+                             f"Puntos: picos de las repeticiones")
+    alto = (h - 200) / 2 - 30
+    for i, curva in enumerate(CURVAS):
+        picos = [(r["pico"], r["maximo"]) for r in metricas.get("reps") or []] \
+            if metricas.get("modo") == curva else ()
+        y = h - 130 - (i + 1) * alto - i * 60
+        dibujar_grafica(c, (70, y, w - 120, alto), curva, serie.get(curva) or [],
+                        serie.get("duracion", 0.0), picos)
+    c.save()
+    return buffer.getvalue()
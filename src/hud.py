@@ -0,0 +1,99 @@
+"""
+Panel de datos sobre el video (HUD) compuesto por capas.
+
+La capa estática (paciente, ejercicio, modo, fecha y etiquetas de metas) se dibuja
+una vez sobre negro y se guarda con su máscara; solo se vuelve a dibujar cuando cambia
+alguno de sus datos (la fecha, una vez por segundo). Por cuadro:
+  1. se oscurece solo el rectángulo del panel, en el lugar (antes: copia + addWeighted
+     sobre la imagen entera)
+  2. se pega la capa estática con su máscara
+  3. se dibuja lo dinámico (ángulos, estados, repeticiones, alineación)
+"""
+import cv2
+import numpy as np
+
+PANEL = (5, 5, 520, 230)        # x0, y0, x1, y1 (inclusive, como cv2.rectangle)
+FUENTE = cv2.FONT_HERSHEY_SIMPLEX
+X_TEXTO = 15
+X_METAS = 200                   # columna fija de "/ Metas: ..." (no depende del largo del valor)
+Y_ANGULOS = 120
+INTERLINEA = 28
+BLANCO = (255, 255, 255)
+GRIS = (200, 200, 200)
+
+
+class CompositorHUD:
+    """componer(frame, item) dibuja el panel sobre `frame` (BGR) en el lugar."""
+
+    def __init__(self, paciente="", ejercicio="", modo="Flexión", meta_texto=""):
+        self.paciente = paciente
+        self.ejercicio = ejercicio
+        self.modo = modo
+        self.meta_texto = meta_texto
+        x0, y0, x1, y1 = PANEL
+        self._capa = np.zeros((y1 - y0 + 1, x1 - x0 + 1, 3), np.uint8)
+        self._mascara = np.zeros(self._capa.shape, bool)   # 3 canales: copyto sin broadcast es mucho más rápido
+        self._clave = None
+        self.redibujos = 0
+
+    # ---------------- Capa estática ----------------
+    def _dibujar_estatica(self, fecha_str):
+        capa = self._capa
+        capa[:] = 0
+        x0, y0 = PANEL[:2]
+
+        def texto(t, y, color=BLANCO, escala=0.6, grosor=1, x=X_TEXTO):
+            cv2.putText(capa, t, (x - x0, y - y0), FUENTE, escala, color, grosor)
+        texto(f"Paciente: {self.paciente}", 28)
+        texto(f"Ejercicio: {self.ejercicio}", 50)
+        texto(f"Modo evaluado: {self.modo}", 72, (200, 255, 200))
+        texto(fecha_str, 94)
+        for i in range(2):
+            texto(f"/ Metas: {self.meta_texto}", Y_ANGULOS + i * INTERLINEA, GRIS, 0.65, 2, X_METAS)
+        # el negro no se dibuja: lo que no es texto deja ver el video oscurecido
+        self._mascara[:] = np.any(capa != 0, axis=2, keepdims=True)
+        self.redibujos += 1
+
+    def _actualizar_estatica(self, fecha_str):
+        clave = (self.paciente, self.ejercicio, self.modo, self.meta_texto, fecha_str)
+        if clave != self._clave:
+            self._dibujar_estatica(fecha_str)
+            self._clave = clave
+
+    # ---------------- Por cuadro ----------------
+    def componer(self, frame, item, fecha_str):
+        self._actualizar_estatica(fecha_str)
+        x0, y0, x1, y1 = PANEL
+        h, w = frame.shape[:2]
+        roi = frame[y0:min(y1 + 1, h), x0:min(x1 + 1, w)]
+        rh, rw = roi.shape[:2]
+        # mismo resultado que addWeighted(negro, 0.5, frame, 0.5) pero solo en el panel
+        np.right_shift(roi, 1, out=roi)
+        np.copyto(roi, self._capa[:rh, :rw], where=self._mascara[:rh, :rw])
+        self._dibujar_dinamico(frame, item)
+        return frame
+
+    def _dibujar_dinamico(self, frame, item):
+        s_flex, s_abd = item["s_flex"], item["s_abd"]
+        estado_flex_ok, estado_abd = item["estado_flex_ok"], item["estado_abd"]
+        # Colores según modo: solo el ángulo del modo se pinta verde/rojo; el otro, gris informativo.
+        if self.modo == "Flexión":
+            col_f = (0, 255, 0) if estado_flex_ok else (0, 0, 255)
+            col_a = GRIS
+        else:  # Abducción
+            col_a = (0, 255, 0) if estado_abd == "✓" else (0, 0, 255)
+            col_f = GRIS
+
+        y = Y_ANGULOS
+        txt_f = "Flexión: —" if s_flex is None else f"Flexión: {round(s_flex, 1)}°"
+        cv2.putText(frame, txt_f, (X_TEXTO, y), FUENTE, 0.65, col_f, 2)
+        y += INTERLINEA
+        txt_a = "Abducción: —" if s_abd is None else f"Abducción: {round(s_abd, 1)}°"
+        cv2.putText(frame, txt_a, (X_TEXTO, y), FUENTE, 0.65, col_a, 2)
+        y += INTERLINEA
+        cv2.putText(frame, f"Repeticiones: {item['repeticiones']}", (X_TEXTO, y), FUENTE, 0.65, BLANCO, 2)
+        al = item.get("alineacion")
+        if al is not None:
+            y += INTERLINEA
+            cv2.putText(frame, f"Vs. referencia: desfase {al['desfase_s']:+.1f} s / desv. {al['desviacion_deg']:.0f}°",
+                        (X_TEXTO, y), FUENTE, 0.6, (255, 220, 150), 1)
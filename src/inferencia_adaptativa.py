@@ -0,0 +1,211 @@
+import time
+
+import cv2
+import numpy as np
+
+from biomecanica import POSE_PARAMS
+from buffers import PoolBuffers
+
+# Niveles de costo creciente: (model_complexity, escala de la imagen de entrada)
+NIVELES = [
+    (0, 0.50),
+    (0, 0.75),
+    (1, 0.75),
+    (1, 1.00),
+    (2, 1.00),
+]
+NIVEL_INICIAL = 3           # equivale a la configuración original (complexity=1, resolución completa)
+
+
+class InferenciaAdaptativa:
+    """
+    Envuelve MediaPipe Pose y ajusta el costo para sostener fps_objetivo:
+    - ROI: recorta a la caja (con margen) de la pose anterior. La caja solo se
+      recalcula cuando la pose se acerca al borde, para que el seguimiento interno
+      de MediaPipe vea una imagen estable; si se pierde la pose, vuelve a cuadro completo.
+    - Nivel: sube/baja model_complexity y la resolución de entrada según el tiempo
+      medio de inferencia (EMA) frente al presupuesto 1/fps_objetivo.
+    Los landmarks devueltos siempre están normalizados al cuadro COMPLETO.
+    """
+
+    def __init__(self, fps_objetivo=20.0, nivel=NIVEL_INICIAL, margen_roi=0.25,
+                 usar_roi=True, adaptar=True, pose_params=None, niveles=NIVELES):
+        self.fps_objetivo = float(fps_objetivo)
+        self.presupuesto = 1.0 / self.fps_objetivo
+        self.niveles = list(niveles)
+        self.nivel = min(max(0, nivel), len(self.niveles) - 1)
+        self.margen_roi = margen_roi
+        self.usar_roi = usar_roi
+        self.adaptar = adaptar        # False: nivel fijo (p. ej. benchmarks reproducibles)
+        self.pose_params = dict(pose_params or POSE_PARAMS)
+        self._poses = {}
+        self.roi = None               # (x0, y0, x1, y1) en píxeles del cuadro completo
+        self.t_ema = None
+        self._racha_lento = 0
+        self._racha_rapido = 0
+        self._enfriamiento = 0
+        self.perdidas = 0
+        self.pool = PoolBuffers()     # recorte/escala para MediaPipe sin asignar por cuadro
+
+    # ---------------- Pose por complejidad ----------------
+    def _pose(self, complejidad):
+        pose = self._poses.get(complejidad)
+        if pose is None:
+            import mediapipe as mp
+            pose = mp.solutions.pose.Pose(**dict(self.pose_params, model_complexity=complejidad))
+            self._poses[complejidad] = pose
+        return pose
+
+    @property
+    def complejidad(self):
+        return self.niveles[self.nivel][0]
+
+    @property
+    def escala(self):
+        return self.niveles[self.nivel][1]
+
+    # ---------------- Inferencia ----------------
+    def procesar(self, rgb):
+        t0 = time.perf_counter()
+        alto, ancho = rgb.shape[:2]
+
+        if self.usar_roi and self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            img = rgb[y0:y1, x0:x1]
+        else:
+            x0, y0, x1, y1 = 0, 0, ancho, alto
+            img = rgb
+
+        # MediaPipe procesa en el momento: un solo buffer por uso alcanza
+        self.pool.cuadro()
+        if self.escala < 1.0:
+            h, w = img.shape[:2]
+            tam = (max(1, round(w * self.escala)), max(1, round(h * self.escala)))
+            destino = self.pool.anillo("escala", (tam[1], tam[0], 3), n=1)
+            img = self.pool.usado(cv2.resize(img, tam, dst=destino, interpolation=cv2.INTER_AREA), destino)
+        elif not img.flags.c_contiguous:
+            destino = self.pool.anillo("recorte", img.shape, n=1)
+            np.copyto(destino, img)
+            img = destino
+
+        res = self._pose(self.complejidad).process(img)
+
+        if res.pose_landmarks:
+            if (x0, y0, x1, y1) != (0, 0, ancho, alto):
+                self._a_cuadro_completo(res.pose_landmarks.landmark, x0, y0, x1 - x0, y1 - y0, ancho, alto)
+            self._actualizar_roi(res.pose_landmarks.landmark, ancho, alto)
+        else:
+            # seguimiento perdido: la siguiente búsqueda es en el cuadro completo
+            if self.roi is not None:
+                self.perdidas += 1
+            self.roi = None
+
+        if self.adaptar:
+            self._ajustar_nivel(time.perf_counter() - t0)
+        return res
+
+    @staticmethod
+    def _a_cuadro_completo(lm, x0, y0, w, h, ancho, alto):
+        sx, sy = w / ancho, h / alto
+        ox, oy = x0 / ancho, y0 / alto
+        for p in lm:
+            p.x = ox + p.x * sx
+            p.y = oy + p.y * sy
+            p.z = p.z * sx   # z usa la escala de x en MediaPipe
+
+    def _actualizar_roi(self, lm, ancho, alto, vis_min=0.5):
+        pts = [(p.x, p.y) for p in lm if p.visibility >= vis_min]
+        if len(pts) < 4:
+            self.roi = None
+            return
+        xs, ys = zip(*pts)
+        bx0, bx1 = min(xs) * ancho, max(xs) * ancho
+        by0, by1 = min(ys) * alto, max(ys) * alto
+
+        if self.roi is not None:
+            # histéresis: se conserva la caja mientras la pose quede holgada dentro
+            x0, y0, x1, y1 = self.roi
+            borde_x = (x1 - x0) * self.margen_roi * 0.3
+            borde_y = (y1 - y0) * self.margen_roi * 0.3
+            dentro = (bx0 - x0 > borde_x and x1 - bx1 > borde_x and
+                      by0 - y0 > borde_y and y1 - by1 > borde_y)
+            ajustada = (bx1 - bx0) * (by1 - by0) > 0.25 * (x1 - x0) * (y1 - y0)
+            if dentro and ajustada:
+                return
+
+        mx = (bx1 - bx0) * self.margen_roi
+        my = (by1 - by0) * self.margen_roi
+        x0, x1 = int(max(0, bx0 - mx)), int(min(ancho, bx1 + mx))
+        y0, y1 = int(max(0, by0 - my)), int(min(alto, by1 + my))
+        if x1 - x0 < 32 or y1 - y0 < 32:
+            self.roi = None
+            return
+        self.roi = (x0, y0, x1, y1)
+
+    # ---------------- Control de nivel ----------------
+    def _ajustar_nivel(self, dt, alfa=0.1, racha=15, enfriamiento=30):
+        self.t_ema = dt if self.t_ema is None else (1 - alfa) * self.t_ema + alfa * dt
+        if self._enfriamiento > 0:
+            self._enfriamiento -= 1
+            return
+        if self.t_ema > self.presupuesto * 1.05:
+            self._racha_lento += 1
+            self._racha_rapido = 0
+        elif self.t_ema < self.presupuesto * 0.6:
+            self._racha_rapido += 1
+            self._racha_lento = 0
+        else:
+            self._racha_lento = self._racha_rapido = 0
+
+        nuevo = self.nivel
+        if self._racha_lento >= racha and self.nivel > 0:
+            nuevo = self.nivel - 1
+        elif self._racha_rapido >= racha and self.nivel < len(self.niveles) - 1:
+            nuevo = self.nivel + 1
+        if nuevo != self.nivel:
+            self.nivel = nuevo
+            self.t_ema = None
+            self._racha_lento = self._racha_rapido = 0
+            self._enfriamiento = enfriamiento
+
+    # ---------------- Reutilización entre sesiones ----------------
+    def reiniciar(self):
+        """
+        Olvida el seguimiento (ROI, pose anterior) pero conserva los grafos de MediaPipe
+        ya cargados y el nivel alcanzado: la siguiente sesión empieza sin recargar el modelo.
+        """
+        for complejidad, pose in list(self._poses.items()):
+            reset = getattr(pose, "reset", None)
+            if reset is not None:
+                reset()
+            else:
+                pose.close()
+                del self._poses[complejidad]
+        self.roi = None
+        self.t_ema = None
+        self._racha_lento = self._racha_rapido = 0
+        self._enfriamiento = 0
+        self.perdidas = 0
+
+    def calentar(self, tam=(640, 480)):
+        """Carga el grafo del nivel actual y procesa un cuadro negro; devuelve los segundos."""
+        t0 = time.perf_counter()
+        self._pose(self.complejidad).process(np.zeros((tam[1], tam[0], 3), dtype=np.uint8))
+        self.reiniciar()
+        return time.perf_counter() - t0
+
+    def estado(self):
+        return {
+            "nivel": self.nivel,
+            "model_complexity": self.complejidad,
+            "escala": self.escala,
+            "roi": self.roi,
+            "fps_inferencia": (1.0 / self.t_ema) if self.t_ema else None,
+            "perdidas": self.perdidas,
+            "buffers": self.pool.estado(),
+        }
+
+    def cerrar(self):
+        for pose in self._poses.values():
+            pose.close()
+        self._poses.clear()
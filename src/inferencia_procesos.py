@@ -0,0 +1,274 @@
+"""
+MediaPipe Pose en procesos aparte, con los cuadros en memoria compartida.
+
+Cada canal (una cámara) tiene un anillo de ranuras en multiprocessing.shared_memory:
+el cuadro RGB se escribe directo en la ranura (cvtColor con dst=entrada(...)), por
+la cola solo viaja (ranura, alto, ancho, n) y el proceso devuelve los landmarks
+(33 x 4 float32) en la misma memoria. Así la inferencia no compite por el GIL con
+Tk, el dibujo o la grabación.
+
+Cada canal queda fijo a un proceso y tiene su propia InferenciaAdaptativa, porque el
+seguimiento de MediaPipe necesita ver los cuadros de una cámara en orden.
+
+Los procesos están pensados para vivir toda la app: con calentar=True cargan el modelo
+al arrancar, y cerrar un canal solo reinicia su seguimiento (la Pose sigue cargada
+para la siguiente sesión).
+"""
+import multiprocessing as mp_proc
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from biomecanica import N_LANDMARKS
+
+RANURAS = 2               # cuadros en vuelo por canal (uno se escribe mientras otro se procesa)
+TAM_MAXIMO = (1920, 1080)
+TIMEOUT_RESPUESTA = 10.0  # s; más que esto = proceso caído
+CADA_ESTADO = 30          # el proceso informa su estado de adaptación cada tantos cuadros
+_BYTES_LANDMARKS = N_LANDMARKS * 4 * 4
+
+
+def _vistas(buf, ranuras, bytes_cuadro):
+    """(cuadros planos (ranuras, bytes_cuadro) uint8, landmarks (ranuras, 33, 4) float32)."""
+    cuadros = np.ndarray((ranuras, bytes_cuadro), dtype=np.uint8, buffer=buf)
+    lms = np.ndarray((ranuras, N_LANDMARKS, 4), dtype=np.float32, buffer=buf,
+                     offset=ranuras * bytes_cuadro)
+    return cuadros, lms
+
+
+# ======================= Proceso de trabajo =======================
+def _trabajador(pedidos, canales, kw_inferencia, avisos=None):
+    """
+    canales: {id: (nombre_shm, ranuras, bytes_cuadro, cola_respuestas)}.
+    Pedido: (canal, ranura, alto, ancho, n) | ("reiniciar", canal) | None (terminar).
+    avisos: si se da, se calientan las inferencias de todos los canales antes de
+    atender pedidos y se avisa (segundos de calentamiento, error) por esa cola.
+    """
+    from inferencia_adaptativa import InferenciaAdaptativa
+
+    shms, vistas, inferencias = [], {}, {}
+    try:
+        for cid, (nombre, ranuras, bytes_cuadro, _) in canales.items():
+            shm = shared_memory.SharedMemory(name=nombre)
+            shms.append(shm)
+            vistas[cid] = _vistas(shm.buf, ranuras, bytes_cuadro)
+        if avisos is not None:
+            t0 = time.perf_counter()
+            try:
+                for cid in canales:
+                    inferencias[cid] = InferenciaAdaptativa(**kw_inferencia)
+                    inferencias[cid].calentar()
+                avisos.put((time.perf_counter() - t0, None))
+            except Exception as e:
+                avisos.put((time.perf_counter() - t0, repr(e)))
+        while True:
+            p = pedidos.get()
+            if p is None:
+                break
+            if p[0] == "reiniciar":
+                inf = inferencias.get(p[1])
+                if inf is not None:
+                    inf.reiniciar()
+                continue
+            cid, ranura, alto, ancho, n = p
+            respuestas = canales[cid][3]
+            cuadros, lms = vistas[cid]
+            try:
+                inf = inferencias.get(cid)
+                if inf is None:
+                    inf = inferencias[cid] = InferenciaAdaptativa(**kw_inferencia)
+                rgb = cuadros[ranura, :alto * ancho * 3].reshape(alto, ancho, 3)
+                t0 = time.perf_counter()
+                res = inf.procesar(rgb)
+                dt = time.perf_counter() - t0
+                detectado = bool(res.pose_landmarks)
+                if detectado:
+                    lms[ranura] = [(q.x, q.y, q.z, q.visibility) for q in res.pose_landmarks.landmark]
+                estado = inf.estado() if n % CADA_ESTADO == 0 else None
+                respuestas.put((n, detectado, dt, estado, None))
+            except Exception as e:
+                respuestas.put((n, False, 0.0, None, repr(e)))
+    finally:
+        for inf in inferencias.values():
+            inf.cerrar()
+        vistas.clear()
+        cuadros = lms = rgb = None    # sin vistas vivas la memoria se puede cerrar
+        for shm in shms:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+
+
+# ======================= Resultado =======================
+class ResultadoPose:
+    """Compatible con el resultado de MediaPipe (.pose_landmarks) + el arreglo (33, 4)."""
+
+    __slots__ = ("arreglo", "_proto")
+
+    def __init__(self, arreglo):
+        self.arreglo = arreglo
+        self._proto = None
+
+    @property
+    def pose_landmarks(self):
+        # el protobuf solo se arma si alguien lo pide (p. ej. para dibujar con drawing_utils)
+        if self.arreglo is None:
+            return None
+        if self._proto is None:
+            from mediapipe.framework.formats import landmark_pb2
+            lista = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z, v in self.arreglo.tolist():
+                lista.landmark.add(x=x, y=y, z=z, visibility=v)
+            self._proto = lista
+        return self._proto
+
+
+# ======================= Lado de la app =======================
+class CanalInferencia:
+    """
+    Misma interfaz que InferenciaAdaptativa (procesar, estado, cerrar) para una cámara.
+    entrada(alto, ancho) da la ranura donde escribir el siguiente cuadro sin copias extra.
+    """
+
+    def __init__(self, servidor, cid, shm, ranuras, bytes_cuadro, pedidos, respuestas):
+        self._servidor = servidor
+        self.cid = cid
+        self._shm = shm
+        self._cuadros, self._lms = _vistas(shm.buf, ranuras, bytes_cuadro)
+        self.ranuras = ranuras
+        self.bytes_cuadro = bytes_cuadro
+        self._pedidos = pedidos
+        self._respuestas = respuestas
+        self._n = 0
+        self.atrasadas = 0        # respuestas descartadas por llegar después del timeout
+        self._estado = {}
+        self.t_inferencia = 0.0
+
+    def _ranura(self):
+        return self._n % self.ranuras
+
+    def entrada(self, alto, ancho):
+        """Vista (alto, ancho, 3) de la ranura del próximo procesar()."""
+        if alto * ancho * 3 > self.bytes_cuadro:
+            raise ValueError(f"Cuadro {ancho}x{alto} mayor que la memoria compartida del canal")
+        return self._cuadros[self._ranura(), :alto * ancho * 3].reshape(alto, ancho, 3)
+
+    def procesar(self, rgb):
+        self.enviar(rgb)
+        return self.recibir()
+
+    # procesar() en dos mitades: quien atiende varias cámaras (servicio_pose) envía un
+    # cuadro por canal y después junta las respuestas, con todos los procesos trabajando a la vez
+    def enviar(self, rgb):
+        alto, ancho = rgb.shape[:2]
+        destino = self.entrada(alto, ancho)
+        if not np.shares_memory(rgb, destino):
+            destino[:] = rgb
+        self._pedidos.put((self.cid, self._ranura(), alto, ancho, self._n))
+
+    def recibir(self):
+        ranura = self._ranura()
+        limite = time.monotonic() + TIMEOUT_RESPUESTA
+        while True:
+            try:
+                n, detectado, dt, estado, error = self._respuestas.get(
+                    timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                # se pasa al siguiente n igual: si la respuesta llega tarde, se descarta
+                # abajo en vez de tomarse como la del próximo cuadro
+                self._n += 1
+                raise RuntimeError("El proceso de inferencia no responde") from None
+            if n == self._n:
+                break
+            self.atrasadas += 1      # de un pedido que ya venció
+        self._n += 1
+        if error is not None:
+            raise RuntimeError(f"Error en el proceso de inferencia: {error}")
+        self.t_inferencia = dt
+        if estado is not None:
+            self._estado = estado
+        return ResultadoPose(self._lms[ranura].copy() if detectado else None)
+
+    def reiniciar(self):
+        """Olvida el seguimiento (nueva sesión con la misma cámara)."""
+        self._pedidos.put(("reiniciar", self.cid))
+
+    def estado(self):
+        return dict(self._estado, proceso=self.cid % self._servidor.n_procesos, atrasadas=self.atrasadas)
+
+    def cerrar(self):
+        """Fin de la sesión del canal: reinicia su seguimiento (la Pose queda cargada para la
+        siguiente); los procesos los cierra ServidorInferencia.cerrar()."""
+        if not self._servidor._cerrado:
+            self.reiniciar()
+
+
+class ServidorInferencia:
+    """
+    n_procesos procesos con MediaPipe; `canales` cámaras repartidas entre ellos.
+    kw_inferencia se pasa a InferenciaAdaptativa dentro de cada proceso.
+    calentar=True: cada proceso carga el modelo al arrancar (esperar_listo() lo espera).
+    """
+
+    def __init__(self, canales=1, n_procesos=1, tam_maximo=TAM_MAXIMO, ranuras=RANURAS, calentar=False,
+                 **kw_inferencia):
+        self.n_procesos = max(1, min(n_procesos, canales))
+        self.tam_maximo = tam_maximo
+        self._cerrado = False
+        self.t_calentamiento = None
+        ctx = mp_proc.get_context("spawn")    # fork con hilos (Tk, OpenCV) no es seguro
+        bytes_cuadro = tam_maximo[0] * tam_maximo[1] * 3
+        self._shms, self.canales, self._procesos = [], [], []
+        pedidos = [ctx.Queue() for _ in range(self.n_procesos)]
+        por_proceso = [{} for _ in range(self.n_procesos)]
+        self._avisos = ctx.Queue() if calentar else None
+        for cid in range(canales):
+            shm = shared_memory.SharedMemory(create=True, size=ranuras * (bytes_cuadro + _BYTES_LANDMARKS))
+            self._shms.append(shm)
+            respuestas = ctx.Queue()
+            k = cid % self.n_procesos
+            por_proceso[k][cid] = (shm.name, ranuras, bytes_cuadro, respuestas)
+            self.canales.append(CanalInferencia(self, cid, shm, ranuras, bytes_cuadro, pedidos[k], respuestas))
+        for k in range(self.n_procesos):
+            p = ctx.Process(target=_trabajador, args=(pedidos[k], por_proceso[k], kw_inferencia, self._avisos),
+                            name=f"inferencia-{k}", daemon=True)
+            p.start()
+            self._procesos.append((p, pedidos[k]))
+
+    def esperar_listo(self, timeout=60.0):
+        """Espera el calentamiento de todos los procesos; devuelve los segundos del más lento."""
+        if self._avisos is None or self.t_calentamiento is not None:
+            return self.t_calentamiento
+        tiempos = []
+        for _ in range(self.n_procesos):
+            try:
+                dt, error = self._avisos.get(timeout=timeout)
+            except queue.Empty:
+                raise RuntimeError("El proceso de inferencia no terminó de cargar el modelo") from None
+            if error is not None:
+                raise RuntimeError(f"Error al cargar el modelo: {error}")
+            tiempos.append(dt)
+        self.t_calentamiento = max(tiempos)
+        return self.t_calentamiento
+
+    def cerrar(self, timeout=5.0):
+        if self._cerrado:
+            return
+        self._cerrado = True
+        for p, pedidos in self._procesos:
+            pedidos.put(None)
+        for p, _ in self._procesos:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        for c in self.canales:
+            c._cuadros = c._lms = None     # soltar las vistas antes de cerrar la memoria
+        for shm in self._shms:
+            try:
+                shm.close()
+            except BufferError:
+                pass                         # queda alguna vista viva; se libera con el proceso
+            shm.unlink()
@@ -0,0 +1,145 @@
+import csv
+import json
+import math
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# ======================= Histograma =======================
+class Histograma:
+    """
+    Histograma de tiempos de tamaño fijo con cubetas logarítmicas
+    (t_min..t_max segundos). Memoria constante sin importar la duración de la sesión.
+    Pensado para un solo hilo escritor por histograma.
+    """
+
+    def __init__(self, t_min=1e-4, t_max=10.0, cubetas=160):
+        self.t_min = t_min
+        self.t_max = t_max
+        self.cubetas = cubetas
+        self._log_min = math.log(t_min)
+        self._factor = cubetas / (math.log(t_max) - self._log_min)
+        self.cuentas = np.zeros(cubetas, dtype=np.int64)
+        self.n = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.ultimo = 0.0
+
+    def registrar(self, dt):
+        if dt <= self.t_min:
+            i = 0
+        else:
+            i = min(self.cubetas - 1, int((math.log(dt) - self._log_min) * self._factor))
+        self.cuentas[i] += 1
+        self.n += 1
+        self.suma += dt
+        self.ultimo = dt
+        if dt > self.maximo:
+            self.maximo = dt
+
+    def limites(self):
+        """Bordes de las cubetas (cubetas + 1 valores, en segundos)."""
+        return np.exp(self._log_min + np.arange(self.cubetas + 1) / self._factor)
+
+    def percentil(self, p):
+        if self.n == 0:
+            return 0.0
+        acum = np.cumsum(self.cuentas)
+        i = int(np.searchsorted(acum, p / 100.0 * self.n))
+        bordes = self.limites()
+        i = min(i, self.cubetas - 1)
+        return float(math.sqrt(bordes[i] * bordes[i + 1]))  # centro geométrico
+
+    def resumen(self):
+        return {
+            "n": self.n,
+            "media_ms": 1000 * self.suma / self.n if self.n else 0.0,
+            "p50_ms": 1000 * self.percentil(50),
+            "p95_ms": 1000 * self.percentil(95),
+            "p99_ms": 1000 * self.percentil(99),
+            "max_ms": 1000 * self.maximo,
+        }
+
+
+# ======================= Instrumentación =======================
+class Instrumentacion:
+    """
+    Tiempos por etapa + latencia cámara->pantalla, en histogramas fijos.
+        with instr.medir("inferencia"): ...
+        instr.cuadro_mostrado(t_captura)   # en el hilo de Tk, al pintar
+    """
+
+    LATENCIA = "latencia_total"
+
+    def __init__(self, ventana_fps=60):
+        self.histogramas = {}
+        self._mostrados = deque(maxlen=ventana_fps)
+        self.inicio = time.time()
+
+    def _hist(self, etapa):
+        h = self.histogramas.get(etapa)
+        if h is None:
+            h = self.histogramas[etapa] = Histograma()
+        return h
+
+    def registrar(self, etapa, dt):
+        self._hist(etapa).registrar(dt)
+
+    @contextmanager
+    def medir(self, etapa):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._hist(etapa).registrar(time.perf_counter() - t0)
+
+    def cuadro_mostrado(self, t_captura=None):
+        ahora = time.perf_counter()
+        self._mostrados.append(ahora)
+        if t_captura is not None:
+            self._hist(self.LATENCIA).registrar(ahora - t_captura)
+
+    def fps(self):
+        if len(self._mostrados) < 2:
+            return 0.0
+        dt = self._mostrados[-1] - self._mostrados[0]
+        return (len(self._mostrados) - 1) / dt if dt > 0 else 0.0
+
+    def latencia(self, p):
+        h = self.histogramas.get(self.LATENCIA)
+        return 1000 * h.percentil(p) if h else 0.0
+
+    def resumen(self):
+        return {
+            "inicio": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.inicio)),
+            "duracion_s": round(time.time() - self.inicio, 2),
+            "fps": round(self.fps(), 2),
+            "etapas": {e: h.resumen() for e, h in list(self.histogramas.items())},
+        }
+
+    def exportar(self, carpeta="reportes_tiempos", prefijo="tiempos", extra=None):
+        """
+        Escribe <prefijo>_<fecha>.json (resumen + histogramas + extra) y
+        .csv (una fila por etapa).
+        """
+        os.makedirs(carpeta, exist_ok=True)
+        base = os.path.join(carpeta, f"{prefijo}_{time.strftime('%Y%m%d_%H%M%S')}")
+        datos = self.resumen()
+        datos.update(extra or {})
+        histogramas = list(self.histogramas.items())
+        if histogramas:
+            datos["bordes_s"] = histogramas[0][1].limites().tolist()
+        datos["histogramas"] = {e: h.cuentas.tolist() for e, h in histogramas}
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=1)
+        columnas = ["etapa", "n", "media_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+        with open(base + ".csv", "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(columnas)
+            for etapa, r in datos["etapas"].items():
+                w.writerow([etapa] + [round(r[c], 3) for c in columnas[1:]])
+        return base + ".json", base + ".csv"
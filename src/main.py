@@ -1,126 +1,45 @@
+import time
+T_INICIO = time.perf_counter()   # referencia para medir el arranque (antes de cualquier import pesado)
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, Toplevel, ttk
-import cv2
-import mediapipe as mp
 import numpy as np
-from PIL import Image, ImageTk
 import threading
 import datetime
 import sqlite3
-import time
 import os
-from collections import defaultdict
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.colors import white, black, red, grey
-from io import BytesIO
-
-
-# ======================= Base de datos =======================
-def init_db():
-    conn = sqlite3.connect("pacientes.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS pasajeros (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT,
-        edad INTEGER,
-        sexo TEXT,
-        diagnostico TEXT,
-        fecha TEXT
-    )
-    """)
-    # tabla correcta (compatibilidad con tus datos previos)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS pacientes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT,
-        edad INTEGER,
-        sexo TEXT,
-        diagnostico TEXT,
-        fecha TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
-
-init_db()
-
-
-# ======================= Utilidades =======================
-def angle_from_vertical_deg(p_shoulder_xy, p_elbow_xy) -> float:
-    """
-    Ángulo del brazo respecto a la vertical hacia abajo (eje +Y de imagen):
-    - Brazo colgando: 0°
-    - Horizontal: ~90°
-    - Arriba: ~180°
-    """
-    sx, sy = p_shoulder_xy
-    ex, ey = p_elbow_xy
-    v = np.array([ex - sx, ey - sy], dtype=float)
-    n = np.linalg.norm(v)
-    if n < 1e-9:
-        return 0.0
-    v /= n
-    down = np.array([0.0, 1.0], dtype=float)  # +Y apunta hacia abajo en imagen
-    cosang = float(np.clip(np.dot(v, down), -1.0, 1.0))
-    ang = float(np.degrees(np.arccos(cosang)))
-    return float(np.clip(ang, 0.0, 180.0))
-
-
-def near_targets(angle: float, targets=(90.0, 180.0), tol=10.0) -> bool:
-    """True si angle está dentro de ±tol de CUALQUIERA de los objetivos."""
-    for t in targets:
-        if (t - tol) <= angle <= (t + tol):
-            return True
-    return False
-
-
-# ================== CONFIG PDF (EDITABLE) ==================
-OFFSET_X = 0
-OFFSET_Y = 0
-SHOW_GUIDES = False
-GRID_STEP = 40
-
-COORDS = {
-    # Cabecera
-    "paciente":  (200, 730),
-    "edad":      (200, 710),
-    "fecha":     (470, 730),
-
-    # Datos
-    "ejercicio": (200, 690),
-    "peso":      (200, 670),
-
-    # Referencias
-    "ref_flex":  (200, 640),
-    "ref_abd":   (200, 620),
-
-    # Resultados medidos
-    "res_flex":  (400, 640),
-    "res_abd":   (400, 620),
-
-    "reps":      (200, 570),
-    "series":    (200, 550),
-}
-
-ERASE_BOXES = [
-    (195, 724, 250, 18),
-    (195, 704, 100, 18),
-    (465, 724, 180, 18),
-
-    (195, 684, 320, 18),
-    (195, 664, 120, 18),
-
-    (195, 636, 140, 16),
-    (195, 616, 140, 16),
-
-    (395, 636, 120, 16),
-    (395, 616, 120, 16),
-
-    (195, 566, 120, 16),
-    (195, 546, 120, 16),
+
+from arranque import Precarga
+from base_datos import BaseDatos, EscritorMuestras
+from biomecanica import POSE_PARAMS
+from inferencia_procesos import TAM_MAXIMO, ServidorInferencia
+from instrumentacion import Instrumentacion
+from pipeline import Pipeline
+
+# Lo que arrastra cv2 o PIL (análisis, fuentes, grabación, referencia, pantalla) se importa
+# al usarse; la precarga lo importa detrás del menú para que la primera comparación no espere.
+MODULOS_PRECARGA = ("cv2", "mediapipe", "analisis", "alineacion", "fuentes", "pantalla",
+                    "referencia", "cache_referencia", "grabacion", "reportes")
+
+
+# Cámara de la comparación (backend None = el adecuado para el sistema operativo)
+FUENTE_CAMARA = {"indice": 0, "backend": None, "ancho": None, "alto": None, "fps": None, "mjpg": False}
+
+# FPS que la inferencia intenta sostener (baja/sube complejidad y resolución)
+FPS_OBJETIVO_INFERENCIA = 20
+
+# Procesos con MediaPipe (0 = en un hilo de la app, como antes)
+PROCESOS_INFERENCIA = 1
+
+EJERCICIOS = [
+    "Shoulder flexion with stick",
+    "Figure 8 arms lying down",
+    "Seated two arm dumbbell triceps extension",
+    "Dumbbell rear delt fly",
+    "Half squat with shoulder press",
+    "Press Arnold",
+    "Standing wall pull-ups",
+    "Openings and shoulder rotations with bottles"
 ]
 
 
@@ -129,7 +48,7 @@ class ProyectoUniApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Analisis postural")
-        self.geometry("600x450")
+        self.geometry("600x540")
         self.configure(bg="#121212")
         self.resizable(False, False)
 
@@ -166,6 +85,16 @@ class ProyectoUniApp(tk.Tk):
         # metas fijas: 90° y 180° (solo display)
         self.meta_texto = "90° / 180°"
 
+        # Conexión compartida a pacientes.db (esquema, índices y búsqueda se crean al abrir)
+        self.db = BaseDatos()
+
+        # Clips de referencia ya decodificados + landmarks (en disco, por hash); se crea
+        # al preparar la primera referencia (importa cv2)
+        self.cache_ref = None
+        self._lock_cache_ref = threading.Lock()
+        self.datos_ref = None
+        self._ref_lista = False
+
         # UI base
         self.color_fondo = "#121212"
         self.color_btn = "#1F2937"
@@ -175,6 +104,11 @@ class ProyectoUniApp(tk.Tk):
 
         self.crear_ui_principal()
 
+        # cv2, mediapipe, PyPDF2/reportlab y el modelo de pose se preparan detrás del menú;
+        # el modelo queda cargado y se reutiliza en cada comparación
+        self.precarga = Precarga(self._crear_backend_inferencia, modulos=MODULOS_PRECARGA, t0=T_INICIO)
+        self.after_idle(self._menu_visible)
+
     # ---------------- Menú principal ----------------
     def crear_ui_principal(self):
         tk.Label(self, text="Bienvenido", font=("Segoe UI", 20, "bold"),
@@ -195,6 +129,11 @@ class ProyectoUniApp(tk.Tk):
                     relief="flat", cursor="hand2", command=self.ventana_ejercicios)\
             .pack(fill="x", padx=80, pady=7)
 
+        HoverButton(self, text="Multi-estación", font=("Segoe UI", 14, "bold"),
+                    bg=self.color_btn, fg=self.color_texto_btn, activebackground=self.color_btn_hover,
+                    relief="flat", cursor="hand2", command=self.ventana_estaciones)\
+            .pack(fill="x", padx=80, pady=7)
+
         HoverButton(self, text="Exportar Reporte PDF", font=("Segoe UI", 14, "bold"),
                     bg=self.color_btn, fg=self.color_texto_btn, activebackground=self.color_btn_hover,
                     relief="flat", cursor="hand2", command=self.exportar_pdf)\
@@ -205,6 +144,47 @@ class ProyectoUniApp(tk.Tk):
                     relief="flat", cursor="hand2", command=self.destroy)\
             .pack(fill="x", padx=80, pady=20)
 
+        self.label_estado = tk.Label(self, text="Preparando modelo de pose…", font=("Segoe UI", 10),
+                                     fg="#9CA3AF", bg=self.color_fondo)
+        self.label_estado.pack(side="bottom", pady=5)
+
+    # ---------------- Arranque ----------------
+    def _menu_visible(self):
+        self.precarga.marcar("menu_visible")
+        self.precarga.iniciar()
+        self._vigilar_precarga()
+
+    def _vigilar_precarga(self):
+        if not self.precarga.listo():
+            self.after(200, self._vigilar_precarga)
+            return
+        t = self.precarga.tiempos
+        if self.precarga.error is not None:
+            self.label_estado.config(text=f"No se pudo cargar el modelo: {self.precarga.error}", fg="#EF4444")
+        else:
+            self.label_estado.config(text=f"Modelo listo en {t['modelo_listo']:.1f} s")
+        # el desglose completo (self.precarga.tiempos) sale en el reporte de tiempos, extra "arranque"
+        self._habilitar_inicio()
+
+    def _crear_backend_inferencia(self):
+        """Corre en el hilo de Precarga: deja MediaPipe cargado y con un cuadro ya procesado."""
+        if PROCESOS_INFERENCIA:
+            servidor = ServidorInferencia(canales=1, n_procesos=PROCESOS_INFERENCIA, calentar=True,
+                                          fps_objetivo=FPS_OBJETIVO_INFERENCIA, pose_params=POSE_PARAMS)
+            servidor.esperar_listo()
+            return servidor
+        from inferencia_adaptativa import InferenciaAdaptativa
+        inferencia = InferenciaAdaptativa(fps_objetivo=FPS_OBJETIVO_INFERENCIA, pose_params=POSE_PARAMS)
+        inferencia.calentar()
+        return inferencia
+
+    def destroy(self):
+        if hasattr(self, "precarga"):
+            self.precarga.cerrar()
+        if getattr(self, "cache_ref", None) is not None:
+            self.cache_ref.cerrar()
+        super().destroy()
+
     # ---------------- Registro ----------------
     def abrir_registro_paciente(self):
         w = Toplevel(self)
@@ -264,19 +244,14 @@ class ProyectoUniApp(tk.Tk):
             return
 
         try:
-            conn = sqlite3.connect("pacientes.db")
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO pacientes (nombre, edad, sexo, diagnostico, fecha)
-                VALUES (?, ?, ?, ?, ?)
-            """, (nombre, int(edad), sexo, diagnostico, fecha))
-            conn.commit()
-            conn.close()
+            self.db.guardar_paciente(nombre, int(edad), sexo, diagnostico, fecha)
             messagebox.showinfo("Éxito", "Paciente guardado.")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar:\n{e}")
 
     # ---------------- Historial ----------------
+    HISTORIAL_PAGINA = 200
+
     def abrir_historial(self):
         w = Toplevel(self)
         w.title("Historial de Pacientes")
@@ -284,31 +259,70 @@ class ProyectoUniApp(tk.Tk):
         w.configure(bg=self.color_fondo)
         w.resizable(False, False)
 
-        lst = tk.Listbox(w, font=("Segoe UI", 12), bg="#1E293B", fg="white")
-        lst.pack(fill="both", expand=True, padx=10, pady=10)
-
-        try:
-            conn = sqlite3.connect("pacientes.db")
-            cur = conn.cursor()
-            cur.execute("SELECT nombre, edad, sexo, diagnostico, fecha FROM pacientes ORDER BY fecha DESC")
-            for p in cur.fetchall():
-                lst.insert(tk.END, f"{p[0]} | Edad: {p[1]} | Sexo: {p[2]} | Dx: {p[3]} | Fecha: {p[4]}")
-            conn.close()
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo cargar:\n{e}")
+        # Búsqueda por nombre/diagnóstico (FTS5, por prefijo)
+        barra = tk.Frame(w, bg=self.color_fondo)
+        barra.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Label(barra, text="Buscar:", font=("Segoe UI", 12, "bold"),
+                 fg=self.color_texto, bg=self.color_fondo).pack(side="left")
+        busqueda_var = tk.StringVar()
+        tk.Entry(barra, textvariable=busqueda_var, font=("Segoe UI", 12)).pack(side="left", fill="x",
+                                                                               expand=True, padx=8)
+        lbl_total = tk.Label(barra, font=("Segoe UI", 11), fg="#A3E635", bg=self.color_fondo)
+        lbl_total.pack(side="left")
+
+        marco = tk.Frame(w, bg=self.color_fondo)
+        marco.pack(fill="both", expand=True, padx=10, pady=10)
+        barra_scroll = tk.Scrollbar(marco)
+        barra_scroll.pack(side="right", fill="y")
+        lst = tk.Listbox(marco, font=("Segoe UI", 12), bg="#1E293B", fg="white")
+        lst.pack(side="left", fill="both", expand=True)
+
+        # Carga por páginas: solo se piden más filas cuando el scroll llega cerca del final
+        estado = {"texto": "", "ultimo": None, "fin": False, "pendiente": None}
+
+        def cargar_pagina():
+            if estado["fin"]:
+                return
+            try:
+                filas = self.db.pagina_pacientes(estado["texto"], estado["ultimo"], self.HISTORIAL_PAGINA)
+            except Exception as e:
+                estado["fin"] = True
+                messagebox.showerror("Error", f"No se pudo cargar:\n{e}", parent=w)
+                return
+            for p in filas:
+                lst.insert(tk.END, f"{p[1]} | Edad: {p[2]} | Sexo: {p[3]} | Dx: {p[4]} | Fecha: {p[5]}")
+            if filas:
+                estado["ultimo"] = (filas[-1][5], filas[-1][0])
+            estado["fin"] = len(filas) < self.HISTORIAL_PAGINA
+
+        def al_desplazar(inicio, fin):
+            barra_scroll.set(inicio, fin)
+            if float(fin) > 0.9:
+                cargar_pagina()
+
+        def reiniciar():
+            estado.update(texto=busqueda_var.get(), ultimo=None, fin=False, pendiente=None)
+            lst.delete(0, tk.END)
+            try:
+                lbl_total.config(text=f"{self.db.contar_pacientes(estado['texto'])} pacientes")
+            except Exception:
+                lbl_total.config(text="")
+            cargar_pagina()
+
+        def al_escribir(*_):
+            # espera a que se deje de teclear antes de consultar
+            if estado["pendiente"] is not None:
+                w.after_cancel(estado["pendiente"])
+            estado["pendiente"] = w.after(250, reiniciar)
+
+        lst.config(yscrollcommand=al_desplazar)
+        barra_scroll.config(command=lst.yview)
+        busqueda_var.trace_add("write", al_escribir)
+        reiniciar()
 
     # ---------------- Selección Ejercicio ----------------
     def ventana_ejercicios(self):
-        self.ejercicios_lista = [
-            "Shoulder flexion with stick",
-            "Figure 8 arms lying down",
-            "Seated two arm dumbbell triceps extension",
-            "Dumbbell rear delt fly",
-            "Half squat with shoulder press",
-            "Press Arnold",
-            "Standing wall pull-ups",
-            "Openings and shoulder rotations with bottles"
-        ]
+        self.ejercicios_lista = list(EJERCICIOS)
 
         self.vent_ejercicios = Toplevel(self)
         self.vent_ejercicios.title("Seleccionar Ejercicio")
@@ -363,6 +377,8 @@ class ProyectoUniApp(tk.Tk):
                  font=("Segoe UI", 12, "bold"), fg=self.color_texto, bg=self.color_fondo).pack(pady=(20,5))
 
         self.ruta_archivo_ref = ""
+        self.datos_ref = None
+        self._ref_lista = False
         HoverButton(w, text="Cargar Archivo", font=("Segoe UI", 14, "bold"),
                     bg=self.color_btn, fg=self.color_texto_btn, activebackground=self.color_btn_hover,
                     relief="flat", cursor="hand2", command=self.cargar_archivo_referencia)\
@@ -381,11 +397,65 @@ class ProyectoUniApp(tk.Tk):
         )
         if path:
             self.ruta_archivo_ref = path
-            self.btn_iniciar.config(state="normal")
+            self.datos_ref = None
+            self._ref_lista = False
+            # decodificación + pose de la referencia en segundo plano (instantáneo si ya está en caché)
+            self.btn_iniciar.config(state="disabled", text="Procesando referencia...")
+            threading.Thread(target=self._preparar_referencia, args=(path,), daemon=True).start()
+
+    def _cache_referencias(self):
+        """CacheReferencias al primer uso (desde el hilo que prepara la referencia)."""
+        with self._lock_cache_ref:
+            if self.cache_ref is None:
+                from cache_referencia import CacheReferencias
+                self.cache_ref = CacheReferencias()
+            return self.cache_ref
+
+    def _preparar_referencia(self, path):
+        try:
+            datos, error = self._cache_referencias().obtener(path), None
+        except Exception as e:
+            datos, error = None, e
+        self.after(0, self._referencia_lista, path, datos, error)
+
+    def _referencia_lista(self, path, datos, error):
+        if path != self.ruta_archivo_ref:
+            return  # se eligió otro archivo mientras tanto
+        self.datos_ref = datos
+        self._ref_lista = True
+        self._habilitar_inicio()
+        if error is not None:
+            # sin caché se reproduce decodificando en vivo
+            messagebox.showwarning("Referencia", f"No se pudo preprocesar la referencia:\n{error}")
+        else:
             messagebox.showinfo("Archivo cargado", os.path.basename(path))
 
+    def _habilitar_inicio(self):
+        """El botón de inicio se habilita con la referencia lista y la precarga terminada
+        (así abrir la comparación nunca espera al modelo en el hilo de Tk)."""
+        btn = getattr(self, "btn_iniciar", None)
+        if btn is None or not btn.winfo_exists() or not self._ref_lista:
+            return
+        if self.precarga.listo():
+            btn.config(state="normal", text="Iniciar Comparación")
+        else:
+            btn.config(state="disabled", text="Cargando modelo de pose...")
+
     # ---------------- Comparación en tiempo real ----------------
     def abrir_ventana_comparacion(self):
+        from alineacion import AlineadorDTW
+        from analisis import AnalizadorSesion
+        from pantalla import PresentadorTk
+        from referencia import ReproductorReferencia
+
+        self.t_abrir_comparacion = time.perf_counter()
+        self.primer_cuadro_ms = None
+        try:
+            backend = self.precarga.obtener(timeout=0)    # el botón solo se habilita con la precarga lista
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
         self.vent_comparacion = Toplevel(self)
         self.vent_comparacion.title(f"Comparación en tiempo real - {self.ejercicio_seleccionado}")
         self.vent_comparacion.geometry("1366x768")
@@ -411,7 +481,13 @@ class ProyectoUniApp(tk.Tk):
         self.btn_grabar = HoverButton(self.frame_info, text="Grabar Video", font=("Segoe UI", 14, "bold"),
                                       bg="#EF4444", fg="white", activebackground="#F87171",
                                       relief="flat", cursor="hand2", command=self.toggle_grabacion)
-        self.btn_grabar.pack(side="left", padx=40)
+        self.btn_grabar.pack(side="left", padx=(40, 5))
+
+        # Solo landmarks: guarda la pose (no los pixeles) y se re-renderiza después
+        self.grabar_landmarks_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.frame_info, text="Solo landmarks", variable=self.grabar_landmarks_var,
+                       font=("Segoe UI", 11), bg=self.color_fondo, fg=self.color_texto,
+                       selectcolor=self.color_btn_hover).pack(side="left", padx=(0, 20))
 
         self.btn_terminar = HoverButton(self.frame_info, text="Terminar Comparación", font=("Segoe UI", 14, "bold"),
                                         bg="#6B7280", fg="white", activebackground="#9CA3AF",
@@ -419,219 +495,259 @@ class ProyectoUniApp(tk.Tk):
         self.btn_terminar.pack(side="left", padx=20)
 
         # Video
-        self.cap_cam = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        self.cap_ref = None
-        self.imagen_ref_static = None
-
-        if self.ruta_archivo_ref and self.ruta_archivo_ref.lower().endswith(('.mp4','.avi','.mov')):
-            self.cap_ref = cv2.VideoCapture(self.ruta_archivo_ref)
-        elif self.ruta_archivo_ref:
-            img = cv2.imread(self.ruta_archivo_ref)
-            if img is None:
-                messagebox.showerror("Error", "No se pudo abrir la imagen de referencia.")
-                self.vent_comparacion.destroy()
-                return
-            self.imagen_ref_static = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        self.grabando = False
-        self.writer = None
+        self.fuente = self._abrir_fuente()
 
-        # Mediapipe
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(static_image_mode=False,
-                                      model_complexity=1,
-                                      enable_segmentation=False,
-                                      min_detection_confidence=0.5,
-                                      min_tracking_confidence=0.5)
-        self.buffer_angulos = defaultdict(list)  # suavizado
+        # Referencia: clip a 560x420 ya decodificado (de la caché, o si no está, a un
+        # memmap temporal); se reproduce por índice.
+        self.reproductor_ref = None
+        try:
+            if self.datos_ref is not None:
+                self.reproductor_ref = ReproductorReferencia(self.datos_ref["frames"],
+                                                             self.datos_ref["meta"]["fps"])
+            elif self.ruta_archivo_ref:
+                self.reproductor_ref = ReproductorReferencia.desde_archivo(self.ruta_archivo_ref)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo abrir la referencia:\n{e}")
+            self.fuente.liberar()
+            self.vent_comparacion.destroy()
+            return
+        self.frame_ref_vacio = np.zeros((420, 560, 3), dtype=np.uint8)
+
+        # Comparación del movimiento: el ángulo del paciente se alinea (DTW en línea) con la
+        # trayectoria de la referencia ya calculada en la caché, sobre el mismo reloj del video
+        alineador = None
+        if self.datos_ref is not None and self.reproductor_ref is not None:
+            alineador = AlineadorDTW.desde_referencia(self.datos_ref, self.modo, self.reproductor_ref.t0)
+
+        self.grabador = None          # GrabadorVideo / GrabadorLandmarks (codifican en su propio hilo)
+        self.grabaciones = []         # estadísticas de cada grabación de la sesión
+
+        # Mediapipe: ROI alrededor de la última pose + complejidad/resolución según FPS objetivo
+        # (en un proceso aparte: los cuadros van por memoria compartida y vuelven solo landmarks).
+        # Es el backend de la precarga, ya caliente; solo una cámara más grande que su
+        # memoria compartida necesita un servidor propio.
+        self.servidor_inferencia = None
+        if isinstance(backend, ServidorInferencia):
+            w, h = self.fuente.tamano()
+            if w > backend.tam_maximo[0] or h > backend.tam_maximo[1]:
+                self.servidor_inferencia = ServidorInferencia(
+                    canales=1, n_procesos=PROCESOS_INFERENCIA,
+                    tam_maximo=(max(w, TAM_MAXIMO[0]), max(h, TAM_MAXIMO[1])),
+                    fps_objetivo=FPS_OBJETIVO_INFERENCIA, pose_params=POSE_PARAMS)
+                backend = self.servidor_inferencia
+            self.inferencia = backend.canales[0]
+        else:
+            self.inferencia = backend
 
         self.last_update = 0
-        self.hilo_video = threading.Thread(target=self.actualizar_videos, daemon=True)
-        self.hilo_video.start()
+        # Tiempos por etapa y latencia cámara->pantalla (se exportan al cerrar)
+        self.instr = Instrumentacion()
+        # Los hilos de trabajo no tocan Tk: copia del nombre para el overlay/reporte
+        self.nombre_sesion = self.paciente_var.get()
+        self.analizador = AnalizadorSesion(self.inferencia, self.nombre_sesion,
+                                           self.ejercicio_seleccionado, self.modo,
+                                           self.meta_texto, self.instr, alineador=alineador)
+
+        # Serie de tiempo de la sesión: una muestra por cuadro inferido, escrita por lotes
+        self.escritor = None
+        self.ultimo_reporte.pop("sesion_id", None)
+        try:
+            sesion_id = self.db.crear_sesion(self.nombre_sesion, self.ejercicio_seleccionado, self.modo,
+                                     datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                     self.repeticiones_var.get(), self.series_var.get(),
+                                     self.peso_var.get())
+            self.escritor = EscritorMuestras(sesion_id, ruta=self.db.ruta)
+            self.ultimo_reporte["sesion_id"] = sesion_id
+        except sqlite3.Error as e:
+            messagebox.showwarning("Base de datos", f"No se guardará la serie de tiempo de la sesión:\n{e}")
+        self.t_inicio_sesion = time.perf_counter()
+
+        # Presentación: PhotoImage reutilizados, actualizados desde el loop de Tk
+        self.presentador = PresentadorTk(self.vent_comparacion, fps_objetivo=30,
+                                         al_actualizar=self._actualizar_panel_texto,
+                                         instr=self.instr)
+        self.presentador.agregar_panel("ref", self.label_video_ref, (560, 420))
+        self.presentador.agregar_panel("cam", self.label_video_cam, (560, 420))
+        self.presentador.iniciar()
+
+        # Pipeline por etapas unidas por colas acotadas (descarta lo más viejo):
+        # la captura nunca espera a la inferencia y el render siempre ve lo último.
+        # Los cuadros de la cámara salen de la lista libre del pool y vuelven al terminar
+        # el render (o al descartarse en una cola): en régimen no se asigna por cuadro.
+        w, h = self.fuente.tamano()
+        self.forma_captura = (h, w, 3) if w and h else None
+        self.pipeline = Pipeline("comparacion")
+        cola_cam = self.pipeline.cola(1, self._devolver_cuadro)
+        cola_res = self.pipeline.cola(1, self._devolver_cuadro)
+        self.pipeline.agregar_fuente("captura", self._producir_camara, cola_cam)
+        self.pipeline.agregar_etapa("inferencia", self._procesar_inferencia, cola_cam, cola_res)
+        self.pipeline.agregar_etapa("render", self._procesar_render, cola_res)
+        self.pipeline.iniciar()
         self.vent_comparacion.protocol("WM_DELETE_WINDOW", self.cerrar_ventana_comparacion)
+        self._vigilar_pipeline()
+
+    def _vigilar_pipeline(self):
+        """Hilo de Tk: si una etapa del pipeline falló (p. ej. la inferencia no responde), avisa."""
+        if not (getattr(self, "pipeline", None) and self.vent_comparacion.winfo_exists()):
+            return
+        if self.pipeline.error is None:
+            self.vent_comparacion.after(250, self._vigilar_pipeline)
+            return
+        etapa, e = self.pipeline.error
+        self.label_video_cam.config(image="", text=f"Análisis detenido ({etapa}):\n{e}",
+                                    fg="#EF4444", font=("Segoe UI", 14, "bold"))
+        messagebox.showerror("Error", f"El análisis se detuvo en la etapa «{etapa}»:\n{e}",
+                             parent=self.vent_comparacion)
+
+    def _abrir_fuente(self):
+        from fuentes import FuenteCamara, desde_texto
+        # REHAB_FUENTE permite analizar un archivo (o elegir otra cámara) sin tocar el código
+        spec = os.environ.get("REHAB_FUENTE")
+        if spec:
+            tiempo_real = os.environ.get("REHAB_TIEMPO_REAL", "1") != "0"
+            return desde_texto(spec, tiempo_real=tiempo_real)
+        return FuenteCamara(**FUENTE_CAMARA)
 
     def toggle_grabacion(self):
-        if not self.grabando:
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        from grabacion import GrabadorLandmarks, GrabadorVideo
+        if self.grabador is None:
             now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            nombre = f"grabacion_{now}.mp4"
-            w = int(self.cap_cam.get(cv2.CAP_PROP_FRAME_WIDTH))
-            h = int(self.cap_cam.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            w, h = self.fuente.tamano()
             if w == 0 or h == 0:
                 messagebox.showerror("Error", "Cámara sin dimensiones válidas.")
                 return
-            vw = cv2.VideoWriter(nombre, fourcc, 20.0, (w, h))
-            if not vw.isOpened():
-                fourcc = cv2.VideoWriter_fourcc(*"XVID")
-                nombre = f"grabacion_{now}.avi"
-                vw = cv2.VideoWriter(nombre, fourcc, 20.0, (w, h))
-                if not vw.isOpened():
-                    messagebox.showerror("Error", "No se pudo iniciar grabación.")
-                    return
-            self.writer = vw
-            self.grabando = True
+            try:
+                if self.grabar_landmarks_var.get():
+                    grabador = GrabadorLandmarks(f"grabacion_{now}.pose", (w, h), self.fuente.fps(),
+                                                 meta={"paciente": self.nombre_sesion,
+                                                       "ejercicio": self.ejercicio_seleccionado,
+                                                       "modo": self.modo},
+                                                 instr=self.instr)
+                else:
+                    # a los FPS de la fuente: los cuadros se repiten/omiten según su tiempo de captura
+                    fps = self.fuente.fps() or FPS_OBJETIVO_INFERENCIA
+                    grabador = GrabadorVideo(f"grabacion_{now}", fps, (w, h), instr=self.instr,
+                                             pool=self.analizador.pool)
+            except OSError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            self.grabador = grabador
             self.btn_grabar.config(text="Detener Grabación", bg="#059669", activebackground="#10B981")
-            messagebox.showinfo("Grabación", f"Grabando: {nombre}")
+            messagebox.showinfo("Grabación", f"Grabando: {grabador.ruta}")
         else:
-            self.grabando = False
-            if self.writer:
-                self.writer.release()
-                self.writer = None
+            grabador, self.grabador = self.grabador, None
+            stats = grabador.cerrar()
+            self.grabaciones.append(stats)
             self.btn_grabar.config(text="Grabar Video", bg="#EF4444", activebackground="#F87171")
-            messagebox.showinfo("Grabación", "Video guardado.")
-
-    def actualizar_videos(self):
-        # Umbral para considerar movimiento lateral "válido" (reduce falsos en abducción)
-        PLANE_RATIO_THRESH = 1.2  # |Δx| / (|Δz|+eps)
-
-        while True:
-            ok_cam, frame_cam = self.cap_cam.read()
-            if not ok_cam:
-                break
-
-            rgb = cv2.cvtColor(frame_cam, cv2.COLOR_BGR2RGB)
-            res = self.pose.process(rgb)
-
-            ang_flex, ang_abd, abd_valida = 0.0, 0.0, False
-
-            if res.pose_landmarks:
-                lm = res.pose_landmarks.landmark
-                # Lado derecho (12 hombro, 14 codo)
-                shoulder = (lm[12].x, lm[12].y, lm[12].z)
-                elbow    = (lm[14].x, lm[14].y, lm[14].z)
-
-                ang_flex = angle_from_vertical_deg((shoulder[0], shoulder[1]),
-                                                   (elbow[0], elbow[1]))
-
-                # filtro de plano para Abducción
-                dx = elbow[0] - shoulder[0]
-                dz = elbow[2] - shoulder[2]
-                ratio = abs(dx) / (abs(dz) + 1e-6)
-                abd_valida = ratio >= PLANE_RATIO_THRESH
-                if abd_valida:
-                    ang_abd = angle_from_vertical_deg((shoulder[0], shoulder[1]),
-                                                      (elbow[0], elbow[1]))
-                else:
-                    ang_abd = None
-
-            # Suavizado
-            self.buffer_angulos["Flexión"].append(ang_flex)
-            if len(self.buffer_angulos["Flexión"]) > 5:
-                self.buffer_angulos["Flexión"].pop(0)
-            s_flex = float(np.mean(self.buffer_angulos["Flexión"]))
-
-            if ang_abd is not None:
-                self.buffer_angulos["Abducción"].append(ang_abd)
-                if len(self.buffer_angulos["Abducción"]) > 5:
-                    self.buffer_angulos["Abducción"].pop(0)
-                s_abd = float(np.mean(self.buffer_angulos["Abducción"]))
-            else:
-                s_abd = None
-
-            # Estados (verde si cerca de 90° O de 180°)
-            estado_flex_ok = near_targets(s_flex, targets=(90.0, 180.0), tol=10.0)
-            if s_abd is None:
-                estado_abd = "-"
-            else:
-                estado_abd = "✓" if near_targets(s_abd, targets=(90.0, 180.0), tol=10.0) else "✗"
-
-            # Guardar para PDF (si abducción inválida, guardo 0.0)
-            self.ultimo_reporte.update({
-                "paciente": self.paciente_var.get(),
-                "fecha": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "ejercicio": self.ejercicio_seleccionado,
-                "comparacion": {
-                    "Flexión": round(s_flex, 1),
-                    "Abducción": 0.0 if s_abd is None else round(s_abd, 1)
-                }
-            })
-
-            # Dibujar
-            frame_land = frame_cam.copy()
-            if res.pose_landmarks:
-                mp.solutions.drawing_utils.draw_landmarks(
-                    frame_land, res.pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
-                    mp.solutions.drawing_styles.get_default_pose_landmarks_style())
-
-            overlay = frame_land.copy()
-            cv2.rectangle(overlay, (5, 5), (520, 230), (0, 0, 0), -1)
-            frame_land = cv2.addWeighted(overlay, 0.5, frame_land, 0.5, 0)
-
-            nombre = self.paciente_var.get()
-            fecha_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cv2.putText(frame_land, f"Paciente: {nombre}", (15, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
-            cv2.putText(frame_land, f"Ejercicio: {self.ejercicio_seleccionado}", (15, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
-            # ---- NUEVO: mostrar modo activo ----
-            cv2.putText(frame_land, f"Modo evaluado: {self.modo}", (15, 72), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200,255,200), 1)
-            # ------------------------------------
-            cv2.putText(frame_land, fecha_str, (15, 94), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
-
-            y0 = 120
-            # Colores según modo: solo el ángulo del modo se pinta verde/rojo; el otro, gris informativo.
-            if self.modo == "Flexión":
-                col_f = (0,255,0) if estado_flex_ok else (0,0,255)
-                col_a = (200,200,200)  # informativo
-            else:  # Abducción
-                col_a = (0,255,0) if (estado_abd == "✓") else (0,0,255)
-                col_f = (200,200,200)  # informativo
-
-            txt_f = f"Flexión: {round(s_flex,1)}° / Metas: {self.meta_texto}"
-            cv2.putText(frame_land, txt_f, (15, y0), cv2.FONT_HERSHEY_SIMPLEX, 0.65, col_f, 2)
-
-            y0 += 28
-            if s_abd is None:
-                txt_a = f"Abducción: — / Metas: {self.meta_texto}"
+            msg = f"Guardado: {stats['ruta']}"
+            if stats["descartados"]:
+                msg += f"\n({stats['descartados']} cuadros descartados: el disco no alcanzó el ritmo)"
+            if stats["error"]:
+                messagebox.showwarning("Grabación", f"La grabación se interrumpió por un error:\n{stats['error']}"
+                                                    f"\n\n{msg} ({stats['escritos']} cuadros)")
             else:
-                txt_a = f"Abducción: {round(s_abd,1)}° / Metas: {self.meta_texto}"
-            cv2.putText(frame_land, txt_a, (15, y0), cv2.FONT_HERSHEY_SIMPLEX, 0.65, col_a, 2)
-
-            # Referencia (video/imagen)
-            if self.cap_ref is not None:
-                ok_ref, frame_ref = self.cap_ref.read()
-                if not ok_ref:
-                    self.cap_ref.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    ok_ref, frame_ref = self.cap_ref.read()
-                frame_ref = cv2.resize(frame_ref, (560, 420))
-                frame_ref = cv2.cvtColor(frame_ref, cv2.COLOR_BGR2RGB)
+                messagebox.showinfo("Grabación", msg)
+
+    # ---- Pipeline: captura -> inferencia -> render (cada etapa en su hilo) ----
+    def _producir_camara(self):
+        pool = self.analizador.pool
+        destino = pool.tomar("captura", self.forma_captura) if self.forma_captura else None
+        with self.instr.medir("captura"):
+            ok_cam, frame_cam = self.fuente.leer(destino)
+        if not ok_cam:
+            pool.devolver(destino)
+            return None
+        return {"t": time.perf_counter(), "frame": pool.usado(frame_cam, destino)}
+
+    def _devolver_cuadro(self, item):
+        self.analizador.pool.devolver(item["frame"])
+
+    def _procesar_inferencia(self, item):
+        item = self.analizador.inferir(item)
+        s_flex, s_abd = item["s_flex"], item["s_abd"]
+
+        # Guardar para PDF (sin pose o abducción inválida, guardo 0.0)
+        self.ultimo_reporte.update({
+            "paciente": self.nombre_sesion,
+            "fecha": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ejercicio": self.ejercicio_seleccionado,
+            "comparacion": {
+                "Flexión": 0.0 if s_flex is None else round(s_flex, 1),
+                "Abducción": 0.0 if s_abd is None else round(s_abd, 1)
+            }
+        })
+        if self.escritor is not None:
+            self.escritor.agregar(self.analizador.muestra(item, self.t_inicio_sesion))
+        return item
+
+    def _procesar_render(self, item):
+        import cv2
+        instr = self.instr
+        frame_land = self.analizador.componer(item)
+
+        # Referencia: indexación pura según el reloj y los FPS del clip
+        with instr.medir("referencia"):
+            if self.reproductor_ref is not None:
+                frame_ref = self.reproductor_ref.cuadro()
             else:
-                frame_ref = cv2.resize(self.imagen_ref_static, (560, 420)) if self.imagen_ref_static is not None else np.zeros((420,560,3), dtype=np.uint8)
-
-            # A Tk
-            cam_disp = cv2.resize(frame_land, (560, 420))
-            img_cam = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(cam_disp, cv2.COLOR_BGR2RGB)))
-            img_ref = ImageTk.PhotoImage(image=Image.fromarray(frame_ref))
-
-            self.label_video_cam.imgtk = img_cam
-            self.label_video_cam.configure(image=img_cam)
-            self.label_video_ref.imgtk = img_ref
-            self.label_video_ref.configure(image=img_ref)
-
-            # Panel texto
-            if time.time() - self.last_update > 0.5:
-                self.text_info.config(state="normal")
-                self.text_info.delete("1.0", tk.END)
-                self.text_info.insert(tk.END, f"Ejercicio: {self.ejercicio_seleccionado}\n")
-                self.text_info.insert(tk.END, f"Modo evaluado: {self.modo}\n\n")
-                self.text_info.insert(tk.END, "Ángulos en tiempo real (verde si cerca de 90° o 180°):\n")
-                self.text_info.insert(tk.END, f"Flexión:   {round(s_flex,1)}°   Metas: {self.meta_texto}   [{'✓' if estado_flex_ok else '✗'}]\n")
-                if s_abd is None:
-                    self.text_info.insert(tk.END, f"Abducción: —         Metas: {self.meta_texto}   [-]\n")
-                else:
-                    self.text_info.insert(tk.END, f"Abducción: {round(s_abd,1)}°   Metas: {self.meta_texto}   [{'✓' if estado_abd=='✓' else '✗'}]\n")
-                self.text_info.config(state="disabled")
-                self.last_update = time.time()
-
-            if self.grabando and self.writer:
-                self.writer.write(frame_land)
-
-            time.sleep(0.02)
-
-        # liberar
-        self.cap_cam.release()
-        if self.cap_ref:
-            self.cap_ref.release()
-        if self.writer:
-            self.writer.release()
+                frame_ref = self.frame_ref_vacio
+
+        # A Tk: solo se publica lo último; el hilo principal lo muestra con after()
+        with instr.medir("tk_preparar"):
+            # anillo de 4: uno en el buzón, uno pintándose en Tk y margen para el que se escribe
+            pool = self.analizador.pool
+            cam_disp = pool.anillo("pantalla", (420, 560, 3), n=4)
+            pool.usado(cv2.resize(frame_land, (560, 420), dst=cam_disp), cam_disp)
+            cv2.cvtColor(cam_disp, cv2.COLOR_BGR2RGB, dst=cam_disp)
+        self.presentador.publicar({"cam": cam_disp, "ref": frame_ref},
+                                  {"s_flex": item["s_flex"], "s_abd": item["s_abd"], "t_captura": item["t"],
+                                   "estado_flex_ok": item["estado_flex_ok"], "estado_abd": item["estado_abd"],
+                                   "angulos": item["angulos"], "repeticiones": item["repeticiones"],
+                                   "alineacion": item["alineacion"]})
+
+        grabador = self.grabador
+        if grabador is not None:
+            with instr.medir("grabacion"):   # solo encolar; la codificación va en el hilo del grabador
+                grabador.agregar(item, frame_land)
+        # el cuadro de la cámara ya no se usa: vuelve al pool para la próxima captura
+        self._devolver_cuadro(item)
+
+    def _actualizar_panel_texto(self, info):
+        # Se ejecuta en el hilo de Tk (llamado por el presentador) justo después de pintar
+        self.instr.cuadro_mostrado(info["t_captura"])
+        if self.primer_cuadro_ms is None:
+            self.primer_cuadro_ms = round(1000 * (time.perf_counter() - self.t_abrir_comparacion), 1)
+        if time.time() - self.last_update <= 0.5:
+            return
+        s_flex, s_abd = info["s_flex"], info["s_abd"]
+        estado_flex_ok, estado_abd = info["estado_flex_ok"], info["estado_abd"]
+        self.text_info.config(state="normal")
+        self.text_info.delete("1.0", tk.END)
+        self.text_info.insert(tk.END, f"Ejercicio: {self.ejercicio_seleccionado}\n")
+        self.text_info.insert(tk.END, f"Modo evaluado: {self.modo}\n\n")
+        self.text_info.insert(tk.END, "Ángulos en tiempo real (verde si cerca de 90° o 180°):\n")
+        if s_flex is None:
+            self.text_info.insert(tk.END, f"Flexión:   —         Metas: {self.meta_texto}   [✗]\n")
+        else:
+            self.text_info.insert(tk.END, f"Flexión:   {round(s_flex,1)}°   Metas: {self.meta_texto}   [{'✓' if estado_flex_ok else '✗'}]\n")
+        if s_abd is None:
+            self.text_info.insert(tk.END, f"Abducción: —         Metas: {self.meta_texto}   [-]\n")
+        else:
+            self.text_info.insert(tk.END, f"Abducción: {round(s_abd,1)}°   Metas: {self.meta_texto}   [{'✓' if estado_abd=='✓' else '✗'}]\n")
+        a = info["angulos"]
+        if a is not None:
+            self.text_info.insert(tk.END, f"Codo D/I: {a['codo_der']:.0f}° / {a['codo_izq']:.0f}°   "
+                                          f"Hombro I: {a['hombro_izq']:.0f}°   Tronco: {a['tronco']:.0f}°\n")
+        self.text_info.insert(tk.END, f"Repeticiones: {info['repeticiones']}\n")
+        al = info["alineacion"]
+        if al is not None:
+            # > 0: el paciente va atrás del video de referencia
+            self.text_info.insert(tk.END, f"Vs. referencia: desfase {al['desfase_s']:+.1f} s   "
+                                          f"desviación {al['desviacion_deg']:.0f}°\n")
+        self.text_info.insert(tk.END, f"\nFPS: {self.instr.fps():.1f}   Latencia p50/p95: "
+                                      f"{self.instr.latencia(50):.0f} / {self.instr.latencia(95):.0f} ms\n")
+        self.text_info.config(state="disabled")
+        self.last_update = time.time()
 
     def cerrar_ventana_comparacion(self):
         if not self.ultimo_reporte.get("paciente"):
@@ -642,16 +758,210 @@ class ProyectoUniApp(tk.Tk):
                 "comparacion": {"Flexión": 0.0, "Abducción": 0.0}
             })
         try:
-            if hasattr(self, "cap_cam") and self.cap_cam:
-                self.cap_cam.release()
-            if hasattr(self, "cap_ref") and self.cap_ref:
-                self.cap_ref.release()
-            if hasattr(self, "writer") and self.writer:
-                self.writer.release()
+            if hasattr(self, "pipeline") and self.pipeline:
+                self.pipeline.parar()
+            if getattr(self, "presentador", None):
+                self.presentador.detener()
+            metricas = None
+            if getattr(self, "analizador", None):
+                # acumuladas cuadro a cuadro: no hay que recorrer la serie para el reporte
+                metricas = self.analizador.estadisticas.finalizar(self.t_inicio_sesion)
+                if self.analizador.alineador is not None:
+                    metricas["alineacion"] = self.analizador.alineador.resumen()
+                self.ultimo_reporte.update({"metricas": metricas,
+                                            "repeticiones": self.repeticiones_var.get(),
+                                            "series": self.series_var.get(),
+                                            "peso": self.peso_var.get()})
+            estado_inferencia = None
+            if getattr(self, "inferencia", None):
+                estado_inferencia = self.inferencia.estado()
+                # solo se olvida el seguimiento: el modelo queda cargado para la próxima sesión
+                self.inferencia.reiniciar()
+            if getattr(self, "servidor_inferencia", None):
+                self.servidor_inferencia.cerrar()
+            if getattr(self, "grabador", None):
+                self.grabaciones.append(self.grabador.cerrar())
+                self.grabador = None
+            if getattr(self, "escritor", None):
+                error = self.escritor.cerrar(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), metricas)
+                if error is not None:
+                    messagebox.showwarning("Base de datos", "La serie de tiempo de la sesión quedó incompleta "
+                                           f"({self.escritor.escritas} muestras guardadas):\n{error}")
+            if getattr(self, "instr", None) and self.instr.histogramas:
+                try:
+                    self.instr.exportar(extra={
+                        "cuadros_descartados_pantalla": self.presentador.buzon.descartados,
+                        "inferencia": estado_inferencia,
+                        "metricas": metricas,
+                        "buffers": self.analizador.pool.estado(),
+                        "arranque": dict(self.precarga.tiempos, primer_cuadro_ms=self.primer_cuadro_ms),
+                        "muestras": {"escritas": self.escritor.escritas,
+                                     "descartadas": self.escritor.descartadas} if self.escritor else None,
+                        "grabaciones": self.grabaciones,
+                    })
+                except OSError as e:
+                    messagebox.showwarning("Reporte de tiempos", f"No se pudo exportar el reporte de tiempos:\n{e}")
+            if getattr(self, "fuente", None):
+                self.fuente.liberar()
+            if getattr(self, "reproductor_ref", None):
+                self.reproductor_ref.cerrar()
         finally:
             if hasattr(self, "vent_comparacion") and self.vent_comparacion:
                 self.vent_comparacion.destroy()
 
+    # ---------------- Multi-estación ----------------
+    def ventana_estaciones(self):
+        from estaciones import MAX_ESTACIONES
+        w = Toplevel(self)
+        w.title("Multi-estación")
+        w.geometry("900x360")
+        w.configure(bg=self.color_fondo)
+        w.resizable(False, False)
+
+        tk.Label(w, text="Estaciones (fuente vacía = no se usa)", font=("Segoe UI", 16, "bold"),
+                 fg=self.color_texto, bg=self.color_fondo).grid(row=0, column=0, columnspan=5, pady=15)
+        for col, titulo in enumerate(["", "Fuente (cámara o video)", "Paciente", "Ejercicio", "Grabar pose"]):
+            tk.Label(w, text=titulo, font=("Segoe UI", 11), fg=self.color_texto,
+                     bg=self.color_fondo).grid(row=1, column=col, padx=5)
+
+        filas = []
+        for i in range(MAX_ESTACIONES):
+            fuente_var = tk.StringVar(value=str(i))
+            paciente_var = tk.StringVar()
+            grabar_var = tk.BooleanVar(value=False)
+            tk.Label(w, text=f"E{i + 1}", font=("Segoe UI", 12, "bold"), fg=self.color_texto,
+                     bg=self.color_fondo).grid(row=i + 2, column=0, padx=10, pady=5)
+            tk.Entry(w, textvariable=fuente_var, font=("Segoe UI", 12), width=22)\
+                .grid(row=i + 2, column=1, padx=5)
+            tk.Entry(w, textvariable=paciente_var, font=("Segoe UI", 12), width=18)\
+                .grid(row=i + 2, column=2, padx=5)
+            combo = ttk.Combobox(w, values=EJERCICIOS, font=("Segoe UI", 11), state="readonly", width=30)
+            combo.current(0)
+            combo.grid(row=i + 2, column=3, padx=5)
+            tk.Checkbutton(w, variable=grabar_var, bg=self.color_fondo,
+                           selectcolor=self.color_btn_hover).grid(row=i + 2, column=4)
+            filas.append((fuente_var, paciente_var, combo, grabar_var))
+
+        def iniciar():
+            config = []
+            for i, (fuente_var, paciente_var, combo, grabar_var) in enumerate(filas):
+                fuente = fuente_var.get().strip()
+                if fuente:
+                    ejercicio = combo.get()
+                    config.append({"nombre": f"E{i + 1}", "fuente": fuente,
+                                   "paciente": paciente_var.get().strip() or f"Estación {i + 1}",
+                                   "ejercicio": ejercicio,
+                                   "modo": self.EXERCISE_MODE.get(ejercicio, "Flexión"),
+                                   "grabar": grabar_var.get()})
+            if not config:
+                messagebox.showwarning("Multi-estación", "Indica al menos una fuente.", parent=w)
+                return
+            w.destroy()
+            self.abrir_panel_estaciones(config)
+
+        HoverButton(w, text="Iniciar", font=("Segoe UI", 14, "bold"),
+                    bg=self.color_btn, fg=self.color_texto_btn, activebackground=self.color_btn_hover,
+                    relief="flat", cursor="hand2", command=iniciar)\
+            .grid(row=MAX_ESTACIONES + 2, column=0, columnspan=5, pady=20, ipadx=10)
+
+    def abrir_panel_estaciones(self, config):
+        from estaciones import TAM_MINIATURA, GestorEstaciones
+        from pantalla import PresentadorTk
+        """Tablero: miniatura + ángulos + FPS por estación y el rendimiento total del equipo."""
+        self.vent_estaciones = Toplevel(self)
+        self.vent_estaciones.title("Multi-estación")
+        self.vent_estaciones.configure(bg=self.color_fondo)
+
+        self.gestor_estaciones = GestorEstaciones(self.db, fps_objetivo=FPS_OBJETIVO_INFERENCIA)
+        self.presentadores_estaciones = []
+        for k, c in enumerate(config):
+            celda = tk.Frame(self.vent_estaciones, bg=self.color_fondo)
+            celda.grid(row=k // 2, column=k % 2, padx=10, pady=10)
+            label_img = tk.Label(celda, bg=self.color_fondo)
+            label_img.pack()
+            label_txt = tk.Label(celda, font=("Consolas", 11), justify="left", anchor="w",
+                                 fg=self.color_texto, bg="#1E293B", width=52)
+            label_txt.pack(fill="x")
+            # un presentador por estación: cada una publica su último cuadro sin esperar a Tk
+            presentador = PresentadorTk(self.vent_estaciones, fps_objetivo=15,
+                                        al_actualizar=lambda info, lbl=label_txt: self._texto_estacion(lbl, info))
+            presentador.agregar_panel("cam", label_img, TAM_MINIATURA)
+            self.presentadores_estaciones.append(presentador)
+            self.gestor_estaciones.agregar(
+                c["nombre"], c["fuente"], paciente=c["paciente"], ejercicio=c["ejercicio"],
+                modo=c["modo"], grabar=c["grabar"],
+                publicar=lambda mini, info, p=presentador: p.publicar({"cam": mini}, info))
+
+        self.label_total_estaciones = tk.Label(self.vent_estaciones, font=("Segoe UI", 13, "bold"),
+                                               fg=self.color_texto, bg=self.color_fondo)
+        self.label_total_estaciones.grid(row=2, column=0, columnspan=2, pady=5)
+        HoverButton(self.vent_estaciones, text="Terminar", font=("Segoe UI", 14, "bold"),
+                    bg="#6B7280", fg="white", activebackground="#9CA3AF",
+                    relief="flat", cursor="hand2", command=self.cerrar_panel_estaciones)\
+            .grid(row=3, column=0, columnspan=2, pady=10)
+        self.vent_estaciones.protocol("WM_DELETE_WINDOW", self.cerrar_panel_estaciones)
+
+        try:
+            self.gestor_estaciones.iniciar()
+        except (OSError, RuntimeError, ValueError) as e:
+            messagebox.showerror("Multi-estación", str(e))
+            self.cerrar_panel_estaciones()
+            return
+        for p in self.presentadores_estaciones:
+            p.iniciar()
+        avisos = self._avisos_estaciones = self.gestor_estaciones.avisos()
+        if avisos:
+            messagebox.showwarning("Multi-estación", "\n".join(avisos), parent=self.vent_estaciones)
+        self._actualizar_total_estaciones()
+
+    def _texto_estacion(self, label, info):
+        if info["error"]:
+            estado = f"ERROR: {info['error'][:40]}"
+        else:
+            estado = "al día" if info["al_dia"] else "ATRASADA"
+        label.config(text=f"{info['nombre']}  {info['paciente']}\n{info['ejercicio']}\n"
+                          f"Flexión {info['flexion']:.1f}°   Abducción {info['abduccion']:.1f}°   "
+                          f"Reps {info['repeticiones']}\n"
+                          f"{info['fps']:.1f}/{info['fps_pedido']:.0f} FPS   p95 {info['latencia_p95_ms']:.0f} ms"
+                          f"   [{estado}]")
+
+    def _actualizar_total_estaciones(self):
+        gestor = getattr(self, "gestor_estaciones", None)
+        if gestor is None:
+            return
+        e = gestor.estado()
+        if e["al_dia"]:
+            texto, color = "El equipo da abasto", "#10B981"
+        else:
+            texto, color = "El equipo NO da abasto (bajar FPS o estaciones)", "#EF4444"
+        self.label_total_estaciones.config(
+            text=f"Total: {e['fps_total']:.1f} / {e['fps_pedido_total']:.0f} FPS   "
+                 f"Procesos: {e['procesos']}   {texto}", fg=color)
+        self._after_total_estaciones = self.vent_estaciones.after(500, self._actualizar_total_estaciones)
+
+    def cerrar_panel_estaciones(self):
+        gestor, self.gestor_estaciones = getattr(self, "gestor_estaciones", None), None
+        try:
+            if getattr(self, "_after_total_estaciones", None):
+                self.vent_estaciones.after_cancel(self._after_total_estaciones)
+                self._after_total_estaciones = None
+            for p in getattr(self, "presentadores_estaciones", []):
+                p.detener()
+            if gestor is not None:
+                resumenes = gestor.detener()
+                texto = "\n".join(f"{r['nombre']}: {r['cuadros']} cuadros, {r['fps']} FPS, "
+                                  f"p95 {r['latencia_p95_ms']} ms, {r['descartados_captura']} descartados"
+                                  for r in resumenes)
+                # solo lo nuevo: lo del arranque ya se mostró
+                ya = set(getattr(self, "_avisos_estaciones", ()))
+                avisos = [a for r in resumenes for a in r["avisos"] if a not in ya]
+                if avisos:
+                    messagebox.showwarning("Multi-estación", texto + "\n\n" + "\n".join(avisos))
+                elif resumenes:
+                    messagebox.showinfo("Multi-estación", texto)
+        finally:
+            self.vent_estaciones.destroy()
+
     # ---------------- Exportar PDF ----------------
     def exportar_pdf(self):
         plantilla_path = "Plantilla.pdf"
@@ -669,86 +979,15 @@ class ProyectoUniApp(tk.Tk):
         if not archivo_salida:
             return
 
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=letter)
-        c.setFont("Helvetica", 11)
-
-        def _xy(p): return (p[0] + OFFSET_X, p[1] + OFFSET_Y)
-        def _draw_grid(step=GRID_STEP):
-            w, h = letter
-            c.saveState(); c.setFont("Helvetica", 6); c.setFillColor(grey); c.setStrokeColor(grey)
-            for x in range(0, int(w)+1, step):
-                c.line(x, 0, x, h); c.drawString(x+2, 4, str(x))
-            for y in range(0, int(h)+1, step):
-                c.line(0, y, w, y); c.drawString(2, y+2, str(y))
-            c.restoreState()
-        def _cross(x, y, s=6):
-            c.saveState(); c.setFillColor(red); c.setStrokeColor(red)
-            c.line(x-s, y, x+s, y); c.line(x, y-s, x, y+s); c.restoreState()
-        def draw_left(xy, text, show_cross=SHOW_GUIDES):
-            if text is None or str(text).strip() == "": return
-            x, y = _xy(xy); 
-            if show_cross: _cross(x, y); 
-            c.drawString(x, y, str(text))
-        def draw_right(xy, text, show_cross=SHOW_GUIDES):
-            if text is None or str(text).strip() == "": return
-            s = str(text); x, y = _xy(xy); w = c.stringWidth(s, "Helvetica", 11)
-            if show_cross: _cross(x, y); 
-            c.drawString(x - w, y, s)
-        def draw_wrapped(xy, text, width=320):
-            if text is None or str(text).strip() == "": return
-            x, y = _xy(xy); words = str(text).split(); line=""; lines=[]
-            for w in words:
-                t=(line+" "+w).strip()
-                if c.stringWidth(t,"Helvetica",11)<=width: line=t
-                else: lines.append(line); line=w
-            if line: lines.append(line)
-            for i, ln in enumerate(lines): c.drawString(x, y-14*i, ln)
-            if SHOW_GUIDES: _cross(x, y)
-
-        if SHOW_GUIDES: _draw_grid()
-        c.setFillColor(white)
-        for (x,y,w,h) in ERASE_BOXES:
-            xx, yy = _xy((x,y)); c.rect(xx, yy, w, h, fill=1, stroke=0)
-        c.setFillColor(black)
-
-        nombre = self.ultimo_reporte.get("paciente","")
-        edad = self.edad_var.get()
-        fecha = self.ultimo_reporte.get("fecha","")
-        ejercicio = self.ultimo_reporte.get("ejercicio","")
-        ang_res = self.ultimo_reporte.get("comparacion",{})
-        rep = self.ultimo_reporte.get("repeticiones","")
-        ser = self.ultimo_reporte.get("series","")
-        peso = self.ultimo_reporte.get("peso","")
-
-        draw_left(COORDS["paciente"], nombre)
-        draw_right((COORDS["edad"][0]+80, COORDS["edad"][1]), edad)
-        draw_left(COORDS["fecha"], fecha)
-
-        draw_wrapped(COORDS["ejercicio"], ejercicio, width=320)
-        draw_left(COORDS["peso"], peso)
-
-        # Mostrar "90° / 180°" como referencia
-        draw_right((COORDS["ref_flex"][0]+40, COORDS["ref_flex"][1]), self.meta_texto)
-        draw_right((COORDS["ref_abd"][0]+40,  COORDS["ref_abd"][1]),  self.meta_texto)
-
-        draw_right((COORDS["res_flex"][0]+40, COORDS["res_flex"][1]),
-                   f"{ang_res.get('Flexión','')}°" if ang_res.get('Flexión') not in ("",None) else "")
-        draw_right((COORDS["res_abd"][0]+40,  COORDS["res_abd"][1]),
-                   f"{ang_res.get('Abducción','')}°" if ang_res.get('Abducción') not in ("",None) else "")
-
-        draw_left(COORDS["reps"], rep)
-        draw_left(COORDS["series"], ser)
-
-        c.save(); buffer.seek(0)
-        new_pdf = PdfReader(buffer)
-        plantilla = PdfReader(plantilla_path)
-        out = PdfWriter()
-        page = plantilla.pages[0]
-        page.merge_page(new_pdf.pages[0])
-        out.add_page(page)
-        with open(archivo_salida, "wb") as f:
-            out.write(f)
+        datos = dict(self.ultimo_reporte, edad=self.edad_var.get(), metas=self.meta_texto)
+        from graficas import serie_grafica
+        from reportes import generar_pdf   # PyPDF2/reportlab: normalmente ya importados por la precarga
+        if datos.get("sesion_id") is not None:
+            try:
+                datos["serie"] = serie_grafica(*self.db.serie_sesion(datos["sesion_id"]))
+            except sqlite3.Error as e:
+                messagebox.showwarning("Reporte", f"El reporte sale sin gráficas:\n{e}")
+        generar_pdf(datos, plantilla_path, archivo_salida)
         messagebox.showinfo("Éxito", "Reporte exportado correctamente.")
 
 
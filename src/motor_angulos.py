@@ -0,0 +1,131 @@
+"""
+Ángulos articulares de ambos lados en una sola pasada vectorizada de NumPy.
+
+Trabaja sobre landmarks como arreglo: (33, 4) para un cuadro o (N, 33, 4) para
+una secuencia (x, y, z, visibility normalizados). Los ángulos se miden en el plano
+de la imagen, igual que angle_from_vertical_deg. Cuadros sin pose (NaN) dan NaN.
+"""
+import numpy as np
+
+from biomecanica import N_LANDMARKS, PLANE_RATIO_THRESH
+
+# Índices de MediaPipe Pose por lado
+LADOS = {
+    "der": {"hombro": 12, "codo": 14, "muneca": 16, "cadera": 24, "rodilla": 26, "tobillo": 28},
+    "izq": {"hombro": 11, "codo": 13, "muneca": 15, "cadera": 23, "rodilla": 25, "tobillo": 27},
+}
+
+# Por lado:  ("vertical", a, b)        segmento a->b respecto a la vertical hacia abajo
+#                                      (0° colgando, 90° horizontal, 180° arriba)
+#            ("articulacion", a, b, c) ángulo en b entre b->a y b->c (180° = extendido)
+ANGULOS_LADO = {
+    "hombro": ("vertical", "hombro", "codo"),
+    "codo": ("articulacion", "hombro", "codo", "muneca"),
+    "cadera": ("articulacion", "hombro", "cadera", "rodilla"),
+    "rodilla": ("articulacion", "cadera", "rodilla", "tobillo"),
+}
+
+# Centrales: los puntos son tuplas de índices que se promedian (p. ej. punto medio de hombros)
+ANGULOS_CENTRALES = {
+    "tronco": ("vertical", (11, 12), (23, 24)),   # 0° erguido; crece al inclinarse
+}
+
+
+# ======================= Operaciones vectorizadas =======================
+def _vertical(a, b):
+    """Ángulo de a->b respecto a +Y (abajo en la imagen); a, b (..., 2)."""
+    v = b - a
+    return np.degrees(np.arctan2(np.abs(v[..., 0]), v[..., 1]))
+
+
+def _articulacion(a, b, c):
+    """Ángulo en b entre b->a y b->c; a, b, c (..., 2)."""
+    u = a - b
+    w = c - b
+    cruz = u[..., 0] * w[..., 1] - u[..., 1] * w[..., 0]
+    punto = u[..., 0] * w[..., 0] + u[..., 1] * w[..., 1]
+    return np.degrees(np.arctan2(np.abs(cruz), punto))
+
+
+def plano_frontal(lm, lado="der"):
+    """Máscara: el brazo se mueve en el plano frontal (mismo filtro |Δx|/|Δz| que angulos_hombro)."""
+    i = LADOS[lado]
+    d = lm[..., i["codo"], :3] - lm[..., i["hombro"], :3]
+    return np.abs(d[..., 0]) / (np.abs(d[..., 2]) + 1e-6) >= PLANE_RATIO_THRESH
+
+
+def angulos_hombro_lote(lm, lado="der"):
+    """Equivalente vectorizado de angulos_hombro: (flex, abd) con abd = NaN fuera del plano."""
+    i = LADOS[lado]
+    lm = np.asarray(lm, dtype=np.float64)
+    flex = _vertical(lm[..., i["hombro"], :2], lm[..., i["codo"], :2])
+    return flex, np.where(plano_frontal(lm, lado), flex, np.nan)
+
+
+# ======================= Motor configurable =======================
+class MotorAngulos:
+    """
+    Compila un conjunto de ángulos (por lado + centrales) en arreglos de índices y
+    los calcula todos juntos: calcular(lm) -> (..., K) en el orden de `nombres`
+    ("hombro_der", "hombro_izq", "codo_der", ..., "tronco").
+    """
+
+    def __init__(self, angulos_lado=ANGULOS_LADO, lados=("der", "izq"), centrales=ANGULOS_CENTRALES):
+        self.nombres = []
+        self._virtuales = []            # tuplas de índices que se promedian (índice N_LANDMARKS + k)
+        specs = []
+        for nombre, (tipo, *partes) in angulos_lado.items():
+            for lado in lados:
+                self.nombres.append(f"{nombre}_{lado}")
+                specs.append((tipo, [LADOS[lado][p] for p in partes]))
+        for nombre, (tipo, *puntos) in centrales.items():
+            self.nombres.append(nombre)
+            specs.append((tipo, [self._punto(p) for p in puntos]))
+        self.indices = {n: k for k, n in enumerate(self.nombres)}
+
+        self._pos_v = np.array([k for k, (t, _) in enumerate(specs) if t == "vertical"], dtype=np.intp)
+        self._pos_a = np.array([k for k, (t, _) in enumerate(specs) if t == "articulacion"], dtype=np.intp)
+        self._v = np.array([p for t, p in specs if t == "vertical"], dtype=np.intp).reshape(-1, 2)
+        self._a = np.array([p for t, p in specs if t == "articulacion"], dtype=np.intp).reshape(-1, 3)
+        # puntos usados por cada ángulo (para la visibilidad mínima)
+        self._usados = [p for _, p in specs]
+        # landmarks -> landmarks + puntos virtuales (promedios) como una matriz
+        self._W = np.zeros((N_LANDMARKS + len(self._virtuales), N_LANDMARKS))
+        self._W[np.arange(N_LANDMARKS), np.arange(N_LANDMARKS)] = 1.0
+        for k, v in enumerate(self._virtuales):
+            self._W[N_LANDMARKS + k, list(v)] = 1.0 / len(v)
+
+    def _punto(self, p):
+        if isinstance(p, int):
+            return p
+        p = tuple(p)
+        if len(p) == 1:
+            return p[0]
+        if p not in self._virtuales:
+            self._virtuales.append(p)
+        return N_LANDMARKS + self._virtuales.index(p)
+
+    def _puntos(self, lm):
+        """(..., 33, 4) -> (..., 33 + virtuales, 4) con una sola multiplicación de matrices."""
+        return np.matmul(self._W, np.asarray(lm, dtype=np.float64))
+
+    def calcular(self, lm):
+        """lm (33, 4) o (N, 33, 4) -> ángulos en grados (K,) o (N, K)."""
+        P = self._puntos(lm)
+        xy = P[..., :2]
+        out = np.empty(P.shape[:-2] + (len(self.nombres),), dtype=np.float64)
+        if len(self._pos_v):
+            out[..., self._pos_v] = _vertical(xy[..., self._v[:, 0], :], xy[..., self._v[:, 1], :])
+        if len(self._pos_a):
+            out[..., self._pos_a] = _articulacion(xy[..., self._a[:, 0], :], xy[..., self._a[:, 1], :],
+                                                  xy[..., self._a[:, 2], :])
+        return out
+
+    def visibilidad(self, lm):
+        """Visibilidad mínima de los puntos que usa cada ángulo: (K,) o (N, K)."""
+        vis = self._puntos(lm)[..., 3]
+        return np.stack([vis[..., p].min(axis=-1) for p in self._usados], axis=-1)
+
+    def a_dict(self, valores):
+        """Ángulos de un cuadro -> {nombre: float}."""
+        return {n: float(v) for n, v in zip(self.nombres, valores)}
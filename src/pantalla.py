@@ -0,0 +1,109 @@
+import threading
+import time
+
+from PIL import Image, ImageTk
+
+
+# ======================= Buzón del último cuadro =======================
+class BuzonUltimo:
+    """
+    Guarda SOLO lo último publicado. El hilo de trabajo publica sin esperar;
+    el hilo de Tk toma cuando le toca. Lo que nadie alcanzó a tomar se descarta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valor = None
+        self._seq = 0
+        self._seq_tomado = 0
+        self.publicados = 0
+        self.descartados = 0
+
+    def publicar(self, valor):
+        with self._lock:
+            if self._seq != self._seq_tomado:
+                self.descartados += 1
+            self._valor = valor
+            self._seq += 1
+            self.publicados += 1
+
+    def tomar(self):
+        """Devuelve el último valor si es nuevo desde la última toma, o None."""
+        with self._lock:
+            if self._seq == self._seq_tomado:
+                return None
+            self._seq_tomado = self._seq
+            return self._valor
+
+
+# ======================= Presentador Tk =======================
+class PresentadorTk:
+    """
+    Muestra cuadros publicados desde otro hilo usando SOLO el hilo principal de Tk:
+    - un `after()` periódico (fps_objetivo) toma lo último del buzón;
+    - cada panel tiene un PhotoImage y una imagen PIL de vida larga: el arreglo se copia
+      a la imagen (frombytes, sin objetos nuevos) y la imagen al PhotoImage con paste();
+    - si el trabajo va más rápido que la pantalla, los cuadros intermedios se descartan.
+    `al_actualizar(info)` se llama en el hilo de Tk con los datos no-imagen publicados.
+    """
+
+    def __init__(self, raiz, fps_objetivo=30, al_actualizar=None, instr=None):
+        self.raiz = raiz
+        self.periodo_ms = max(1, int(1000 / fps_objetivo))
+        self.al_actualizar = al_actualizar
+        self.instr = instr            # opcional: mide el tiempo de paste en Tk
+        self.buzon = BuzonUltimo()
+        self._paneles = {}
+        self._after_id = None
+        self.mostrados = 0
+
+    def agregar_panel(self, nombre, label, tam):
+        """tam = (ancho, alto) fijo del panel; los cuadros publicados deben tener ese tamaño."""
+        imagen = Image.new("RGB", tam)
+        foto = ImageTk.PhotoImage(imagen)
+        label.configure(image=foto)
+        label.imgtk = foto  # evita que el GC libere la imagen
+        self._paneles[nombre] = (foto, imagen)
+
+    def publicar(self, cuadros, info=None):
+        """
+        Desde cualquier hilo. cuadros: {panel: arreglo RGB uint8 (alto, ancho, 3)}.
+        Los arreglos se leen después, en el hilo de Tk: si vienen de un anillo del pool,
+        el anillo debe tener margen (n >= 3: uno en el buzón, uno pintándose, uno escribiéndose).
+        """
+        self.buzon.publicar((cuadros, info))
+
+    def iniciar(self):
+        if self._after_id is None:
+            self._after_id = self.raiz.after(self.periodo_ms, self._tick)
+
+    def detener(self):
+        if self._after_id is not None:
+            try:
+                self.raiz.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _tick(self):
+        t0 = time.perf_counter()
+        dato = self.buzon.tomar()
+        if dato is not None:
+            cuadros, info = dato
+            for nombre, arr in cuadros.items():
+                panel = self._paneles.get(nombre)
+                if panel is not None and arr is not None:
+                    foto, imagen = panel
+                    if arr.shape[1::-1] == imagen.size and arr.flags.c_contiguous:
+                        imagen.frombytes(arr)
+                        foto.paste(imagen)
+                    else:
+                        foto.paste(Image.fromarray(arr))
+            if self.instr is not None:
+                self.instr.registrar("tk_pintar", time.perf_counter() - t0)
+            if self.al_actualizar is not None and info is not None:
+                self.al_actualizar(info)
+            self.mostrados += 1
+        # se descuenta el tiempo de este tick para mantener el ritmo objetivo
+        transcurrido = int((time.perf_counter() - t0) * 1000)
+        self._after_id = self.raiz.after(max(1, self.periodo_ms - transcurrido), self._tick)
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+
+
+# ======================= Colas =======================
+class ColaDescartable:
+    """
+    Cola acotada que, al llenarse, descarta el elemento MÁS ANTIGUO.
+    Así el productor nunca espera al consumidor y el consumidor
+    siempre recibe lo más reciente. `al_descartar(item)` (opcional) recibe lo
+    descartado, p. ej. para devolver su buffer al pool.
+    """
+
+    def __init__(self, maxsize=1, al_descartar=None):
+        self._items = deque(maxlen=max(1, int(maxsize)))
+        self.al_descartar = al_descartar
+        self._cond = threading.Condition()
+        self._cerrada = False
+        self.descartados = 0
+        self.entregados = 0
+
+    def put(self, item):
+        viejo = None
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.descartados += 1
+                viejo = self._items[0]
+            self._items.append(item)
+            self._cond.notify()
+        if viejo is not None and self.al_descartar is not None:
+            self.al_descartar(viejo)
+
+    def get(self, timeout=None):
+        """Devuelve el siguiente elemento o None si vence el timeout / la cola se cerró."""
+        with self._cond:
+            if not self._items and not self._cerrada:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            self.entregados += 1
+            return self._items.popleft()
+
+    def agotada(self):
+        """True si la cola está cerrada y ya no quedan elementos."""
+        with self._cond:
+            return self._cerrada and not self._items
+
+    def close(self):
+        with self._cond:
+            self._cerrada = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+# ======================= Pipeline =======================
+class Pipeline:
+    """
+    Conjunto de etapas, cada una en su propio hilo, unidas por ColaDescartable.
+    - Fuente: producir() -> item (None = fin de datos)
+    - Etapa:  procesar(item) -> item para la siguiente cola (None = no reenviar)
+    Si una etapa lanza, todo se detiene y `error` queda con (etapa, excepción) de la
+    primera que falló, para que la UI lo muestre.
+    """
+
+    def __init__(self, nombre="pipeline"):
+        self.nombre = nombre
+        self.detener = threading.Event()
+        self.error = None
+        self._hilos = []
+        self._colas = []
+
+    def cola(self, maxsize=1, al_descartar=None):
+        c = ColaDescartable(maxsize, al_descartar)
+        self._colas.append(c)
+        return c
+
+    def agregar_fuente(self, nombre, producir, salida, periodo=0.0):
+        """periodo > 0 limita la fuente a 1/periodo items por segundo (p. ej. FPS de un clip)."""
+        def _loop():
+            siguiente = time.perf_counter()
+            while not self.detener.is_set():
+                item = producir()
+                if item is None:
+                    break
+                salida.put(item)
+                if periodo > 0:
+                    siguiente += periodo
+                    espera = siguiente - time.perf_counter()
+                    if espera > 0:
+                        self.detener.wait(espera)
+                    else:
+                        siguiente = time.perf_counter()
+        self._agregar_hilo(nombre, _loop, salida)
+
+    def agregar_etapa(self, nombre, procesar, entrada, salida=None):
+        def _loop():
+            while not self.detener.is_set():
+                item = entrada.get(timeout=0.1)
+                if item is None:
+                    if entrada.agotada():
+                        break
+                    continue
+                out = procesar(item)
+                if salida is not None and out is not None:
+                    salida.put(out)
+        self._agregar_hilo(nombre, _loop, salida)
+
+    def _agregar_hilo(self, nombre, fn, salida):
+        def _run():
+            try:
+                fn()
+            except Exception as e:
+                # un error en cualquier etapa detiene todo el pipeline
+                if self.error is None:
+                    self.error = (nombre, e)
+                self.detener.set()
+                raise
+            finally:
+                # fin de datos: se cierra la salida y las etapas siguientes
+                # terminan al vaciar su cola
+                if salida is not None:
+                    salida.close()
+        self._hilos.append(threading.Thread(target=_run, name=f"{self.nombre}-{nombre}", daemon=True))
+
+    def iniciar(self):
+        for h in self._hilos:
+            h.start()
+
+    def parar(self, timeout=1.0):
+        self.detener.set()
+        for c in self._colas:
+            c.close()
+        actual = threading.current_thread()
+        for h in self._hilos:
+            if h is not actual and h.is_alive():
+                h.join(timeout)
+
+    def activo(self):
+        return not self.detener.is_set() and any(h.is_alive() for h in self._hilos)
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que todas las etapas terminen (útil con fuentes finitas)."""
+        for h in self._hilos:
+            h.join(timeout)
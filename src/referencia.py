@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+TAM_DISPLAY = (560, 420)          # (ancho, alto) del panel de referencia
+EXT_VIDEO = (".mp4", ".avi", ".mov")
+CALIDAD_JPEG = 90                 # cuadros guardados en la caché (~30-40 KB a 560x420)
+
+
+# ======================= Almacén de cuadros =======================
+def crear_almacen(ruta_npy, n, tam=TAM_DISPLAY):
+    """Arreglo .npy (n, alto, ancho, 3) uint8 respaldado por memmap, listo para escribir."""
+    ancho, alto = tam
+    return np.lib.format.open_memmap(ruta_npy, mode="w+", dtype=np.uint8,
+                                     shape=(max(int(n), 1), alto, ancho, 3))
+
+
+class EscritorJPEG:
+    """Cuadros BGR -> un archivo con los JPEG seguidos + offsets.npy (inicio de cada uno)."""
+
+    def __init__(self, ruta_datos, calidad=CALIDAD_JPEG):
+        self._f = open(ruta_datos, "wb")
+        self._params = [cv2.IMWRITE_JPEG_QUALITY, calidad]
+        self.offsets = [0]
+
+    def agregar(self, bgr):
+        ok, buf = cv2.imencode(".jpg", bgr, self._params)
+        if not ok:
+            raise ValueError("No se pudo comprimir el cuadro")
+        self._f.write(buf.tobytes())
+        self.offsets.append(self.offsets[-1] + len(buf))
+
+    def cerrar(self, ruta_offsets):
+        self._f.close()
+        np.save(ruta_offsets, np.array(self.offsets, dtype=np.int64))
+
+
+def jpeg_a_memmap(ruta_datos, ruta_offsets, ruta_npy, n=None, tam=TAM_DISPLAY):
+    """
+    Cuadros de EscritorJPEG -> .npy (n, alto, ancho, 3) RGB, decodificados UNA vez
+    (~1 ms por cuadro a 560x420). Devuelve el memmap de solo lectura.
+    """
+    offsets = np.load(ruta_offsets)
+    n = len(offsets) - 1 if n is None else min(n, len(offsets) - 1)
+    datos = np.memmap(ruta_datos, dtype=np.uint8, mode="r") if offsets[-1] > 0 else None
+    frames = crear_almacen(ruta_npy, n, tam)
+    for i in range(n):
+        bgr = cv2.imdecode(datos[offsets[i]:offsets[i + 1]], cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError(f"Cuadro {i} corrupto en {ruta_datos}")
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=frames[i])
+    frames.flush()
+    del frames, datos
+    return np.load(ruta_npy, mmap_mode="r")[:n]
+
+
+def contar_cuadros(ruta):
+    """Conteo de cuadros; si el contenedor no lo informa se cuenta con grab() (sin decodificar a BGR)."""
+    cap = cv2.VideoCapture(ruta)
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if n <= 0:
+        n = 0
+        while cap.grab():
+            n += 1
+    cap.release()
+    return n
+
+
+def decodificar_a_memmap(ruta, ruta_npy, tam=TAM_DISPLAY):
+    """
+    Decodifica un video (o imagen) UNA vez a RGB del tamaño de display, directo a disco.
+    Devuelve (frames de solo lectura, fps).
+    """
+    if not ruta.lower().endswith(EXT_VIDEO):
+        img = cv2.imread(ruta)
+        if img is None:
+            raise ValueError(f"No se pudo abrir la imagen: {ruta}")
+        frames = crear_almacen(ruta_npy, 1, tam)
+        cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), tam, dst=frames[0])
+        n, fps = 1, 30.0
+    else:
+        n_est = contar_cuadros(ruta)
+        cap = cv2.VideoCapture(ruta)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = crear_almacen(ruta_npy, n_est, tam)
+        n = 0
+        while n < frames.shape[0]:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            cv2.resize(rgb, tam, dst=frames[n])
+            n += 1
+        cap.release()
+        if n == 0:
+            raise ValueError(f"No se pudo decodificar: {ruta}")
+    frames.flush()
+    del frames
+    return np.load(ruta_npy, mmap_mode="r")[:n], float(fps)
+
+
+# ======================= Reproducción =======================
+class ReproductorReferencia:
+    """
+    Reproduce un clip ya decodificado (memmap) por indexación pura:
+    el cuadro se elige con el reloj y los FPS del propio clip, sin
+    decodificar, sin seek al volver al inicio y sin depender del ritmo de la cámara.
+    """
+
+    def __init__(self, frames, fps=30.0, dir_temporal=None):
+        self.frames = frames
+        self.n = len(frames)
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.t0 = time.perf_counter()
+        self._dir_temporal = dir_temporal
+
+    @classmethod
+    def desde_archivo(cls, ruta):
+        """Sin caché: decodifica a un memmap temporal que se borra al cerrar."""
+        d = tempfile.mkdtemp(prefix="ref_")
+        try:
+            frames, fps = decodificar_a_memmap(ruta, os.path.join(d, "frames.npy"))
+        except Exception:
+            shutil.rmtree(d, ignore_errors=True)
+            raise
+        return cls(frames, fps, dir_temporal=d)
+
+    def indice(self, t=None):
+        if self.n == 1:
+            return 0
+        t = time.perf_counter() if t is None else t
+        return int((t - self.t0) * self.fps) % self.n
+
+    def cuadro(self, t=None):
+        return self.frames[self.indice(t)]
+
+    def cerrar(self):
+        self.frames = None
+        if self._dir_temporal:
+            shutil.rmtree(self._dir_temporal, ignore_errors=True)
+            self._dir_temporal = None
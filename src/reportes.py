@@ -0,0 +1,233 @@
+import os
+from io import BytesIO
+
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.colors import white, black, red, grey
+
+from graficas import render_graficas
+
+META_TEXTO = "90° / 180°"
+
+
+# ================== CONFIG PDF (EDITABLE) ==================
+OFFSET_X = 0
+OFFSET_Y = 0
+SHOW_GUIDES = False
+GRID_STEP = 40
+
+COORDS = {
+    # Cabecera
+    "paciente":  (200, 730),
+    "edad":      (200, 710),
+    "fecha":     (470, 730),
+
+    # Datos
+    "ejercicio": (200, 690),
+    "peso":      (200, 670),
+
+    # Referencias
+    "ref_flex":  (200, 640),
+    "ref_abd":   (200, 620),
+
+    # Resultados medidos
+    "res_flex":  (400, 640),
+    "res_abd":   (400, 620),
+
+    "reps":      (200, 570),
+    "series":    (200, 550),
+
+    # Métricas de la sesión (estadisticas.EstadisticasSesion), una por renglón
+    "metricas":  (60, 515),
+}
+
+ERASE_BOXES = [
+    (195, 724, 250, 18),
+    (195, 704, 100, 18),
+    (465, 724, 180, 18),
+
+    (195, 684, 320, 18),
+    (195, 664, 120, 18),
+
+    (195, 636, 140, 16),
+    (195, 616, 140, 16),
+
+    (395, 636, 120, 16),
+    (395, 616, 120, 16),
+
+    (195, 566, 120, 16),
+    (195, 546, 120, 16),
+]
+
+
+# ======================= Render =======================
+def render_overlay(datos) -> bytes:
+    """
+    Página (PDF en bytes) con los datos del reporte en COORDS, para superponer a la plantilla.
+    datos: paciente, edad, fecha, ejercicio, comparacion{Flexión, Abducción},
+           repeticiones, series, peso, metas y, opcional, metricas (resumen de
+           EstadisticasSesion): reps/series medidas (lo indicado queda entre paréntesis),
+           ROM, percentiles y tiempo en las metas.
+    """
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    c.setFont("Helvetica", 11)
+
+    def _xy(p): return (p[0] + OFFSET_X, p[1] + OFFSET_Y)
+    def _draw_grid(step=GRID_STEP):
+        w, h = letter
+        c.saveState(); c.setFont("Helvetica", 6); c.setFillColor(grey); c.setStrokeColor(grey)
+        for x in range(0, int(w)+1, step):
+            c.line(x, 0, x, h); c.drawString(x+2, 4, str(x))
+        for y in range(0, int(h)+1, step):
+            c.line(0, y, w, y); c.drawString(2, y+2, str(y))
+        c.restoreState()
+    def _cross(x, y, s=6):
+        c.saveState(); c.setFillColor(red); c.setStrokeColor(red)
+        c.line(x-s, y, x+s, y); c.line(x, y-s, x, y+s); c.restoreState()
+    def draw_left(xy, text, show_cross=SHOW_GUIDES):
+        if text is None or str(text).strip() == "": return
+        x, y = _xy(xy); 
+        if show_cross: _cross(x, y); 
+        c.drawString(x, y, str(text))
+    def draw_right(xy, text, show_cross=SHOW_GUIDES):
+        if text is None or str(text).strip() == "": return
+        s = str(text); x, y = _xy(xy); w = c.stringWidth(s, "Helvetica", 11)
+        if show_cross: _cross(x, y); 
+        c.drawString(x - w, y, s)
+    def draw_wrapped(xy, text, width=320):
+        if text is None or str(text).strip() == "": return
+        x, y = _xy(xy); words = str(text).split(); line=""; lines=[]
+        for w in words:
+            t=(line+" "+w).strip()
+            if c.stringWidth(t,"Helvetica",11)<=width: line=t
+            else: lines.append(line); line=w
+        if line: lines.append(line)
+        for i, ln in enumerate(lines): c.drawString(x, y-14*i, ln)
+        if SHOW_GUIDES: _cross(x, y)
+
+    if SHOW_GUIDES: _draw_grid()
+    c.setFillColor(white)
+    for (x,y,w,h) in ERASE_BOXES:
+        xx, yy = _xy((x,y)); c.rect(xx, yy, w, h, fill=1, stroke=0)
+    c.setFillColor(black)
+
+    nombre = datos.get("paciente","")
+    edad = datos.get("edad","")
+    fecha = datos.get("fecha","")
+    ejercicio = datos.get("ejercicio","")
+    ang_res = datos.get("comparacion",{}) or {}
+    rep = datos.get("repeticiones","")
+    ser = datos.get("series","")
+    peso = datos.get("peso","")
+    metas = datos.get("metas", META_TEXTO)
+    metricas = datos.get("metricas")
+    if metricas:
+        rep = f"{metricas['repeticiones']}" + (f" (indicadas: {rep})" if str(rep).strip() else "")
+        ser = f"{metricas['series']}" + (f" (indicadas: {ser})" if str(ser).strip() else "")
+
+    draw_left(COORDS["paciente"], nombre)
+    draw_right((COORDS["edad"][0]+80, COORDS["edad"][1]), edad)
+    draw_left(COORDS["fecha"], fecha)
+
+    draw_wrapped(COORDS["ejercicio"], ejercicio, width=320)
+    draw_left(COORDS["peso"], peso)
+
+    # Mostrar "90° / 180°" como referencia
+    draw_right((COORDS["ref_flex"][0]+40, COORDS["ref_flex"][1]), metas)
+    draw_right((COORDS["ref_abd"][0]+40,  COORDS["ref_abd"][1]),  metas)
+
+    draw_right((COORDS["res_flex"][0]+40, COORDS["res_flex"][1]),
+               f"{ang_res.get('Flexión','')}°" if ang_res.get('Flexión') not in ("",None) else "")
+    draw_right((COORDS["res_abd"][0]+40,  COORDS["res_abd"][1]),
+               f"{ang_res.get('Abducción','')}°" if ang_res.get('Abducción') not in ("",None) else "")
+
+    draw_left(COORDS["reps"], rep)
+    draw_left(COORDS["series"], ser)
+
+    if metricas:
+        for i, linea in enumerate(lineas_metricas(metricas)):
+            draw_left((COORDS["metricas"][0], COORDS["metricas"][1] - 16 * i), linea)
+
+    c.save()
+    return buffer.getvalue()
+
+
+def lineas_metricas(m):
+    """Resumen de EstadisticasSesion -> renglones de texto para el reporte."""
+    def g(v):
+        return "—" if v is None else f"{v:.0f}°"
+    p, meta = m.get("percentiles", {}), m.get("t_meta_s", {})
+    lineas = [
+        f"Modo evaluado: {m.get('modo', '')}   ROM máx / medio: {g(m.get('rom_max'))} / {g(m.get('rom_medio'))}"
+        f"   Ángulo máx: {g(m.get('angulo_max'))}",
+        "Percentiles del ángulo: " + " / ".join(f"p{k} {g(v)}" for k, v in p.items()),
+        "Tiempo en meta: " + " / ".join(f"{k}° {v or 0:.1f} s" for k, v in meta.items())
+        + f"   (activo {m.get('t_activo_s') or 0:.1f} s)",
+    ]
+    reps = m.get("reps") or []
+    if reps:
+        por_serie = {}
+        for r in reps:
+            por_serie[r["serie"]] = por_serie.get(r["serie"], 0) + 1
+        lineas.append("Repeticiones por serie: " + ", ".join(str(n) for n in por_serie.values()))
+    al = m.get("alineacion")
+    if al:
+        lineas.append(f"Vs. referencia: desviación media {al['desviacion_media_deg']:.0f}° (p90 "
+                      f"{al['desviacion_p90_deg']:.0f}°)   desfase medio {al['desfase_medio_s']:+.1f} s")
+    return lineas
+
+
+# ======================= Plantilla =======================
+class PlantillaPDF:
+    """
+    Plantilla leída y parseada una sola vez. Cada reporte parte de una página en
+    blanco del mismo tamaño a la que se le funden plantilla + overlay, así la página
+    original nunca se modifica y se puede reutilizar para cientos de reportes.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.pagina = PdfReader(ruta).pages[0]
+
+    def pagina_con(self, overlay):
+        """overlay: bytes de render_overlay -> página lista para un PdfWriter."""
+        caja = self.pagina.mediabox
+        pagina = PageObject.create_blank_page(width=caja.width, height=caja.height)
+        pagina.merge_page(self.pagina)
+        pagina.merge_page(PdfReader(BytesIO(overlay)).pages[0])
+        return pagina
+
+    def escribir(self, datos, archivo_salida):
+        out = PdfWriter()
+        out.add_page(self.pagina_con(render_overlay(datos)))
+        if datos.get("serie"):
+            out.add_page(pagina_graficas(render_graficas(datos)))
+        with open(archivo_salida, "wb") as f:
+            out.write(f)
+
+
+def pagina_graficas(graficas):
+    """graficas: bytes de render_graficas -> página aparte (no se funde con la plantilla)."""
+    return PdfReader(BytesIO(graficas)).pages[0]
+
+
+_plantillas = {}
+
+
+def cargar_plantilla(ruta):
+    """PlantillaPDF memorizada por (ruta, mtime): se vuelve a leer solo si el archivo cambia."""
+    clave = (os.path.abspath(ruta), os.path.getmtime(ruta))
+    if clave not in _plantillas:
+        _plantillas.clear()
+        _plantillas[clave] = PlantillaPDF(ruta)
+    return _plantillas[clave]
+
+
+def generar_pdf(datos, plantilla_path, archivo_salida):
+    """
+    Superpone render_overlay(datos) a la primera página de la plantilla y escribe el PDF;
+    con datos["serie"] (graficas.serie_grafica) agrega una página con las curvas.
+    """
+    cargar_plantilla(plantilla_path).escribir(datos, archivo_salida)
@@ -0,0 +1,138 @@
+"""
+Exportación masiva de reportes PDF desde la base de datos (sin diálogos).
+
+Uso:
+    python src/reportes_lote.py --desde 2025-10-01 --hasta 2025-11-01 --salida reportes_octubre
+    python src/reportes_lote.py --desde 2025-10-01 --combinado octubre.pdf
+
+La plantilla se parsea una vez por proceso; los overlays se dibujan en un pool
+de procesos. Se genera un PDF por sesión o, con --combinado, un único PDF. Cada
+reporte lleva una página con las curvas de la sesión, ya reducidas con LTTB en este
+proceso (a los workers viajan ~800 puntos por curva, no la serie completa).
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PyPDF2 import PdfWriter
+
+from base_datos import DB_PATH, BaseDatos
+from graficas import render_graficas, serie_grafica
+from reportes import META_TEXTO, PlantillaPDF, pagina_graficas, render_overlay
+
+_plantilla = None     # PlantillaPDF de cada proceso del pool
+
+
+# ======================= Trabajo por reporte =======================
+def _inicializar(ruta_plantilla):
+    global _plantilla
+    _plantilla = PlantillaPDF(ruta_plantilla)
+
+
+def _escribir(datos, archivo_salida):
+    _plantilla.escribir(datos, archivo_salida)
+    return archivo_salida
+
+
+def _paginas(datos):
+    """Modo combinado: (overlay, gráficas o None) en bytes; se funden en el proceso principal."""
+    return render_overlay(datos), render_graficas(datos) if datos.get("serie") else None
+
+
+def nombre_reporte(datos):
+    """000123_Ana_Lopez_2025-10-03.pdf (nombre seguro para cualquier sistema de archivos)."""
+    nombre = re.sub(r"[^\w-]+", "_", str(datos["paciente"] or "sin_nombre")).strip("_")
+    return f"{datos['sesion_id']:06d}_{nombre}_{str(datos['fecha'])[:10]}.pdf"
+
+
+# ======================= Orquestación =======================
+def exportar_lote(sesiones, plantilla, carpeta_salida=None, combinado=None, procesos=None, log=print):
+    """
+    Un PDF por sesión en `carpeta_salida` o todas las páginas en `combinado`.
+    Devuelve métricas (reportes, segundos, reportes_s, fallidos).
+    """
+    sesiones = [dict(d, metas=d.get("metas", META_TEXTO)) for d in sesiones]
+    t0 = time.perf_counter()
+    fallidos = []
+    hechos = 0
+
+    if combinado:
+        # los workers solo dibujan; las páginas se funden en orden en este proceso
+        paginas = {}
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = {pool.submit(_paginas, d): i for i, d in enumerate(sesiones)}
+            for fut in as_completed(futuros):
+                i = futuros[fut]
+                try:
+                    paginas[i] = fut.result()
+                except Exception as e:
+                    fallidos.append((sesiones[i]["sesion_id"], str(e)))
+                    log(f"[error] sesión {sesiones[i]['sesion_id']}: {e}")
+        base = PlantillaPDF(plantilla)
+        out = PdfWriter()
+        for i in sorted(paginas):
+            overlay, graficas = paginas[i]
+            out.add_page(base.pagina_con(overlay))
+            if graficas:
+                out.add_page(pagina_graficas(graficas))
+        with open(combinado, "wb") as f:
+            out.write(f)
+        hechos = len(paginas)
+    else:
+        os.makedirs(carpeta_salida, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar,
+                                 initargs=(plantilla,)) as pool:
+            futuros = {pool.submit(_escribir, d, os.path.join(carpeta_salida, nombre_reporte(d))): d
+                       for d in sesiones}
+            for fut in as_completed(futuros):
+                try:
+                    fut.result()
+                    hechos += 1
+                except Exception as e:
+                    sid = futuros[fut]["sesion_id"]
+                    fallidos.append((sid, str(e)))
+                    log(f"[error] sesión {sid}: {e}")
+
+    dt = time.perf_counter() - t0
+    log(f"{hechos} reportes en {dt:.1f} s ({hechos / dt if dt > 0 else 0:.1f} reportes/s), "
+        f"{len(fallidos)} fallidos")
+    return {"reportes": hechos, "segundos": dt, "reportes_s": hechos / dt if dt > 0 else 0.0,
+            "fallidos": fallidos}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Genera los reportes PDF de las sesiones guardadas.")
+    ap.add_argument("--db", default=DB_PATH, help="base de datos de pacientes")
+    ap.add_argument("--plantilla", default="Plantilla.pdf")
+    ap.add_argument("--desde", help="fecha inicial incluida (AAAA-MM-DD)")
+    ap.add_argument("--hasta", help="fecha final excluida (AAAA-MM-DD)")
+    ap.add_argument("--paciente", help="solo las sesiones de este paciente")
+    ap.add_argument("--salida", default="reportes_pdf", help="carpeta para un PDF por sesión")
+    ap.add_argument("--combinado", help="escribe todas las sesiones en este único PDF")
+    ap.add_argument("--procesos", type=int, default=None, help="procesos del pool (defecto: núcleos)")
+    ap.add_argument("--sin-graficas", action="store_true", help="solo la página de la plantilla")
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(args.plantilla):
+        print(f"No se encontró la plantilla: {os.path.abspath(args.plantilla)}", file=sys.stderr)
+        return 1
+    db = BaseDatos(args.db)
+    try:
+        sesiones = db.sesiones_para_reporte(args.desde, args.hasta, args.paciente)
+        if not args.sin_graficas:
+            for d in sesiones:
+                d["serie"] = serie_grafica(*db.serie_sesion(d["sesion_id"]))
+    finally:
+        db.cerrar()
+    if not sesiones:
+        print("No hay sesiones en ese rango.", file=sys.stderr)
+        return 1
+    r = exportar_lote(sesiones, args.plantilla, args.salida, args.combinado, args.procesos)
+    return 1 if r["fallidos"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
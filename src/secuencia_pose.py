@@ -0,0 +1,155 @@
+"""
+Formato binario compacto para secuencias de pose (.pose).
+
+    cabecera (64 bytes, little endian)
+        magia "RHPOSE\\0\\0" | versión u16 | landmarks u16 | canales u16 | reservado u16
+        fps f64 | bytes de meta u32 | offset de datos u32 | reservado
+    meta JSON (utf-8), relleno hasta múltiplo de 64
+    registros de tamaño fijo: t f64 + landmarks f32[33][4] (x, y, z, visibility)
+
+Los registros se agregan al final mientras se graba; el número de cuadros se deduce
+del tamaño del archivo, así un archivo a medio escribir (o de una sesión que se
+cortó) se sigue pudiendo leer. La lectura es un memmap: acceso aleatorio sin cargar
+la secuencia entera. Los cuadros sin pose se guardan como NaN.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+from biomecanica import N_LANDMARKS
+
+MAGIA = b"RHPOSE\0\0"
+VERSION = 1
+CANALES = 4
+_CABECERA = struct.Struct("<8sHHHHdII32x")
+ALINEACION = 64
+EXTENSION = ".pose"
+
+
+def dtype_registro(n_landmarks=N_LANDMARKS, canales=CANALES):
+    return np.dtype([("t", "<f8"), ("lm", "<f4", (n_landmarks, canales))])
+
+
+def _offset_datos(n_meta):
+    return -(-(_CABECERA.size + n_meta) // ALINEACION) * ALINEACION
+
+
+# ======================= Escritura =======================
+class EscritorPose:
+    """
+    Escritura incremental: agregar(t, landmarks) por cuadro (landmarks (33, 4) o None).
+    Los datos quedan visibles para los lectores tras flush() o cerrar().
+    """
+
+    def __init__(self, ruta, fps=0.0, meta=None):
+        self.ruta = ruta
+        self.dtype = dtype_registro()
+        meta_bytes = json.dumps(meta or {}, ensure_ascii=False).encode("utf-8")
+        offset = _offset_datos(len(meta_bytes))
+        self._f = open(ruta, "wb")
+        self._f.write(_CABECERA.pack(MAGIA, VERSION, N_LANDMARKS, CANALES, 0, float(fps),
+                                     len(meta_bytes), offset))
+        self._f.write(meta_bytes)
+        self._f.write(b"\0" * (offset - _CABECERA.size - len(meta_bytes)))
+        self._registro = np.zeros(1, dtype=self.dtype)
+        self.n = 0
+
+    def agregar(self, t, landmarks):
+        r = self._registro
+        r["t"] = t
+        if landmarks is None:
+            r["lm"] = np.nan
+        else:
+            r["lm"] = landmarks
+        self._f.write(r.tobytes())
+        self.n += 1
+
+    def agregar_lote(self, t, landmarks):
+        """t (N,), landmarks (N, 33, 4) (filas NaN = sin pose)."""
+        r = np.empty(len(t), dtype=self.dtype)
+        r["t"] = t
+        r["lm"] = landmarks
+        self._f.write(r.tobytes())
+        self.n += len(t)
+
+    def flush(self):
+        self._f.flush()
+
+    def cerrar(self):
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def guardar(ruta, t, landmarks, fps=0.0, meta=None):
+    with EscritorPose(ruta, fps, meta) as e:
+        e.agregar_lote(t, landmarks)
+
+
+# ======================= Lectura =======================
+class SecuenciaPose:
+    """
+    Secuencia en disco vista como arreglos (memmap, sin copiar):
+      .t (N,) f64 | .landmarks (N, 33, 4) f32 | .meta dict | .fps
+    recargar() incorpora los cuadros agregados desde que se abrió (archivo en grabación).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            cab = f.read(_CABECERA.size)
+            if len(cab) < _CABECERA.size:
+                raise ValueError(f"{ruta}: cabecera incompleta")
+            magia, version, n_lm, canales, _, fps, n_meta, offset = _CABECERA.unpack(cab)
+            if magia != MAGIA:
+                raise ValueError(f"{ruta}: no es un archivo {EXTENSION}")
+            if version > VERSION:
+                raise ValueError(f"{ruta}: versión {version} no soportada")
+            self.meta = json.loads(f.read(n_meta).decode("utf-8")) if n_meta else {}
+        self.fps = fps
+        self.offset = offset
+        self.dtype = dtype_registro(n_lm, canales)
+        self.recargar()
+
+    def recargar(self):
+        n = (os.path.getsize(self.ruta) - self.offset) // self.dtype.itemsize
+        if n > 0:
+            self.registros = np.memmap(self.ruta, dtype=self.dtype, mode="r", offset=self.offset, shape=(n,))
+        else:
+            self.registros = np.zeros(0, dtype=self.dtype)
+        return n
+
+    @property
+    def t(self):
+        return self.registros["t"]
+
+    @property
+    def landmarks(self):
+        return self.registros["lm"]
+
+    def __len__(self):
+        return len(self.registros)
+
+    def __getitem__(self, i):
+        """(t, landmarks) de un cuadro o arreglos de un tramo (slice)."""
+        r = self.registros[i]
+        return r["t"], r["lm"]
+
+    def indice(self, t):
+        """Índice del último cuadro con tiempo <= t (búsqueda binaria)."""
+        return max(0, int(np.searchsorted(self.t, t, side="right")) - 1)
+
+    def con_pose(self):
+        """Máscara de cuadros donde hubo detección."""
+        return ~np.isnan(self.landmarks[:, 0, 0])
+
+    def cerrar(self):
+        # soltar el memmap (en Windows el archivo queda bloqueado mientras exista)
+        self.registros = np.zeros(0, dtype=self.dtype)
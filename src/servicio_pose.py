@@ -0,0 +1,516 @@
+"""
+Servicio local de análisis de pose: varias estaciones (visores VR, cámaras de otra
+PC del consultorio, pruebas) mandan cuadros por HTTP a un solo equipo que tiene el
+modelo cargado, y reciben landmarks, ángulos y estado de las metas.
+
+    python src/servicio_pose.py --puerto 8765 --procesos 3 --clientes 8
+
+  POST /analizar   cuerpo: JPEG/PNG (Content-Type image/*) o BGR crudo
+                   (application/octet-stream + X-Ancho, X-Alto)
+                   X-Cliente: id de la estación (su seguimiento y suavizado son propios)
+                   X-Modo: Flexión | Abducción     X-T: reloj del cliente en s (opcional)
+  POST /cerrar     X-Cliente -> métricas de la sesión del cliente (repeticiones, ROM, ...)
+  GET  /metricas   rendimiento, tamaño de lotes, profundidad de cola, latencias
+  GET  /salud
+
+Micro-lotes: los pedidos de todos los clientes entran a una cola; un hilo toma el
+primero y junta lo que llegue en los siguientes `espera_lote_ms` (hasta `lote_max`).
+De cada lote se envía un cuadro por cliente a su canal del ServidorInferencia y
+después se juntan las respuestas, así los procesos trabajan en paralelo y el
+despacho se paga una vez por lote. Un cliente nunca tiene dos cuadros en el mismo
+envío (MediaPipe sigue la pose cuadro a cuadro): los repetidos pasan a la ronda
+siguiente, en orden.
+
+Cada cliente ocupa un canal mientras está activo; tras SESION_INACTIVA_S sin
+cuadros el canal se libera para otro. ClientePose es el lado del cliente (lo usa
+bench/carga_servicio.py para las pruebas de carga).
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from analisis import AnalizadorSesion
+from biomecanica import POSE_PARAMS
+from inferencia_procesos import TAM_MAXIMO, ServidorInferencia
+from instrumentacion import Instrumentacion
+
+PUERTO = 8765
+LOTE_MAX = 8
+ESPERA_LOTE_MS = 4.0
+COLA_MAX = 64               # pedidos esperando; más que esto se rechaza (503) en vez de acumular latencia
+MAX_CLIENTES = 8
+SESION_INACTIVA_S = 30.0
+TIMEOUT_PEDIDO = 15.0
+FPS_OBJETIVO = 20
+
+
+class ServicioOcupado(Exception):
+    """No hay lugar (cola llena o sin canales libres): el cliente debe reintentar o bajar su ritmo."""
+
+
+# ======================= Pedido =======================
+class _Pedido:
+    __slots__ = ("cliente", "modo", "frame", "t", "t_llegada", "listo", "respuesta", "error", "estado_http")
+
+    def __init__(self, cliente, modo, frame, t):
+        self.cliente = cliente
+        self.modo = modo
+        self.frame = frame
+        self.t = t
+        self.t_llegada = time.perf_counter()
+        self.listo = threading.Event()
+        self.respuesta = None
+        self.error = None
+        self.estado_http = 200
+
+    def fallar(self, error, estado_http=500):
+        self.error, self.estado_http = str(error), estado_http
+        self.listo.set()
+
+
+class _Sesion:
+    def __init__(self, cliente, canal, modo):
+        self.cliente = cliente
+        self.canal = canal
+        self.analizador = AnalizadorSesion(canal, cliente, "", modo)
+        self.cuadros = 0
+        self.t_ultimo = time.perf_counter()
+
+
+# ======================= Servicio =======================
+class ServicioPose:
+    def __init__(self, host="127.0.0.1", puerto=PUERTO, n_procesos=None, max_clientes=MAX_CLIENTES,
+                 lote_max=LOTE_MAX, espera_lote_ms=ESPERA_LOTE_MS, cola_max=COLA_MAX,
+                 tam_maximo=TAM_MAXIMO, fps_objetivo=FPS_OBJETIVO):
+        self.host, self.puerto = host, puerto
+        self.n_procesos = n_procesos or max(1, min(max_clientes, (os.cpu_count() or 2) - 1))
+        self.max_clientes = max_clientes
+        self.lote_max = lote_max
+        self.espera_lote = espera_lote_ms / 1000.0
+        self.tam_maximo = tam_maximo
+        self.fps_objetivo = fps_objetivo
+        self._cola = queue.Queue(cola_max)
+        self._sesiones = {}
+        self._lock = threading.Lock()
+        self._lock_ronda = threading.Lock()     # cerrar una sesión no se cruza con su cuadro en vuelo
+        self._detener = threading.Event()
+        self.servidor = None
+        self._libres = []
+        self._http = None
+        self._hilos = []
+        # métricas
+        self.instr = Instrumentacion(ventana_fps=500)   # fps() = pedidos respondidos por segundo
+        self.pedidos = 0
+        self.respondidos = 0
+        self.rechazados = 0
+        self.errores = 0
+        self.lotes = 0
+        self.tam_lotes = {}            # tamaño -> cantidad de lotes
+        self.cola_max_vista = 0
+        self.t_inicio = None
+
+    # ---------------- Ciclo de vida ----------------
+    def iniciar(self):
+        self.servidor = ServidorInferencia(canales=self.max_clientes, n_procesos=self.n_procesos,
+                                           tam_maximo=self.tam_maximo, calentar=True,
+                                           fps_objetivo=self.fps_objetivo, pose_params=POSE_PARAMS)
+        self.servidor.esperar_listo()
+        # los canales se reparten en orden entre procesos: tomarlos así llena todos los procesos
+        self._libres = list(reversed(self.servidor.canales))
+        self._http = ThreadingHTTPServer((self.host, self.puerto), _manejador(self))
+        self._http.daemon_threads = True
+        self.puerto = self._http.server_address[1]
+        self._hilos = [threading.Thread(target=self._bucle_lotes, name="servicio-lotes", daemon=True),
+                       threading.Thread(target=self._http.serve_forever, name="servicio-http", daemon=True)]
+        for h in self._hilos:
+            h.start()
+        self.t_inicio = time.perf_counter()
+        return self
+
+    def cerrar(self):
+        self._detener.set()
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+        for h in self._hilos:
+            h.join(2.0)
+        while True:
+            try:
+                self._cola.get_nowait().fallar("servicio cerrado", 503)
+            except queue.Empty:
+                break
+        if self.servidor is not None:
+            self.servidor.cerrar()
+
+    # ---------------- Entrada (hilos HTTP) ----------------
+    def enviar(self, cliente, modo, frame, t=None):
+        """Encola un cuadro BGR y espera su resultado (dict). ServicioOcupado si no hay lugar."""
+        p = _Pedido(cliente, modo, frame, time.perf_counter() if t is None else t)
+        try:
+            self._cola.put_nowait(p)
+        except queue.Full:
+            with self._lock:
+                self.rechazados += 1
+            raise ServicioOcupado("cola llena") from None
+        with self._lock:
+            self.pedidos += 1
+            self.cola_max_vista = max(self.cola_max_vista, self._cola.qsize())
+        if not p.listo.wait(TIMEOUT_PEDIDO):
+            raise TimeoutError("el pedido no se atendió a tiempo")
+        if p.estado_http == 503:
+            raise ServicioOcupado(p.error)
+        if p.error is not None:
+            raise RuntimeError(p.error)
+        return p.respuesta
+
+    def cerrar_sesion(self, cliente):
+        """Libera el canal del cliente y devuelve las métricas de su sesión (o None)."""
+        with self._lock_ronda, self._lock:
+            s = self._sesiones.pop(cliente, None)
+        if s is None:
+            return None
+        metricas = s.analizador.estadisticas.finalizar()
+        self._liberar(s)
+        return dict(metricas, cuadros=s.cuadros)
+
+    # ---------------- Sesiones ----------------
+    def _sesion(self, cliente, modo):
+        with self._lock:
+            s = self._sesiones.get(cliente)
+            if s is None:
+                if not self._libres:
+                    raise ServicioOcupado(f"sin canales libres ({self.max_clientes} clientes activos)")
+                s = self._sesiones[cliente] = _Sesion(cliente, self._libres.pop(), modo)
+        s.t_ultimo = time.perf_counter()
+        return s
+
+    def _liberar(self, s):
+        s.canal.reiniciar()
+        with self._lock:
+            self._libres.append(s.canal)
+
+    def _expirar(self):
+        ahora = time.perf_counter()
+        with self._lock:
+            viejas = [c for c, s in self._sesiones.items() if ahora - s.t_ultimo > SESION_INACTIVA_S]
+            sesiones = [self._sesiones.pop(c) for c in viejas]
+        for s in sesiones:
+            self._liberar(s)
+
+    # ---------------- Lotes ----------------
+    def _juntar_lote(self):
+        try:
+            lote = [self._cola.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        limite = time.perf_counter() + self.espera_lote
+        while len(lote) < self.lote_max:
+            resto = limite - time.perf_counter()
+            try:
+                lote.append(self._cola.get(timeout=resto) if resto > 0 else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    @staticmethod
+    def _rondas(lote):
+        """Parte el lote en rondas sin clientes repetidos, respetando el orden de llegada."""
+        rondas = []
+        for p in lote:
+            for r in rondas:
+                if all(q.cliente != p.cliente for q in r):
+                    r.append(p)
+                    break
+            else:
+                rondas.append([p])
+        return rondas
+
+    def _bucle_lotes(self):
+        t_expirar = time.perf_counter()
+        while not self._detener.is_set():
+            lote = self._juntar_lote()
+            if lote:
+                t0 = time.perf_counter()
+                for p in lote:
+                    self.instr.registrar("espera_cola", t0 - p.t_llegada)
+                for ronda in self._rondas(lote):
+                    with self._lock_ronda:
+                        self._procesar_ronda(ronda, len(lote))
+                self.instr.registrar("lote", time.perf_counter() - t0)
+                with self._lock:
+                    self.lotes += 1
+                    self.tam_lotes[len(lote)] = self.tam_lotes.get(len(lote), 0) + 1
+            if time.perf_counter() - t_expirar > 1.0:
+                self._expirar()
+                t_expirar = time.perf_counter()
+
+    def _procesar_ronda(self, ronda, tam_lote):
+        enviados = []
+        for p in ronda:
+            try:
+                s = self._sesion(p.cliente, p.modo)
+                item = {"t": p.t, "frame": p.frame}
+                s.canal.enviar(s.analizador.preparar(item))
+                enviados.append((p, s, item))
+            except ServicioOcupado as e:
+                with self._lock:
+                    self.rechazados += 1
+                p.fallar(e, 503)
+            except Exception as e:
+                with self._lock:
+                    self.errores += 1
+                p.fallar(e)
+        for p, s, item in enviados:
+            try:
+                item = s.analizador.completar(item, s.canal.recibir())
+                s.cuadros += 1
+                p.respuesta = self._respuesta(item, s, tam_lote, p.t_llegada)
+                with self._lock:
+                    self.respondidos += 1
+                self.instr.cuadro_mostrado(p.t_llegada)
+                p.listo.set()
+            except Exception as e:
+                with self._lock:
+                    self.errores += 1
+                p.fallar(e)
+
+    @staticmethod
+    def _respuesta(item, s, tam_lote, t_llegada):
+        lm = item["landmarks"]
+        return {
+            "cliente": s.cliente,
+            "n": s.cuadros,
+            "detectado": lm is not None,
+            "landmarks": None if lm is None else np.round(lm, 5).tolist(),
+            "angulos": {"flexion": None if item["ang_flex"] is None else round(item["ang_flex"], 2),
+                        "abduccion": None if item["ang_abd"] is None else round(item["ang_abd"], 2),
+                        "flexion_suavizada": None if item["s_flex"] is None else round(item["s_flex"], 2),
+                        "abduccion_suavizada": None if item["s_abd"] is None else round(item["s_abd"], 2)},
+            "articulaciones": item["angulos"],
+            "estado": {"flexion": "✓" if item["estado_flex_ok"] else "✗", "abduccion": item["estado_abd"]},
+            "repeticiones": item["repeticiones"],
+            "lote": tam_lote,
+            "latencia_ms": round(1000 * (time.perf_counter() - t_llegada), 2),
+        }
+
+    # ---------------- Métricas ----------------
+    def metricas(self):
+        instr = self.instr
+        with self._lock:
+            clientes = {c: {"cuadros": s.cuadros, "modo": s.analizador.modo,
+                            "inactivo_s": round(time.perf_counter() - s.t_ultimo, 1)}
+                        for c, s in self._sesiones.items()}
+            n_lotes, tam = self.lotes, dict(self.tam_lotes)
+            datos = {"pedidos": self.pedidos, "respondidos": self.respondidos,
+                     "rechazados": self.rechazados, "errores": self.errores}
+
+        def pct(etapa, p):
+            h = instr.histogramas.get(etapa)
+            return round(1000 * h.percentil(p), 2) if h else None
+        datos.update({
+            "duracion_s": round(time.perf_counter() - self.t_inicio, 1) if self.t_inicio else 0.0,
+            "rendimiento_pps": round(instr.fps(), 1),
+            "procesos": self.n_procesos,
+            "canales_libres": len(self._libres),
+            "clientes": clientes,
+            "cola_actual": self._cola.qsize(),
+            "cola_max": self.cola_max_vista,
+            "lotes": n_lotes,
+            "lote_medio": round(sum(k * v for k, v in tam.items()) / n_lotes, 2) if n_lotes else 0.0,
+            "tam_lotes": {str(k): v for k, v in sorted(tam.items())},
+            "latencia_p50_ms": round(instr.latencia(50), 2),
+            "latencia_p95_ms": round(instr.latencia(95), 2),
+            "espera_cola_p95_ms": pct("espera_cola", 95),
+            "lote_p95_ms": pct("lote", 95),
+        })
+        return datos
+
+
+# ======================= HTTP =======================
+def _manejador(servicio):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"      # conexiones persistentes: un cliente = una conexión
+        disable_nagle_algorithm = True     # cabecera y cuerpo van en dos escrituras: sin esto, +40 ms por ACK retardado
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, estado, datos):
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def _cuerpo(self):
+            """
+            Cuerpo del POST, o None si ya se respondió el error: sin Content-Length válido
+            (400) o mayor que el cuadro crudo más grande que acepta el servicio (413). El
+            cuerpo no se lee en esos casos, así que la conexión se cierra.
+            """
+            ancho, alto = servicio.tam_maximo
+            try:
+                largo = int(self.headers.get("Content-Length"))
+            except (TypeError, ValueError):
+                largo = -1
+            if largo < 0:
+                self.close_connection = True
+                self._json(400, {"error": "falta Content-Length o no es válido"})
+                return None
+            if largo > ancho * alto * 3:
+                self.close_connection = True
+                self._json(413, {"error": f"cuerpo de {largo} bytes: el máximo es un cuadro {ancho}x{alto} RGB"})
+                return None
+            return self.rfile.read(largo)
+
+        def do_GET(self):
+            if self.path == "/metricas":
+                self._json(200, servicio.metricas())
+            elif self.path == "/salud":
+                self._json(200, {"ok": True})
+            else:
+                self._json(404, {"error": "ruta desconocida"})
+
+        def do_POST(self):
+            datos = self._cuerpo()
+            if datos is None:
+                return
+            cliente = self.headers.get("X-Cliente") or self.client_address[0]
+            if self.path == "/cerrar":
+                self._json(200, {"cliente": cliente, "metricas": servicio.cerrar_sesion(cliente)})
+                return
+            if self.path != "/analizar":
+                self._json(404, {"error": "ruta desconocida"})
+                return
+            try:
+                frame = _decodificar(datos, self.headers)
+                t = self.headers.get("X-T")
+                r = servicio.enviar(cliente, self.headers.get("X-Modo") or "Flexión", frame,
+                                    float(t) if t else None)
+            except ServicioOcupado as e:
+                self._json(503, {"error": str(e)})
+            except (ValueError, TypeError) as e:
+                self._json(400, {"error": str(e)})
+            except TimeoutError as e:
+                self._json(504, {"error": str(e)})
+            except RuntimeError as e:
+                self._json(500, {"error": str(e)})
+            else:
+                self._json(200, r)
+    return Manejador
+
+
+def _decodificar(datos, cabeceras):
+    tipo = (cabeceras.get("Content-Type") or "").lower()
+    if tipo.startswith("image/"):
+        frame = cv2.imdecode(np.frombuffer(datos, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("imagen ilegible")
+        return frame
+    ancho, alto = int(cabeceras.get("X-Ancho", 0)), int(cabeceras.get("X-Alto", 0))
+    if ancho <= 0 or alto <= 0 or len(datos) != ancho * alto * 3:
+        raise ValueError("cuadro crudo: faltan X-Ancho/X-Alto o el tamaño no coincide")
+    return np.frombuffer(datos, np.uint8).reshape(alto, ancho, 3)
+
+
+# ======================= Cliente =======================
+class ClientePose:
+    """
+    Cliente de una estación: una conexión persistente al servicio.
+        c = ClientePose("127.0.0.1", 8765, "estacion-1")
+        r = c.analizar(frame_bgr)     # dict de /analizar
+    jpeg_calidad=None manda el cuadro crudo (más bytes, sin costo de compresión).
+    """
+
+    def __init__(self, host="127.0.0.1", puerto=PUERTO, cliente="cliente", modo="Flexión",
+                 jpeg_calidad=80, timeout=TIMEOUT_PEDIDO + 5):
+        self.host, self.puerto = host, puerto
+        self.cliente = cliente
+        self.modo = modo
+        self.jpeg_calidad = jpeg_calidad
+        self.timeout = timeout
+        self._con = None
+        self._t0 = time.perf_counter()
+
+    def _pedir(self, metodo, ruta, cuerpo=None, cabeceras=None):
+        for intento in range(2):       # una reconexión si el servidor cerró la conexión
+            if self._con is None:
+                self._con = http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+            try:
+                self._con.request(metodo, ruta, body=cuerpo, headers=cabeceras or {})
+                resp = self._con.getresponse()
+                return resp.status, json.loads(resp.read().decode("utf-8"))
+            except (ConnectionError, http.client.HTTPException):
+                self._con.close()
+                self._con = None
+                if intento:
+                    raise
+
+    def analizar(self, frame, t=None):
+        """Devuelve (estado_http, dict). 503 = servicio ocupado."""
+        cab = {"X-Cliente": self.cliente, "X-Modo": self.modo,
+               "X-T": f"{(time.perf_counter() - self._t0) if t is None else t:.4f}"}
+        if self.jpeg_calidad:
+            ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_calidad])
+            if not ok:
+                raise ValueError("no se pudo comprimir el cuadro")
+            cuerpo = buf.tobytes()
+            cab["Content-Type"] = "image/jpeg"
+        else:
+            cuerpo = np.ascontiguousarray(frame).tobytes()
+            cab.update({"Content-Type": "application/octet-stream",
+                        "X-Ancho": str(frame.shape[1]), "X-Alto": str(frame.shape[0])})
+        return self._pedir("POST", "/analizar", cuerpo, cab)
+
+    def metricas(self):
+        return self._pedir("GET", "/metricas")[1]
+
+    def cerrar(self):
+        """Cierra la sesión en el servicio (libera el canal) y devuelve sus métricas."""
+        try:
+            return self._pedir("POST", "/cerrar", b"", {"X-Cliente": self.cliente})[1].get("metricas")
+        finally:
+            if self._con is not None:
+                self._con.close()
+                self._con = None
+
+
+# ======================= CLI =======================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Servicio local de análisis de pose (HTTP).")
+    ap.add_argument("--host", default="127.0.0.1", help="0.0.0.0 lo expone (sin autenticación) a toda la red local")
+    ap.add_argument("--puerto", type=int, default=PUERTO)
+    ap.add_argument("--procesos", type=int, default=None, help="procesos de MediaPipe (def.: núcleos - 1)")
+    ap.add_argument("--clientes", type=int, default=MAX_CLIENTES, help="clientes simultáneos (canales)")
+    ap.add_argument("--lote-max", type=int, default=LOTE_MAX)
+    ap.add_argument("--espera-lote-ms", type=float, default=ESPERA_LOTE_MS)
+    args = ap.parse_args(argv)
+    servicio = ServicioPose(args.host, args.puerto, args.procesos, args.clientes,
+                            args.lote_max, args.espera_lote_ms).iniciar()
+    print(f"Servicio de pose en http://{servicio.host}:{servicio.puerto} "
+          f"({servicio.n_procesos} procesos, {servicio.max_clientes} clientes)")
+    try:
+        while True:
+            time.sleep(10)
+            m = servicio.metricas()
+            print(f"{m['rendimiento_pps']:.1f} cuadros/s, {len(m['clientes'])} clientes, "
+                  f"lote medio {m['lote_medio']}, cola {m['cola_actual']} (máx {m['cola_max']}), "
+                  f"p95 {m['latencia_p95_ms']} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())